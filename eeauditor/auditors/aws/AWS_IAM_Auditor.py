@@ -36,6 +36,8 @@ def iam_access_key_age_check(cache: dict, awsAccountId: str, awsRegion: str, aws
     for users in user["Users"]:
         userName = str(users["UserName"])
         userArn = str(users["Arn"])
+        if not registry.in_scope(userArn):
+            continue
         try:
             response = iam.list_access_keys(UserName=userName)
             for keys in response["AccessKeyMetadata"]:
@@ -208,13 +210,15 @@ def iam_access_key_age_check(cache: dict, awsAccountId: str, awsRegion: str, aws
         except Exception as e:
             print(e)
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=0)
 def user_permission_boundary_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """aaa"""
     user = list_users(cache=cache)
     for users in user["Users"]:
         userName = str(users["UserName"])
         userArn = str(users["Arn"])
+        if not registry.in_scope(userArn):
+            continue
         # ISO Time
         iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         try:
@@ -349,6 +353,8 @@ def user_mfa_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition:
     for users in user["Users"]:
         userName = str(users["UserName"])
         userArn = str(users["Arn"])
+        if not registry.in_scope(userArn):
+            continue
         # ISO Time
         iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         try:
@@ -494,6 +500,8 @@ def user_inline_policy_check(cache: dict, awsAccountId: str, awsRegion: str, aws
     for users in allUsers:
         userName = str(users["UserName"])
         userArn = str(users["Arn"])
+        if not registry.in_scope(userArn):
+            continue
         # ISO Time
         iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         try:
@@ -641,6 +649,8 @@ def user_direct_attached_policy_check(cache: dict, awsAccountId: str, awsRegion:
     for users in allUsers:
         userName = str(users["UserName"])
         userArn = str(users["Arn"])
+        if not registry.in_scope(userArn):
+            continue
         # ISO Time
         iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         try:
@@ -780,7 +790,7 @@ def user_direct_attached_policy_check(cache: dict, awsAccountId: str, awsRegion:
         except Exception as e:
             print(e)
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=0, account_level=True)
 def cis_aws_foundation_benchmark_pw_policy_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.6] The IAM password policy should meet or exceed the AWS CIS Foundations Benchmark standard"""
     try:
@@ -938,7 +948,7 @@ def cis_aws_foundation_benchmark_pw_policy_check(cache: dict, awsAccountId: str,
     except Exception as e:
         print(e)
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=0)
 def server_certs_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.7] There should not be any server certificates stored in AWS IAM"""
     try:
@@ -1079,7 +1089,7 @@ def server_certs_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartit
         print(e)
 
 
-@registry.register_check("iam")
+@registry.register_check("iam", cpu_bound=True)
 def iam_mngd_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.7] Managed policies should follow least privilege principles"""
     try:
@@ -1278,7 +1288,7 @@ def iam_mngd_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion:
         pass
 
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=2, cpu_bound=True)
 def iam_user_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.8] User inline policies should follow least privilege principles"""
     try:
@@ -1493,7 +1503,7 @@ def iam_user_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion:
         pass
 
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=2, cpu_bound=True)
 def iam_group_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.9] Group inline policies should follow least privilege principles"""
     try:
@@ -1700,7 +1710,7 @@ def iam_group_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion:
         pass
 
 
-@registry.register_check("iam")
+@registry.register_check("iam", fanout=2, cpu_bound=True)
 def iam_role_policy_least_priv_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[IAM.10] Role inline policies should follow least privilege principles"""
     try:
@@ -15,7 +15,9 @@
 
 import boto3
 import datetime
+import columnar
 from check_register import CheckRegister
+from finding_factory import FindingTemplate
 
 registry = CheckRegister()
 # import boto3 clients
@@ -28,147 +30,73 @@ def list_secrets(cache):
     cache["list_secrets"] = secretsmanager.list_secrets(MaxResults=100)
     return cache["list_secrets"]
 
+secret_age_template = FindingTemplate(
+    title="[SecretsManager.1] Secrets over 90 days old should be rotated",
+    types=["Software and Configuration Checks/AWS Security Best Practices"],
+    remediation_text="For more information on Secret Rotation refer to the Rotating Your AWS Secrets Manager Secrets section of the AWS Secrets Manager User Guide",
+    remediation_url="https://docs.aws.amazon.com/secretsmanager/latest/userguide/rotating-secrets.html",
+    resource_type="AwsSecretsManagerSecret",
+    related_requirements=[
+        "NIST CSF PR.AC-1",
+        "NIST SP 800-53 AC-1",
+        "NIST SP 800-53 AC-2",
+        "NIST SP 800-53 IA-1",
+        "NIST SP 800-53 IA-2",
+        "NIST SP 800-53 IA-3",
+        "NIST SP 800-53 IA-4",
+        "NIST SP 800-53 IA-5",
+        "NIST SP 800-53 IA-6",
+        "NIST SP 800-53 IA-7",
+        "NIST SP 800-53 IA-8",
+        "NIST SP 800-53 IA-9",
+        "NIST SP 800-53 IA-10",
+        "NIST SP 800-53 IA-11",
+        "AICPA TSC CC6.1",
+        "AICPA TSC CC6.2",
+        "ISO 27001:2013 A.9.2.1",
+        "ISO 27001:2013 A.9.2.2",
+        "ISO 27001:2013 A.9.2.3",
+        "ISO 27001:2013 A.9.2.4",
+        "ISO 27001:2013 A.9.2.6",
+        "ISO 27001:2013 A.9.3.1",
+        "ISO 27001:2013 A.9.4.2",
+        "ISO 27001:2013 A.9.4.3",
+    ],
+)
+
 @registry.register_check("secretsmanager")
 def secret_age_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecretsManager.1] Secrets over 90 days old should be rotated"""
-    secret = list_secrets(cache=cache)
-    for secrets in secret["SecretList"]:
-        secretArn = str(secrets["ARN"])
-        secretName = str(secrets["Name"])
-        lastChangedDate = secrets["LastChangedDate"]
-        todaysDatetime = datetime.datetime.now(datetime.timezone.utc)
-        secretAgeFinder = todaysDatetime - lastChangedDate
-        # ISO Time
-        iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
-        if secretAgeFinder >= datetime.timedelta(days=90):
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": secretArn + "/secrets-manager-age-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": secretArn,
-                "AwsAccountId": awsAccountId,
-                "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "MEDIUM"},
-                "Confidence": 99,
-                "Title": "[SecretsManager.1] Secrets over 90 days old should be rotated",
-                "Description": secretName
+    secrets = list_secrets(cache=cache)["SecretList"]
+    secretArns = [str(secret["ARN"]) for secret in secrets]
+    lastChanged = columnar.epoch_seconds(secrets, lambda secret: secret["LastChangedDate"])
+    failed = columnar.older_than(lastChanged, 90)
+    for row, isFailed in columnar.rows(failed, secretArns, registry):
+        secretArn = secretArns[row]
+        secretName = str(secrets[row]["Name"])
+        details = {"AwsSecretsManagerSecret": {"Name": secretName}}
+        if isFailed:
+            yield secret_age_template.failed(
+                secretArn + "/secrets-manager-age-check",
+                secretArn,
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                severity="MEDIUM",
+                description=secretName
                 + " is over 90 days old and should be rotated. Refer to the remediation instructions if this configuration is not intended",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "For more information on Secret Rotation refer to the Rotating Your AWS Secrets Manager Secrets section of the AWS Secrets Manager User Guide",
-                        "Url": "https://docs.aws.amazon.com/secretsmanager/latest/userguide/rotating-secrets.html",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsSecretsManagerSecret",
-                        "Id": secretArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"AwsSecretsManagerSecret": {"Name": secretName}}
-                    }
-                ],
-                "Compliance": {
-                    "Status": "FAILED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.AC-1",
-                        "NIST SP 800-53 AC-1",
-                        "NIST SP 800-53 AC-2",
-                        "NIST SP 800-53 IA-1",
-                        "NIST SP 800-53 IA-2",
-                        "NIST SP 800-53 IA-3",
-                        "NIST SP 800-53 IA-4",
-                        "NIST SP 800-53 IA-5",
-                        "NIST SP 800-53 IA-6",
-                        "NIST SP 800-53 IA-7",
-                        "NIST SP 800-53 IA-8",
-                        "NIST SP 800-53 IA-9",
-                        "NIST SP 800-53 IA-10",
-                        "NIST SP 800-53 IA-11",
-                        "AICPA TSC CC6.1",
-                        "AICPA TSC CC6.2",
-                        "ISO 27001:2013 A.9.2.1",
-                        "ISO 27001:2013 A.9.2.2",
-                        "ISO 27001:2013 A.9.2.3",
-                        "ISO 27001:2013 A.9.2.4",
-                        "ISO 27001:2013 A.9.2.6",
-                        "ISO 27001:2013 A.9.3.1",
-                        "ISO 27001:2013 A.9.4.2",
-                        "ISO 27001:2013 A.9.4.3",
-                    ],
-                },
-                "Workflow": {"Status": "NEW"},
-                "RecordState": "ACTIVE",
-            }
-            yield finding
+                details=details,
+            )
         else:
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": secretArn + "/secrets-manager-age-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": secretArn,
-                "AwsAccountId": awsAccountId,
-                "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "INFORMATIONAL"},
-                "Confidence": 99,
-                "Title": "[SecretsManager.1] Secrets over 90 days old should be rotated",
-                "Description": secretName + " is over 90 days old and should be rotated.",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "For more information on Secret Rotation refer to the Rotating Your AWS Secrets Manager Secrets section of the AWS Secrets Manager User Guide",
-                        "Url": "https://docs.aws.amazon.com/secretsmanager/latest/userguide/rotating-secrets.html",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsSecretsManagerSecret",
-                        "Id": secretArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"AwsSecretsManagerSecret": {"Name": secretName}}
-                    }
-                ],
-                "Compliance": {
-                    "Status": "PASSED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.AC-1",
-                        "NIST SP 800-53 AC-1",
-                        "NIST SP 800-53 AC-2",
-                        "NIST SP 800-53 IA-1",
-                        "NIST SP 800-53 IA-2",
-                        "NIST SP 800-53 IA-3",
-                        "NIST SP 800-53 IA-4",
-                        "NIST SP 800-53 IA-5",
-                        "NIST SP 800-53 IA-6",
-                        "NIST SP 800-53 IA-7",
-                        "NIST SP 800-53 IA-8",
-                        "NIST SP 800-53 IA-9",
-                        "NIST SP 800-53 IA-10",
-                        "NIST SP 800-53 IA-11",
-                        "AICPA TSC CC6.1",
-                        "AICPA TSC CC6.2",
-                        "ISO 27001:2013 A.9.2.1",
-                        "ISO 27001:2013 A.9.2.2",
-                        "ISO 27001:2013 A.9.2.3",
-                        "ISO 27001:2013 A.9.2.4",
-                        "ISO 27001:2013 A.9.2.6",
-                        "ISO 27001:2013 A.9.3.1",
-                        "ISO 27001:2013 A.9.4.2",
-                        "ISO 27001:2013 A.9.4.3",
-                    ],
-                },
-                "Workflow": {"Status": "RESOLVED"},
-                "RecordState": "ARCHIVED",
-            }
-            yield finding
+            yield secret_age_template.passed(
+                secretArn + "/secrets-manager-age-check",
+                secretArn,
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                description=secretName + " is over 90 days old and should be rotated.",
+                details=details,
+            )
 
 @registry.register_check("secretsmanager")
 def secret_changed_in_last_90_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
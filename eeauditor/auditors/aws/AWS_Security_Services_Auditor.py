@@ -26,7 +26,7 @@ detective = boto3.client("detective")
 macie2 = boto3.client("macie2")
 wafv2 = boto3.client("wafv2")
 
-@registry.register_check("accessanalyzer")
+@registry.register_check("accessanalyzer", fanout=0, account_level=True)
 def iam_access_analyzer_detector_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.1] Amazon IAM Access Analyzer should be enabled"""
     response = accessanalyzer.list_analyzers()
@@ -136,7 +136,7 @@ def iam_access_analyzer_detector_check(cache: dict, awsAccountId: str, awsRegion
         }
         yield finding
 
-@registry.register_check("guardduty")
+@registry.register_check("guardduty", fanout=0, account_level=True)
 def guard_duty_detector_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.2] Amazon GuardDuty should be enabled"""
     response = guardduty.list_detectors()
@@ -248,7 +248,7 @@ def guard_duty_detector_check(cache: dict, awsAccountId: str, awsRegion: str, aw
         }
         yield finding
 
-@registry.register_check("detective")
+@registry.register_check("detective", fanout=0, account_level=True)
 def detective_graph_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.3] Amazon Detective should be enabled"""
     try:
@@ -364,7 +364,7 @@ def detective_graph_check(cache: dict, awsAccountId: str, awsRegion: str, awsPar
     except Exception as e:
         print(e)
 
-@registry.register_check("macie2")
+@registry.register_check("macie2", fanout=0, account_level=True)
 def macie_in_use_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.4] Amazon Macie V2 should be enabled"""
     try:
@@ -485,7 +485,7 @@ def macie_in_use_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartit
     except Exception as e:
         print(e)
 
-@registry.register_check("macie2")
+@registry.register_check("macie2", fanout=0, account_level=True)
 def wafv2_regional_in_use_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.5] AWS WAFv2 Regional Web ACLs should be used"""
     try:
@@ -601,7 +601,7 @@ def wafv2_regional_in_use_check(cache: dict, awsAccountId: str, awsRegion: str,
     except Exception as e:
         print(e)
 
-@registry.register_check("macie2")
+@registry.register_check("macie2", fanout=0, account_level=True)
 def wafv2_global_in_use_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecSvcs.6] AWS WAFv2 Global (CloudFront) Web ACLs should be used"""
     if awsRegion == "us-east-1":
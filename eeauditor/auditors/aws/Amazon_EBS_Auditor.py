@@ -15,7 +15,9 @@
 
 import boto3
 import datetime
+import columnar
 from check_register import CheckRegister
+from finding_factory import FindingTemplate
 
 registry = CheckRegister()
 
@@ -39,459 +41,228 @@ def describe_snapshots(cache, awsAccountId):
     cache["describe_snapshots"] = ec2.describe_snapshots(OwnerIds=[awsAccountId], DryRun=False)
     return cache["describe_snapshots"]
 
-@registry.register_check("ec2")
+attachment_template = FindingTemplate(
+    title="[EBS.1] EBS Volumes should be in an attached state",
+    types=["Software and Configuration Checks/AWS Security Best Practices"],
+    remediation_text="If your EBS volume should be attached refer to the Attaching an Amazon EBS Volume to an Instance section of the Amazon Elastic Compute Cloud User Guide",
+    remediation_url="https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/ebs-attaching-volume.html",
+    resource_type="AwsEc2Volume",
+    related_requirements=[
+        "NIST CSF ID.AM-2",
+        "NIST SP 800-53 CM-8",
+        "NIST SP 800-53 PM-5",
+        "AICPA TSC CC3.2",
+        "AICPA TSC CC6.1",
+        "ISO 27001:2013 A.8.1.1",
+        "ISO 27001:2013 A.8.1.2",
+        "ISO 27001:2013 A.12.5.1",
+    ],
+)
+delete_on_termination_template = FindingTemplate(
+    title="[EBS.2] EBS Volumes should be configured to be deleted on termination",
+    types=["Software and Configuration Checks/AWS Security Best Practices"],
+    remediation_text="If your EBS volume should be deleted on instance termination refer to the Preserving Amazon EBS Volumes on Instance Termination section of the Amazon Elastic Compute Cloud User Guide",
+    remediation_url="https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/terminating-instances.html#preserving-volumes-on-termination",
+    resource_type="AwsEc2Volume",
+    related_requirements=[
+        "NIST CSF ID.AM-2",
+        "NIST SP 800-53 CM-8",
+        "NIST SP 800-53 PM-5",
+        "AICPA TSC CC3.2",
+        "AICPA TSC CC6.1",
+        "ISO 27001:2013 A.8.1.1",
+        "ISO 27001:2013 A.8.1.2",
+        "ISO 27001:2013 A.12.5.1",
+    ],
+)
+volume_encryption_template = FindingTemplate(
+    title="[EBS.3] EBS Volumes should be encrypted",
+    types=[
+        "Software and Configuration Checks/AWS Security Best Practices",
+        "Effects/Data Exposure",
+    ],
+    remediation_text="If your EBS volume should be encrypted refer to the Amazon EBS Encryption section of the Amazon Elastic Compute Cloud User Guide",
+    remediation_url="https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/EBSEncryption.html",
+    resource_type="AwsEc2Volume",
+    related_requirements=[
+        "NIST CSF PR.DS-1",
+        "NIST SP 800-53 MP-8",
+        "NIST SP 800-53 SC-12",
+        "NIST SP 800-53 SC-28",
+        "AICPA TSC CC6.1",
+        "ISO 27001:2013 A.8.2.3",
+    ],
+)
+snapshot_encryption_template = FindingTemplate(
+    title="[EBS.4] EBS Snapshots should be encrypted",
+    types=[
+        "Software and Configuration Checks/AWS Security Best Practices",
+        "Effects/Data Exposure",
+    ],
+    remediation_text="If your EBS snapshot should be encrypted refer to the Encryption Support for Snapshots section of the Amazon Elastic Compute Cloud User Guide",
+    remediation_url="https://docs.aws.amazon.com/AWSEC2/latest/WindowsGuide/EBSSnapshots.html#encryption-support",
+    resource_type="AwsEc2Snapshot",
+    related_requirements=[
+        "NIST CSF PR.DS-1",
+        "NIST SP 800-53 MP-8",
+        "NIST SP 800-53 SC-12",
+        "NIST SP 800-53 SC-28",
+        "AICPA TSC CC6.1",
+        "ISO 27001:2013 A.8.2.3",
+    ],
+)
+
+
+def volume_arn(volumeId, awsAccountId, awsRegion, awsPartition):
+    return f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}/{volumeId}"
+
+
+@registry.register_check("ec2", fanout=0)
 def ebs_volume_attachment_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EBS.1] EBS Volumes should be in an attached state"""
-    response = describe_volumes(cache)
-    myEbsVolumes = response["Volumes"]
-    for volumes in myEbsVolumes:
-        ebsVolumeId = str(volumes["VolumeId"])
-        ebsVolumeArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}/{ebsVolumeId}"
-        ebsAttachments = volumes["Attachments"]
-        for attachments in ebsAttachments:
-            ebsAttachmentState = str(attachments["State"])
-            # ISO Time
-            iso8601Time = (
-                datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
+    # one row per attachment, evaluated a column at a time
+    attachments = columnar.explode(describe_volumes(cache)["Volumes"], "Attachments")
+    volumeIds = [volume["VolumeId"] for volume, attachment in attachments]
+    arns = [volume_arn(volumeId, awsAccountId, awsRegion, awsPartition) for volumeId in volumeIds]
+    states = columnar.labels(attachments, lambda row: row[1]["State"])
+    failed = columnar.not_equal(states, "attached")
+    for row, isFailed in columnar.rows(failed, arns, registry):
+        ebsVolumeId = volumeIds[row]
+        findingId = arns[row] + "/ebs-volume-attachment-check"
+        details = {"Other": {"volumeId": ebsVolumeId}}
+        if isFailed:
+            yield attachment_template.failed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                severity="LOW",
+                description="EBS Volume "
+                + ebsVolumeId
+                + " is not in an attached state. Refer to the remediation instructions if this configuration is not intended",
+                details=details,
+            )
+        else:
+            yield attachment_template.passed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                description="EBS Volume " + ebsVolumeId + " is in an attached state.",
+                details=details,
             )
-            if ebsAttachmentState != "attached":
-                finding = {
-                    "SchemaVersion": "2018-10-08",
-                    "Id": ebsVolumeArn + "/ebs-volume-attachment-check",
-                    "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                    "GeneratorId": ebsVolumeArn,
-                    "AwsAccountId": awsAccountId,
-                    "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                    "FirstObservedAt": iso8601Time,
-                    "CreatedAt": iso8601Time,
-                    "UpdatedAt": iso8601Time,
-                    "Severity": {"Label": "LOW"},
-                    "Confidence": 99,
-                    "Title": "[EBS.1] EBS Volumes should be in an attached state",
-                    "Description": "EBS Volume "
-                    + ebsVolumeId
-                    + " is not in an attached state. Refer to the remediation instructions if this configuration is not intended",
-                    "Remediation": {
-                        "Recommendation": {
-                            "Text": "If your EBS volume should be attached refer to the Attaching an Amazon EBS Volume to an Instance section of the Amazon Elastic Compute Cloud User Guide",
-                            "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/ebs-attaching-volume.html",
-                        }
-                    },
-                    "ProductFields": {"Product Name": "ElectricEye"},
-                    "Resources": [
-                        {
-                            "Type": "AwsEc2Volume",
-                            "Id": ebsVolumeArn,
-                            "Partition": awsPartition,
-                            "Region": awsRegion,
-                            "Details": {"Other": {"volumeId": ebsVolumeId}},
-                        }
-                    ],
-                    "Compliance": {
-                        "Status": "FAILED",
-                        "RelatedRequirements": [
-                            "NIST CSF ID.AM-2",
-                            "NIST SP 800-53 CM-8",
-                            "NIST SP 800-53 PM-5",
-                            "AICPA TSC CC3.2",
-                            "AICPA TSC CC6.1",
-                            "ISO 27001:2013 A.8.1.1",
-                            "ISO 27001:2013 A.8.1.2",
-                            "ISO 27001:2013 A.12.5.1",
-                        ],
-                    },
-                    "Workflow": {"Status": "NEW"},
-                    "RecordState": "ACTIVE",
-                }
-                yield finding
-            else:
-                finding = {
-                    "SchemaVersion": "2018-10-08",
-                    "Id": ebsVolumeArn + "/ebs-volume-attachment-check",
-                    "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                    "GeneratorId": ebsVolumeArn,
-                    "AwsAccountId": awsAccountId,
-                    "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                    "FirstObservedAt": iso8601Time,
-                    "CreatedAt": iso8601Time,
-                    "UpdatedAt": iso8601Time,
-                    "Severity": {"Label": "INFORMATIONAL"},
-                    "Confidence": 99,
-                    "Title": "[EBS.1] EBS Volumes should be in an attached state",
-                    "Description": "EBS Volume " + ebsVolumeId + " is in an attached state.",
-                    "Remediation": {
-                        "Recommendation": {
-                            "Text": "If your EBS volume should be attached refer to the Attaching an Amazon EBS Volume to an Instance section of the Amazon Elastic Compute Cloud User Guide",
-                            "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/ebs-attaching-volume.html",
-                        }
-                    },
-                    "ProductFields": {"Product Name": "ElectricEye"},
-                    "Resources": [
-                        {
-                            "Type": "AwsEc2Volume",
-                            "Id": ebsVolumeArn,
-                            "Partition": awsPartition,
-                            "Region": awsRegion,
-                            "Details": {"Other": {"volumeId": ebsVolumeId}},
-                        }
-                    ],
-                    "Compliance": {
-                        "Status": "PASSED",
-                        "RelatedRequirements": [
-                            "NIST CSF ID.AM-2",
-                            "NIST SP 800-53 CM-8",
-                            "NIST SP 800-53 PM-5",
-                            "AICPA TSC CC3.2",
-                            "AICPA TSC CC6.1",
-                            "ISO 27001:2013 A.8.1.1",
-                            "ISO 27001:2013 A.8.1.2",
-                            "ISO 27001:2013 A.12.5.1",
-                        ],
-                    },
-                    "Workflow": {"Status": "RESOLVED"},
-                    "RecordState": "ARCHIVED",
-                }
-                yield finding
 
-@registry.register_check("ec2")
+
+@registry.register_check("ec2", fanout=0)
 def ebs_volume_delete_on_termination_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EBS.2] EBS Volumes should be configured to be deleted on termination"""
-    response = describe_volumes(cache)
-    myEbsVolumes = response["Volumes"]
-    for volumes in myEbsVolumes:
-        ebsVolumeId = str(volumes["VolumeId"])
-        ebsVolumeArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}/{ebsVolumeId}"
-        ebsAttachments = volumes["Attachments"]
-        for attachments in ebsAttachments:
-            ebsDeleteOnTerminationCheck = str(attachments["DeleteOnTermination"])
-            # ISO Time
-            iso8601Time = (
-                datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
+    attachments = columnar.explode(describe_volumes(cache)["Volumes"], "Attachments")
+    volumeIds = [volume["VolumeId"] for volume, attachment in attachments]
+    arns = [volume_arn(volumeId, awsAccountId, awsRegion, awsPartition) for volumeId in volumeIds]
+    deleteOnTermination = columnar.flags(attachments, lambda row: row[1].get("DeleteOnTermination"))
+    failed = columnar.negate(deleteOnTermination)
+    for row, isFailed in columnar.rows(failed, arns, registry):
+        ebsVolumeId = volumeIds[row]
+        findingId = arns[row] + "/ebs-volume-delete-on-termination-check"
+        details = {"Other": {"volumeId": ebsVolumeId}}
+        if isFailed:
+            yield delete_on_termination_template.failed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                severity="LOW",
+                description="EBS Volume "
+                + ebsVolumeId
+                + " is not configured to be deleted on termination. Refer to the remediation instructions if this configuration is not intended",
+                details=details,
+            )
+        else:
+            yield delete_on_termination_template.passed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                description="EBS Volume " + ebsVolumeId + " is configured to be deleted on termination.",
+                details=details,
             )
-            if ebsDeleteOnTerminationCheck == "False":
-                finding = {
-                    "SchemaVersion": "2018-10-08",
-                    "Id": ebsVolumeArn + "/ebs-volume-delete-on-termination-check",
-                    "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                    "GeneratorId": ebsVolumeArn,
-                    "AwsAccountId": awsAccountId,
-                    "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                    "FirstObservedAt": iso8601Time,
-                    "CreatedAt": iso8601Time,
-                    "UpdatedAt": iso8601Time,
-                    "Severity": {"Label": "LOW"},
-                    "Confidence": 99,
-                    "Title": "[EBS.2] EBS Volumes should be configured to be deleted on termination",
-                    "Description": "EBS Volume "
-                    + ebsVolumeId
-                    + " is not configured to be deleted on termination. Refer to the remediation instructions if this configuration is not intended",
-                    "Remediation": {
-                        "Recommendation": {
-                            "Text": "If your EBS volume should be deleted on instance termination refer to the Preserving Amazon EBS Volumes on Instance Termination section of the Amazon Elastic Compute Cloud User Guide",
-                            "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/terminating-instances.html#preserving-volumes-on-termination",
-                        }
-                    },
-                    "ProductFields": {"Product Name": "ElectricEye"},
-                    "Resources": [
-                        {
-                            "Type": "AwsEc2Volume",
-                            "Id": ebsVolumeArn,
-                            "Partition": awsPartition,
-                            "Region": awsRegion,
-                            "Details": {"Other": {"volumeId": ebsVolumeId}},
-                        }
-                    ],
-                    "Compliance": {
-                        "Status": "FAILED",
-                        "RelatedRequirements": [
-                            "NIST CSF ID.AM-2",
-                            "NIST SP 800-53 CM-8",
-                            "NIST SP 800-53 PM-5",
-                            "AICPA TSC CC3.2",
-                            "AICPA TSC CC6.1",
-                            "ISO 27001:2013 A.8.1.1",
-                            "ISO 27001:2013 A.8.1.2",
-                            "ISO 27001:2013 A.12.5.1",
-                        ],
-                    },
-                    "Workflow": {"Status": "NEW"},
-                    "RecordState": "ACTIVE",
-                }
-                yield finding
-            else:
-                finding = {
-                    "SchemaVersion": "2018-10-08",
-                    "Id": ebsVolumeArn + "/ebs-volume-delete-on-termination-check",
-                    "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                    "GeneratorId": ebsVolumeArn,
-                    "AwsAccountId": awsAccountId,
-                    "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
-                    "FirstObservedAt": iso8601Time,
-                    "CreatedAt": iso8601Time,
-                    "UpdatedAt": iso8601Time,
-                    "Severity": {"Label": "INFORMATIONAL"},
-                    "Confidence": 99,
-                    "Title": "[EBS.2] EBS Volumes should be configured to be deleted on termination",
-                    "Description": "EBS Volume "
-                    + ebsVolumeId
-                    + " is configured to be deleted on termination.",
-                    "Remediation": {
-                        "Recommendation": {
-                            "Text": "If your EBS volume should be deleted on instance termination refer to the Preserving Amazon EBS Volumes on Instance Termination section of the Amazon Elastic Compute Cloud User Guide",
-                            "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/terminating-instances.html#preserving-volumes-on-termination",
-                        }
-                    },
-                    "ProductFields": {"Product Name": "ElectricEye"},
-                    "Resources": [
-                        {
-                            "Type": "AwsEc2Volume",
-                            "Id": ebsVolumeArn,
-                            "Partition": awsPartition,
-                            "Region": awsRegion,
-                            "Details": {"Other": {"volumeId": ebsVolumeId}},
-                        }
-                    ],
-                    "Compliance": {
-                        "Status": "PASSED",
-                        "RelatedRequirements": [
-                            "NIST CSF ID.AM-2",
-                            "NIST SP 800-53 CM-8",
-                            "NIST SP 800-53 PM-5",
-                            "AICPA TSC CC3.2",
-                            "AICPA TSC CC6.1",
-                            "ISO 27001:2013 A.8.1.1",
-                            "ISO 27001:2013 A.8.1.2",
-                            "ISO 27001:2013 A.12.5.1",
-                        ],
-                    },
-                    "Workflow": {"Status": "RESOLVED"},
-                    "RecordState": "ARCHIVED",
-                }
-                yield finding
 
-@registry.register_check("ec2")
+
+@registry.register_check("ec2", fanout=0)
 def ebs_volume_encryption_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EBS.3] EBS Volumes should be encrypted"""
-    response = describe_volumes(cache)
-    myEbsVolumes = response["Volumes"]
-    for volumes in myEbsVolumes:
-        ebsVolumeId = str(volumes["VolumeId"])
-        ebsVolumeArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}/{ebsVolumeId}"
-        ebsEncryptionCheck = str(volumes["Encrypted"])
-        # ISO Time
-        iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
-        if ebsEncryptionCheck == "False":
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": ebsVolumeArn + "/ebs-volume-encryption-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": ebsVolumeArn,
-                "AwsAccountId": awsAccountId,
-                "Types": [
-                    "Software and Configuration Checks/AWS Security Best Practices",
-                    "Effects/Data Exposure",
-                ],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "HIGH"},
-                "Confidence": 99,
-                "Title": "[EBS.3] EBS Volumes should be encrypted",
-                "Description": "EBS Volume "
+    volumes = describe_volumes(cache)["Volumes"]
+    volumeIds = [volume["VolumeId"] for volume in volumes]
+    arns = [volume_arn(volumeId, awsAccountId, awsRegion, awsPartition) for volumeId in volumeIds]
+    failed = columnar.negate(columnar.flags(volumes, lambda volume: volume.get("Encrypted")))
+    for row, isFailed in columnar.rows(failed, arns, registry):
+        ebsVolumeId = volumeIds[row]
+        findingId = arns[row] + "/ebs-volume-encryption-check"
+        details = {"Other": {"volumeId": ebsVolumeId}}
+        if isFailed:
+            yield volume_encryption_template.failed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                severity="HIGH",
+                description="EBS Volume "
                 + ebsVolumeId
                 + " is not encrypted. Refer to the remediation instructions if this configuration is not intended",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "If your EBS volume should be encrypted refer to the Amazon EBS Encryption section of the Amazon Elastic Compute Cloud User Guide",
-                        "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/EBSEncryption.html",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsEc2Volume",
-                        "Id": ebsVolumeArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"Other": {"volumeId": ebsVolumeId}},
-                    }
-                ],
-                "Compliance": {
-                    "Status": "FAILED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.DS-1",
-                        "NIST SP 800-53 MP-8",
-                        "NIST SP 800-53 SC-12",
-                        "NIST SP 800-53 SC-28",
-                        "AICPA TSC CC6.1",
-                        "ISO 27001:2013 A.8.2.3",
-                    ],
-                },
-                "Workflow": {"Status": "NEW"},
-                "RecordState": "ACTIVE",
-            }
-            yield finding
+                details=details,
+            )
         else:
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": ebsVolumeArn + "/ebs-volume-encryption-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": ebsVolumeArn,
-                "AwsAccountId": awsAccountId,
-                "Types": [
-                    "Software and Configuration Checks/AWS Security Best Practices",
-                    "Effects/Data Exposure",
-                ],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "INFORMATIONAL"},
-                "Confidence": 99,
-                "Title": "[EBS.3] EBS Volumes should be encrypted",
-                "Description": "EBS Volume " + ebsVolumeId + " is encrypted.",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "If your EBS volume should be encrypted refer to the Amazon EBS Encryption section of the Amazon Elastic Compute Cloud User Guide",
-                        "Url": "https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/EBSEncryption.html",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsEc2Volume",
-                        "Id": ebsVolumeArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"Other": {"volumeId": ebsVolumeId}},
-                    }
-                ],
-                "Compliance": {
-                    "Status": "PASSED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.DS-1",
-                        "NIST SP 800-53 MP-8",
-                        "NIST SP 800-53 SC-12",
-                        "NIST SP 800-53 SC-28",
-                        "AICPA TSC CC6.1",
-                        "ISO 27001:2013 A.8.2.3",
-                    ],
-                },
-                "Workflow": {"Status": "RESOLVED"},
-                "RecordState": "ARCHIVED",
-            }
-            yield finding
+            yield volume_encryption_template.passed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                description="EBS Volume " + ebsVolumeId + " is encrypted.",
+                details=details,
+            )
 
-@registry.register_check("ec2")
+
+@registry.register_check("ec2", fanout=0)
 def ebs_snapshot_encryption_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EBS.4] EBS Snapshots should be encrypted"""
-    response = describe_snapshots(cache, awsAccountId)
-    myEbsSnapshots = response["Snapshots"]
-    for snapshots in myEbsSnapshots:
-        snapshotId = str(snapshots["SnapshotId"])
-        snapshotArn = f"arn:{awsPartition}:ec2:{awsRegion}::snapshot/{snapshotId}"
-        snapshotEncryptionCheck = str(snapshots["Encrypted"])
-        # ISO Time
-        iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
-        if snapshotEncryptionCheck == "False":
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": snapshotArn + "/ebs-snapshot-encryption-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": snapshotArn,
-                "AwsAccountId": awsAccountId,
-                "Types": [
-                    "Software and Configuration Checks/AWS Security Best Practices",
-                    "Effects/Data Exposure",
-                ],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "HIGH"},
-                "Confidence": 99,
-                "Title": "[EBS.4] EBS Snapshots should be encrypted",
-                "Description": "EBS Snapshot "
+    snapshots = describe_snapshots(cache, awsAccountId)["Snapshots"]
+    snapshotIds = [snapshot["SnapshotId"] for snapshot in snapshots]
+    arns = [f"arn:{awsPartition}:ec2:{awsRegion}::snapshot/{snapshotId}" for snapshotId in snapshotIds]
+    failed = columnar.negate(columnar.flags(snapshots, lambda snapshot: snapshot.get("Encrypted")))
+    for row, isFailed in columnar.rows(failed, arns, registry):
+        snapshotId = snapshotIds[row]
+        findingId = arns[row] + "/ebs-snapshot-encryption-check"
+        details = {"Other": {"snapshotId": snapshotId}}
+        if isFailed:
+            yield snapshot_encryption_template.failed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                severity="HIGH",
+                description="EBS Snapshot "
                 + snapshotId
                 + " is not encrypted. Refer to the remediation instructions if this configuration is not intended",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "If your EBS snapshot should be encrypted refer to the Encryption Support for Snapshots section of the Amazon Elastic Compute Cloud User Guide",
-                        "Url": "https://docs.aws.amazon.com/AWSEC2/latest/WindowsGuide/EBSSnapshots.html#encryption-support",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsEc2Snapshot",
-                        "Id": snapshotArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"Other": {"snapshotId": snapshotId}},
-                    }
-                ],
-                "Compliance": {
-                    "Status": "FAILED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.DS-1",
-                        "NIST SP 800-53 MP-8",
-                        "NIST SP 800-53 SC-12",
-                        "NIST SP 800-53 SC-28",
-                        "AICPA TSC CC6.1",
-                        "ISO 27001:2013 A.8.2.3",
-                    ],
-                },
-                "Workflow": {"Status": "NEW"},
-                "RecordState": "ACTIVE",
-            }
-            yield finding
+                details=details,
+            )
         else:
-            finding = {
-                "SchemaVersion": "2018-10-08",
-                "Id": snapshotArn + "/ebs-snapshot-encryption-check",
-                "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                "GeneratorId": snapshotArn,
-                "AwsAccountId": awsAccountId,
-                "Types": [
-                    "Software and Configuration Checks/AWS Security Best Practices",
-                    "Effects/Data Exposure",
-                ],
-                "FirstObservedAt": iso8601Time,
-                "CreatedAt": iso8601Time,
-                "UpdatedAt": iso8601Time,
-                "Severity": {"Label": "INFORMATIONAL"},
-                "Confidence": 99,
-                "Title": "[EBS.4] EBS Snapshots should be encrypted",
-                "Description": "EBS Snapshot " + snapshotId + " is encrypted.",
-                "Remediation": {
-                    "Recommendation": {
-                        "Text": "If your EBS snapshot should be encrypted refer to the Encryption Support for Snapshots section of the Amazon Elastic Compute Cloud User Guide",
-                        "Url": "https://docs.aws.amazon.com/AWSEC2/latest/WindowsGuide/EBSSnapshots.html#encryption-support",
-                    }
-                },
-                "ProductFields": {"Product Name": "ElectricEye"},
-                "Resources": [
-                    {
-                        "Type": "AwsEc2Snapshot",
-                        "Id": snapshotArn,
-                        "Partition": awsPartition,
-                        "Region": awsRegion,
-                        "Details": {"Other": {"snapshotId": snapshotId}},
-                    }
-                ],
-                "Compliance": {
-                    "Status": "PASSED",
-                    "RelatedRequirements": [
-                        "NIST CSF PR.DS-1",
-                        "NIST SP 800-53 MP-8",
-                        "NIST SP 800-53 SC-12",
-                        "NIST SP 800-53 SC-28",
-                        "AICPA TSC CC6.1",
-                        "ISO 27001:2013 A.8.2.3",
-                    ],
-                },
-                "Workflow": {"Status": "RESOLVED"},
-                "RecordState": "ARCHIVED",
-            }
-            yield finding
+            yield snapshot_encryption_template.passed(
+                findingId,
+                arns[row],
+                awsAccountId,
+                awsRegion,
+                awsPartition,
+                description="EBS Snapshot " + snapshotId + " is encrypted.",
+                details=details,
+            )
+
 
 @registry.register_check("ec2")
 def ebs_snapshot_public_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
@@ -501,6 +272,8 @@ def ebs_snapshot_public_check(cache: dict, awsAccountId: str, awsRegion: str, aw
     for snapshots in myEbsSnapshots:
         snapshotId = str(snapshots["SnapshotId"])
         snapshotArn = f"arn:{awsPartition}:ec2:{awsRegion}::snapshot/{snapshotId}"
+        if not registry.in_scope(snapshotArn):
+            continue
         response = ec2.describe_snapshot_attribute(
             Attribute="createVolumePermission", SnapshotId=snapshotId, DryRun=False
         )
@@ -680,7 +453,7 @@ def ebs_snapshot_public_check(cache: dict, awsAccountId: str, awsRegion: str, aw
                     }
                     yield finding
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0, account_level=True)
 def ebs_account_encryption_by_default_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EBS.6] Account-level EBS Volume encryption should be enabled"""
     response = ec2.get_ebs_encryption_by_default(DryRun=False)
@@ -667,7 +667,7 @@ def ec2_source_dest_verification_check(cache: dict, awsAccountId: str, awsRegion
         print(e)
 
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0, account_level=True)
 def ec2_serial_console_access_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EC2.5] Serial port access to EC2 should be prohibited unless absolutely required"""
     # ISO Time
@@ -16,6 +16,7 @@
 import boto3
 import datetime
 from check_register import CheckRegister
+from finding_factory import FindingTemplate
 
 registry = CheckRegister()
 
@@ -29,7 +30,33 @@ def describe_security_groups(cache):
     return cache["describe_security_groups"]
 
 
-@registry.register_check("ec2")
+all_open_template = FindingTemplate(
+    title="[SecurityGroup.1] Security groups should not allow unrestricted access to all ports and protocols",
+    types=[
+        "Software and Configuration Checks/AWS Security Best Practices",
+        "Effects/Data Exposure",
+    ],
+    remediation_text="For more information on modifying security group rules refer to the Adding, Removing, and Updating Rules section of the Amazon Virtual Private Cloud User Guide",
+    remediation_url="https://docs.aws.amazon.com/vpc/latest/userguide/VPC_SecurityGroups.html#AddRemoveRules",
+    resource_type="AwsEc2SecurityGroup",
+    related_requirements=[
+        "NIST CSF PR.AC-3",
+        "NIST SP 800-53 AC-1",
+        "NIST SP 800-53 AC-17",
+        "NIST SP 800-53 AC-19",
+        "NIST SP 800-53 AC-20",
+        "NIST SP 800-53 SC-15",
+        "AICPA TSC CC6.6",
+        "ISO 27001:2013 A.6.2.1",
+        "ISO 27001:2013 A.6.2.2",
+        "ISO 27001:2013 A.11.2.6",
+        "ISO 27001:2013 A.13.1.1",
+        "ISO 27001:2013 A.13.2.1",
+    ],
+)
+
+
+@registry.register_check("ec2", fanout=0)
 def security_group_all_open_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.1] Security groups should not allow unrestricted access to all ports and protocols"""
     response = describe_security_groups(cache)
@@ -38,6 +65,9 @@ def security_group_all_open_check(cache: dict, awsAccountId: str, awsRegion: str
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
+        details = {"AwsEc2SecurityGroup": {"GroupName": sgName, "GroupId": sgId}}
         for permissions in secgroup["IpPermissions"]:
             try:
                 ipProtocol = str(permissions["IpProtocol"])
@@ -46,131 +76,36 @@ def security_group_all_open_check(cache: dict, awsAccountId: str, awsRegion: str
             ipRanges = permissions["IpRanges"]
             for cidrs in ipRanges:
                 cidrIpRange = str(cidrs["CidrIp"])
-                iso8601Time = (
-                    datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
-                )
-                if ipProtocol == "-1" and cidrIpRange == "0.0.0.0/0":
-                    finding = {
-                        "SchemaVersion": "2018-10-08",
-                        "Id": sgArn + "/" + ipProtocol + "/security-group-all-open-check",
-                        "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                        "GeneratorId": sgArn,
-                        "AwsAccountId": awsAccountId,
-                        "Types": [
-                            "Software and Configuration Checks/AWS Security Best Practices",
-                            "Effects/Data Exposure",
-                        ],
-                        "FirstObservedAt": iso8601Time,
-                        "CreatedAt": iso8601Time,
-                        "UpdatedAt": iso8601Time,
-                        "Severity": {"Label": "CRITICAL"},
-                        "Confidence": 99,
-                        "Title": "[SecurityGroup.1] Security groups should not allow unrestricted access to all ports and protocols",
-                        "Description": "Security group "
+                if ipProtocol != "-1":
+                    continue
+                findingId = sgArn + "/" + ipProtocol + "/security-group-all-open-check"
+                if cidrIpRange == "0.0.0.0/0":
+                    yield all_open_template.failed(
+                        findingId,
+                        sgArn,
+                        awsAccountId,
+                        awsRegion,
+                        awsPartition,
+                        severity="CRITICAL",
+                        description="Security group "
                         + sgName
                         + " allows unrestricted access to all ports and protocols. Refer to the remediation instructions to remediate this behavior. Your security group should still be audited to ensure any other rules are compliant with organizational or regulatory requirements.",
-                        "Remediation": {
-                            "Recommendation": {
-                                "Text": "For more information on modifying security group rules refer to the Adding, Removing, and Updating Rules section of the Amazon Virtual Private Cloud User Guide",
-                                "Url": "https://docs.aws.amazon.com/vpc/latest/userguide/VPC_SecurityGroups.html#AddRemoveRules",
-                            }
-                        },
-                        "ProductFields": {"Product Name": "ElectricEye"},
-                        "Resources": [
-                            {
-                                "Type": "AwsEc2SecurityGroup",
-                                "Id": sgArn,
-                                "Partition": awsPartition,
-                                "Region": awsRegion,
-                                "Details": {
-                                    "AwsEc2SecurityGroup": {"GroupName": sgName, "GroupId": sgId,}
-                                },
-                            }
-                        ],
-                        "Compliance": {
-                            "Status": "FAILED",
-                            "RelatedRequirements": [
-                                "NIST CSF PR.AC-3",
-                                "NIST SP 800-53 AC-1",
-                                "NIST SP 800-53 AC-17",
-                                "NIST SP 800-53 AC-19",
-                                "NIST SP 800-53 AC-20",
-                                "NIST SP 800-53 SC-15",
-                                "AICPA TSC CC6.6",
-                                "ISO 27001:2013 A.6.2.1",
-                                "ISO 27001:2013 A.6.2.2",
-                                "ISO 27001:2013 A.11.2.6",
-                                "ISO 27001:2013 A.13.1.1",
-                                "ISO 27001:2013 A.13.2.1",
-                            ],
-                        },
-                        "Workflow": {"Status": "NEW"},
-                        "RecordState": "ACTIVE",
-                    }
-                    yield finding
-                elif ipProtocol == "-1" and cidrIpRange != "0.0.0.0/0":
-                    finding = {
-                        "SchemaVersion": "2018-10-08",
-                        "Id": sgArn + "/" + ipProtocol + "/security-group-all-open-check",
-                        "ProductArn": f"arn:{awsPartition}:securityhub:{awsRegion}:{awsAccountId}:product/{awsAccountId}/default",
-                        "GeneratorId": sgArn,
-                        "AwsAccountId": awsAccountId,
-                        "Types": [
-                            "Software and Configuration Checks/AWS Security Best Practices",
-                            "Effects/Data Exposure",
-                        ],
-                        "FirstObservedAt": iso8601Time,
-                        "CreatedAt": iso8601Time,
-                        "UpdatedAt": iso8601Time,
-                        "Severity": {"Label": "INFORMATIONAL"},
-                        "Confidence": 99,
-                        "Title": "[SecurityGroup.1] Security groups should not allow unrestricted access to all ports and protocols",
-                        "Description": "Security group "
+                        details=details,
+                    )
+                else:
+                    yield all_open_template.passed(
+                        findingId,
+                        sgArn,
+                        awsAccountId,
+                        awsRegion,
+                        awsPartition,
+                        description="Security group "
                         + sgName
                         + " does not allow unrestricted access to all ports and protocols. Your security group should still be audited to ensure any other rules are compliant with organizational or regulatory requirements.",
-                        "Remediation": {
-                            "Recommendation": {
-                                "Text": "For more information on modifying security group rules refer to the Adding, Removing, and Updating Rules section of the Amazon Virtual Private Cloud User Guide",
-                                "Url": "https://docs.aws.amazon.com/vpc/latest/userguide/VPC_SecurityGroups.html#AddRemoveRules",
-                            }
-                        },
-                        "ProductFields": {"Product Name": "ElectricEye"},
-                        "Resources": [
-                            {
-                                "Type": "AwsEc2SecurityGroup",
-                                "Id": sgArn,
-                                "Partition": awsPartition,
-                                "Region": awsRegion,
-                                "Details": {
-                                    "AwsEc2SecurityGroup": {"GroupName": sgName, "GroupId": sgId,}
-                                },
-                            }
-                        ],
-                        "Compliance": {
-                            "Status": "PASSED",
-                            "RelatedRequirements": [
-                                "NIST CSF PR.AC-3",
-                                "NIST SP 800-53 AC-1",
-                                "NIST SP 800-53 AC-17",
-                                "NIST SP 800-53 AC-19",
-                                "NIST SP 800-53 AC-20",
-                                "NIST SP 800-53 SC-15",
-                                "AICPA TSC CC6.6",
-                                "ISO 27001:2013 A.6.2.1",
-                                "ISO 27001:2013 A.6.2.2",
-                                "ISO 27001:2013 A.11.2.6",
-                                "ISO 27001:2013 A.13.1.1",
-                                "ISO 27001:2013 A.13.2.1",
-                            ],
-                        },
-                        "Workflow": {"Status": "RESOLVED"},
-                        "RecordState": "ARCHIVED",
-                    }
-                    yield finding
-                else:
-                    continue
+                        details=details,
+                    )
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_ftp_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.2] Security groups should not allow unrestricted File Transfer Protocol (FTP) access"""
     response = describe_security_groups(cache)
@@ -179,6 +114,8 @@ def security_group_open_ftp_check(cache: dict, awsAccountId: str, awsRegion: str
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -329,7 +266,7 @@ def security_group_open_ftp_check(cache: dict, awsAccountId: str, awsRegion: str
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_telnet_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.3] Security groups should not allow unrestricted TelNet access"""
     response = describe_security_groups(cache)
@@ -338,6 +275,8 @@ def security_group_open_telnet_check(cache: dict, awsAccountId: str, awsRegion:
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -488,7 +427,7 @@ def security_group_open_telnet_check(cache: dict, awsAccountId: str, awsRegion:
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_dcom_rpc_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.4] Security groups should not allow unrestricted Windows RPC DCOM access"""
     response = describe_security_groups(cache)
@@ -497,6 +436,8 @@ def security_group_open_dcom_rpc_check(cache: dict, awsAccountId: str, awsRegion
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -663,7 +604,7 @@ def security_group_open_dcom_rpc_check(cache: dict, awsAccountId: str, awsRegion
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_smb_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.5] Security groups should not allow unrestricted Server Message Blocks (SMB) access"""
     response = describe_security_groups(cache)
@@ -672,6 +613,8 @@ def security_group_open_smb_check(cache: dict, awsAccountId: str, awsRegion: str
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -850,7 +793,7 @@ def security_group_open_smb_check(cache: dict, awsAccountId: str, awsRegion: str
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_mssql_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.6] Security groups should not allow unrestricted Microsoft SQL Server (MSSQL) access"""
     response = describe_security_groups(cache)
@@ -859,6 +802,8 @@ def security_group_open_mssql_check(cache: dict, awsAccountId: str, awsRegion: s
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1049,7 +994,7 @@ def security_group_open_mssql_check(cache: dict, awsAccountId: str, awsRegion: s
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_oracle_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.7] Security groups should not allow unrestricted Oracle database (TCP 1521) access"""
     response = describe_security_groups(cache)
@@ -1058,6 +1003,8 @@ def security_group_open_oracle_check(cache: dict, awsAccountId: str, awsRegion:
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1208,7 +1155,7 @@ def security_group_open_oracle_check(cache: dict, awsAccountId: str, awsRegion:
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_mysql_mariadb_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.8] Security groups should not allow unrestricted MySQL or MariaDB database (TCP 3306) access"""
     response = describe_security_groups(cache)
@@ -1217,6 +1164,8 @@ def security_group_open_mysql_mariadb_check(cache: dict, awsAccountId: str, awsR
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1373,7 +1322,7 @@ def security_group_open_mysql_mariadb_check(cache: dict, awsAccountId: str, awsR
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_rdp_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.9] Security groups should not allow unrestricted Remote Desktop Protocol (RDP) access"""
     response = describe_security_groups(cache)
@@ -1382,6 +1331,8 @@ def security_group_open_rdp_check(cache: dict, awsAccountId: str, awsRegion: str
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1560,7 +1511,7 @@ def security_group_open_rdp_check(cache: dict, awsAccountId: str, awsRegion: str
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_postgresql_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.10] Security groups should not allow unrestricted PostgreSQL datbase (TCP 5432) access"""
     response = describe_security_groups(cache)
@@ -1569,6 +1520,8 @@ def security_group_open_postgresql_check(cache: dict, awsAccountId: str, awsRegi
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1719,7 +1672,7 @@ def security_group_open_postgresql_check(cache: dict, awsAccountId: str, awsRegi
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_kibana_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.11] Security groups should not allow unrestricted access to Kibana (TCP 5601)"""
     response = describe_security_groups(cache)
@@ -1728,6 +1681,8 @@ def security_group_open_kibana_check(cache: dict, awsAccountId: str, awsRegion:
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -1906,7 +1861,7 @@ def security_group_open_kibana_check(cache: dict, awsAccountId: str, awsRegion:
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_redis_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.12] Security groups should not allow unrestricted Redis (TCP 6379) access"""
     response = describe_security_groups(cache)
@@ -1915,6 +1870,8 @@ def security_group_open_redis_check(cache: dict, awsAccountId: str, awsRegion: s
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2093,7 +2050,7 @@ def security_group_open_redis_check(cache: dict, awsAccountId: str, awsRegion: s
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_splunkd_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.13] Security groups should not allow unrestricted Splunkd (TCP 8089) access"""
     response = describe_security_groups(cache)
@@ -2102,6 +2059,8 @@ def security_group_open_splunkd_check(cache: dict, awsAccountId: str, awsRegion:
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2280,7 +2239,7 @@ def security_group_open_splunkd_check(cache: dict, awsAccountId: str, awsRegion:
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_elasticsearch1_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.14] Security groups should not allow unrestricted Elasticsearch (TCP 9200) access"""
     response = describe_security_groups(cache)
@@ -2289,6 +2248,8 @@ def security_group_open_elasticsearch1_check(cache: dict, awsAccountId: str, aws
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2445,7 +2406,7 @@ def security_group_open_elasticsearch1_check(cache: dict, awsAccountId: str, aws
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_elasticsearch2_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.15] Security groups should not allow unrestricted Elasticsearch (TCP 9300) access"""
     response = describe_security_groups(cache)
@@ -2454,6 +2415,8 @@ def security_group_open_elasticsearch2_check(cache: dict, awsAccountId: str, aws
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2610,7 +2573,7 @@ def security_group_open_elasticsearch2_check(cache: dict, awsAccountId: str, aws
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_memcached_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.16] Security groups should not allow unrestricted Memcached (UDP 11211) access"""
     response = describe_security_groups(cache)
@@ -2619,6 +2582,8 @@ def security_group_open_memcached_check(cache: dict, awsAccountId: str, awsRegio
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2807,7 +2772,7 @@ def security_group_open_memcached_check(cache: dict, awsAccountId: str, awsRegio
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_redshift_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.17] Security groups should not allow unrestricted Redshift (TCP 5439) access"""
     response = describe_security_groups(cache)
@@ -2816,6 +2781,8 @@ def security_group_open_redshift_check(cache: dict, awsAccountId: str, awsRegion
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -2966,7 +2933,7 @@ def security_group_open_redshift_check(cache: dict, awsAccountId: str, awsRegion
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_documentdb_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.18] Security groups should not allow unrestricted DocumentDB (TCP 27017) access"""
     response = describe_security_groups(cache)
@@ -2975,6 +2942,8 @@ def security_group_open_documentdb_check(cache: dict, awsAccountId: str, awsRegi
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3125,7 +3094,7 @@ def security_group_open_documentdb_check(cache: dict, awsAccountId: str, awsRegi
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_cassandra_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.19] Security groups should not allow unrestricted Cassandra (TCP 9142) access"""
     response = describe_security_groups(cache)
@@ -3134,6 +3103,8 @@ def security_group_open_cassandra_check(cache: dict, awsAccountId: str, awsRegio
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3284,7 +3255,7 @@ def security_group_open_cassandra_check(cache: dict, awsAccountId: str, awsRegio
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_kafka_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.20] Security groups should not allow unrestricted Kafka streams (TCP 9092) access"""
     response = describe_security_groups(cache)
@@ -3293,6 +3264,8 @@ def security_group_open_kafka_check(cache: dict, awsAccountId: str, awsRegion: s
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3443,7 +3416,7 @@ def security_group_open_kafka_check(cache: dict, awsAccountId: str, awsRegion: s
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_nfs_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.21] Security groups should not allow unrestricted NFS (TCP 2049) access"""
     response = describe_security_groups(cache)
@@ -3452,6 +3425,8 @@ def security_group_open_nfs_check(cache: dict, awsAccountId: str, awsRegion: str
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3602,7 +3577,7 @@ def security_group_open_nfs_check(cache: dict, awsAccountId: str, awsRegion: str
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_rsync_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.22] Security groups should not allow unrestricted Rsync (TCP 873) access"""
     response = describe_security_groups(cache)
@@ -3611,6 +3586,8 @@ def security_group_open_rsync_check(cache: dict, awsAccountId: str, awsRegion: s
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3761,7 +3738,7 @@ def security_group_open_rsync_check(cache: dict, awsAccountId: str, awsRegion: s
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_tftp_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.23] Security groups should not allow unrestricted TFTP (UDP 69) access"""
     response = describe_security_groups(cache)
@@ -3770,6 +3747,8 @@ def security_group_open_tftp_check(cache: dict, awsAccountId: str, awsRegion: st
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
@@ -3920,7 +3899,7 @@ def security_group_open_tftp_check(cache: dict, awsAccountId: str, awsRegion: st
                 else:
                     continue
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", fanout=0)
 def security_group_open_docker_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[SecurityGroup.24] Security groups should not allow unrestricted Docker (TCP 2375) access"""
     response = describe_security_groups(cache)
@@ -3929,6 +3908,8 @@ def security_group_open_docker_check(cache: dict, awsAccountId: str, awsRegion:
         sgName = str(secgroup["GroupName"])
         sgId = str(secgroup["GroupId"])
         sgArn = f"arn:{awsPartition}:ec2:{awsRegion}:{awsAccountId}:security-group/{sgId}"
+        if not registry.in_scope(sgArn, vpc_id=secgroup.get("VpcId")):
+            continue
         for permissions in secgroup["IpPermissions"]:
             try:
                 fromPort = str(permissions["FromPort"])
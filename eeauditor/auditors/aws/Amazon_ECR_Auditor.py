@@ -531,7 +531,7 @@ def ecr_latest_image_vuln_check(cache: dict, awsAccountId: str, awsRegion: str,
         else:
             pass
 
-@registry.register_check("ecr")
+@registry.register_check("ecr", fanout=0, account_level=True)
 def ecr_registry_policy_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[ECR.5] ECR Registires should be have a registry policy configured to allow for cross-account recovery"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -656,7 +656,7 @@ def ecr_registry_policy_check(cache: dict, awsAccountId: str, awsRegion: str, aw
     except Exception as e:
         print(e)
 
-@registry.register_check("ecr")
+@registry.register_check("ecr", fanout=0, account_level=True)
 def ecr_registry_backup_rules_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[ECR.6] ECR Registires should use image replication to promote disaster recovery readiness"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -1121,7 +1121,7 @@ def emr_cluster_logging_check(cache: dict, awsAccountId: str, awsRegion: str, aw
             else:
                 print(e)
 
-@registry.register_check("emr")
+@registry.register_check("emr", fanout=0, account_level=True)
 def emr_cluster_block_secgroup_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[EMR.8] EMR account-level public security group access block should be enabled"""
     response = list_clusters(cache)
@@ -40,6 +40,8 @@ def bucket_encryption_check(cache: dict, awsAccountId: str, awsRegion: str, awsP
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         try:
             response = s3.get_bucket_encryption(Bucket=bucketName)
             for rules in response["ServerSideEncryptionConfiguration"]["Rules"]:
@@ -163,6 +165,8 @@ def bucket_lifecycle_check(cache: dict, awsAccountId: str, awsRegion: str, awsPa
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         iso8601Time = (
             datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         )
@@ -293,6 +297,8 @@ def bucket_versioning_check(cache: dict, awsAccountId: str, awsRegion: str, awsP
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         iso8601Time = (
             datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         )
@@ -421,6 +427,8 @@ def bucket_policy_allows_public_access_check(cache: dict, awsAccountId: str, aws
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         iso8601Time = (
             datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         )
@@ -555,6 +563,8 @@ def bucket_policy_check(cache: dict, awsAccountId: str, awsRegion: str, awsParti
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         iso8601Time = (
             datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         )
@@ -686,6 +696,8 @@ def bucket_access_logging_check(cache: dict, awsAccountId: str, awsRegion: str,
     for buckets in myS3Buckets:
         bucketName = str(buckets["Name"])
         s3Arn = f"arn:{awsPartition}:s3:::{bucketName}"
+        if not registry.in_scope(s3Arn):
+            continue
         iso8601Time = (
             datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
         )
@@ -802,7 +814,7 @@ def bucket_access_logging_check(cache: dict, awsAccountId: str, awsRegion: str,
             else:
                 print(e)
 
-@registry.register_check("s3")
+@registry.register_check("s3", fanout=0, account_level=True)
 def s3_account_level_block(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[S3.7] Account-level S3 public access block should be configured"""
     response = s3control.get_public_access_block(AccountId=awsAccountId)
@@ -17,7 +17,7 @@ ec2 = boto3.client("ec2")
 cloudformation = boto3.client("cloudformation")
 ecs = boto3.client("ecs")
 
-@registry.register_check("codebuild")
+@registry.register_check("codebuild", cpu_bound=True)
 def secret_scan_codebuild_envvar_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[Secrets.CodeBuild.1] CodeBuild Project environment variables should not have secrets stored in Plaintext"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -197,7 +197,7 @@ def secret_scan_codebuild_envvar_check(cache: dict, awsAccountId: str, awsRegion
         del readjson
         del data
 
-@registry.register_check("cloudformation")
+@registry.register_check("cloudformation", cpu_bound=True)
 def secret_scan_cloudformation_parameters_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[Secrets.CloudFormation.1] CloudFormation Stack parameters should not have secrets stored in Plaintext"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -383,7 +383,7 @@ def secret_scan_cloudformation_parameters_check(cache: dict, awsAccountId: str,
                 print(error)
                 continue
 
-@registry.register_check("ecs")
+@registry.register_check("ecs", cpu_bound=True)
 def secret_scan_ecs_task_def_envvar_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[Secrets.ECS.1] ECS Task Definition environment variables should not have secrets stored in Plaintext"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -562,7 +562,7 @@ def secret_scan_ecs_task_def_envvar_check(cache: dict, awsAccountId: str, awsReg
             del readjson
             del data
 
-@registry.register_check("ec2")
+@registry.register_check("ec2", cpu_bound=True)
 def secret_scan_ec2_userdata_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
     """[Secrets.EC2.1] EC2 User Data should not have secrets stored in Plaintext"""
     iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
@@ -1,17 +1,51 @@
 from functools import wraps
 
+# Priority tiers used by the priority scheduling mode, tier 1 runs first
+SEVERITY_PRIORITY = {
+    "CRITICAL": 1,
+    "HIGH": 2,
+    "MEDIUM": 3,
+    "LOW": 4,
+    "INFORMATIONAL": 4,
+}
+DEFAULT_PRIORITY = 4
+# API calls a check is expected to make per resource on top of its list call
+DEFAULT_FANOUT = 1
+
+
 class CheckRegister(object):
     checks = {}
+    # ScanScope shared by every Auditor, None scans every resource
+    scope = None
 
-    def register_check(self, service_name):
+    def register_check(
+        self,
+        service_name,
+        priority=None,
+        fanout=DEFAULT_FANOUT,
+        account_level=False,
+        cpu_bound=False,
+    ):
         """Decorator registers event handlers
 
         Args:
             event_type: A string that matches the event type the wrapped function
             will process.
+            priority: Optional priority tier (1 is the most urgent). When it is not
+            provided it is derived from the highest severity the check can emit.
+            fanout: Number of API calls the check makes per resource, used by the
+            scan planner to estimate the size of a scan.
+            account_level: True when the check evaluates an account wide setting
+            instead of individual resources.
+            cpu_bound: True when the check spends most of its time parsing or
+            evaluating data, these checks can be sent to a process pool.
         """
 
         def decorator_register(func):
+            func.priority = priority if priority else infer_priority(func)
+            func.fanout = fanout
+            func.account_level = account_level
+            func.cpu_bound = cpu_bound
             if service_name not in self.checks:
                 self.checks[service_name] = {func.__name__: func}
             else:
@@ -25,6 +59,31 @@ class CheckRegister(object):
 
         return decorator_register
 
+    def in_scope(self, arn, vpc_id=None):
+        """Returns False for resources outside the scan scope so their detail calls can be skipped"""
+        if self.scope is None:
+            return True
+        return self.scope.in_scope(arn, vpc_id=vpc_id)
+
+
+def infer_priority(func):
+    """Returns the priority tier of the highest severity label a check can emit
+
+    Severity labels are string constants within the check so they can be read from
+    the compiled code object without having to run the check.
+    """
+    tier = DEFAULT_PRIORITY
+    consts = list(func.__code__.co_consts)
+    while consts:
+        const = consts.pop()
+        if isinstance(const, str):
+            tier = min(tier, SEVERITY_PRIORITY.get(const, DEFAULT_PRIORITY))
+        elif isinstance(const, (tuple, frozenset)):
+            consts.extend(const)
+        elif hasattr(const, "co_consts"):
+            consts.extend(const.co_consts)
+    return tier
+
 
 def accumulate_paged_results(page_iterator, key):
     results = {key: []}
@@ -0,0 +1,81 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+SECONDS_PER_DAY = 86400
+
+
+def flags(records, getter):
+    """Projects a boolean field of every record into a column, missing values are False"""
+    values = [bool(getter(record)) for record in records]
+    return pa.array(values, type=pa.bool_()) if pa is not None else values
+
+
+def epoch_seconds(records, getter):
+    """Projects a datetime field of every record into a column of Unix timestamps"""
+    values = [getter(record).timestamp() for record in records]
+    return pa.array(values, type=pa.float64()) if pa is not None else values
+
+
+def labels(records, getter):
+    """Projects a string or enum field of every record into a column"""
+    values = [getter(record) for record in records]
+    return pa.array(values, type=pa.string()) if pa is not None else values
+
+
+def negate(mask):
+    if pa is not None:
+        return pc.invert(mask)
+    return [not value for value in mask]
+
+
+def not_equal(column, value):
+    if pa is not None:
+        return pc.not_equal(column, value)
+    return [item != value for item in column]
+
+
+def older_than(epochs, days, now=None):
+    """Mask of the timestamps at least days old"""
+    cutoff = (now if now is not None else time.time()) - days * SECONDS_PER_DAY
+    if pa is not None:
+        return pc.less_equal(epochs, cutoff)
+    return [epoch <= cutoff for epoch in epochs]
+
+
+def to_list(mask):
+    return mask.to_pylist() if pa is not None else list(mask)
+
+
+def explode(records, key):
+    """Pairs each record with every item of its key list, e.g. a volume with its attachments"""
+    return [(record, item) for record in records for item in record.get(key) or ()]
+
+
+def rows(failed, arns, registry):
+    """Yields (row, failed) for every row within the scan scope, in the order of the inventory
+
+    Only this step runs per row, the masks themselves are evaluated a column at a time.
+    """
+    for row, is_failed in enumerate(to_list(failed)):
+        if registry.scope is None or registry.in_scope(arns[row]):
+            yield row, is_failed
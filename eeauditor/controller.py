@@ -14,13 +14,23 @@
 # If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
 
 import getopt
+import json
 import os
 import sys
+import time
 import boto3
 import click
+import metrics
+import tracing
 from insights import create_sechub_insights
 from eeauditor import EEAuditor
+from check_register import CheckRegister
+from planner import ScanPlanner
+from result_cache import get_result_cache
+from scan_scope import ScanScope
+from processor.diff import CHANGES, delta_finding, diff_scans
 from processor.main import get_providers, process_findings
+from processor.outputs.sqlite import finding_changes, query_findings
 
 
 def print_checks():
@@ -29,17 +39,86 @@ def print_checks():
     app.print_checks_md()
 
 
-def run_auditor(auditor_name=None, check_name=None, delay=0, outputs=None, output_file=""):
-    if not outputs:
-        outputs = ["sechub"]
+def plan_scan(auditor_name=None, check_name=None, workers=1, counts_file=None, runs_per_month=30):
     app = EEAuditor(name="AWS Auditor")
     app.load_plugins(plugin_name=auditor_name)
-    findings = list(app.run_checks(requested_check_name=check_name, delay=delay))
-    result = process_findings(findings=findings, outputs=outputs, output_file=output_file)
+    planner = ScanPlanner(
+        app, counts_file=counts_file, workers=workers, runs_per_month=runs_per_month
+    )
+    planner.print_plan_md(requested_check_name=check_name)
+
+
+def run_auditor(
+    auditor_name=None,
+    check_name=None,
+    delay=0,
+    outputs=None,
+    output_file="",
+    priority_first=False,
+    result_cache=None,
+    result_cache_ttl=3600,
+    invalidate_services=(),
+    scope=None,
+    process_pool_workers=0,
+    required_outputs=(),
+    aggregate_outputs=(),
+    profile_name=None,
+):
+    if not outputs:
+        outputs = ["sechub"]
+    # botocore is instrumented before any client of the scan is created
+    metrics_enabled = metrics.configure()
+    tracing.configure()
+    scan_start = time.monotonic()
+    with tracing.span("scan", {"electriceye.outputs": ",".join(outputs)}):
+        app = EEAuditor(name="AWS Auditor")
+        app.process_pool_workers = process_pool_workers
+        app.profile_name = profile_name
+        if scope:
+            CheckRegister.scope = scope.resolve()
+        if result_cache:
+            app.result_cache = get_result_cache(result_cache, ttl=result_cache_ttl)
+            for service_name in invalidate_services:
+                app.result_cache.invalidate(
+                    app.awsAccountId, app.awsRegion, None if service_name == "all" else service_name
+                )
+        app.load_plugins(plugin_name=auditor_name)
+        if priority_first:
+            findings = priority_first_findings(app, check_name=check_name, delay=delay)
+        else:
+            findings = app.run_checks(requested_check_name=check_name, delay=delay)
+        # findings stream into the outputs while the checks are still running
+        result = process_findings(
+            findings=findings,
+            outputs=outputs,
+            required_outputs=required_outputs,
+            aggregate_outputs=aggregate_outputs,
+            output_file=output_file,
+        )
+    tracing.shutdown()
+    if metrics_enabled:
+        metrics.SCAN_DURATION.set(time.monotonic() - scan_start)
+        metrics.LAST_SCAN.set(time.time())
+        metrics.record_result_cache(app.result_cache)
+        metrics.publish()
     print(f"Done.")
+    return result
+
 
+def priority_first_findings(app, check_name=None, delay=0):
+    """Runs tier 1 checks first and every other tier after them, as one stream of findings
 
-@click.command()
+    Findings reach the outputs as soon as they are found, so tier 1 findings are written
+    before any other check runs while the scan stays a single run for every output.
+    """
+    tiers = app.get_priority_tiers()
+    if tiers:
+        print(f"Running priority tier {tiers[0]} checks first")
+    for tier in tiers:
+        yield from app.run_checks(requested_check_name=check_name, delay=delay, priority=tier)
+
+
+@click.group(invoke_without_command=True)
 @click.option("-p", "--profile-name", default="", help="User profile to use")
 @click.option(
     "-a", "--auditor-name", default="", help="Auditor to test defaulting to all auditors"
@@ -55,6 +134,66 @@ def run_auditor(auditor_name=None, check_name=None, delay=0, outputs=None, outpu
     help="Outputs for findings",
 )
 @click.option("--output-file", default="output", show_default=True, help="File to output findings")
+@click.option(
+    "--required-output",
+    multiple=True,
+    help="Output that must succeed or ElectricEye exits with an error, use all to require every output",
+)
+@click.option(
+    "--aggregate-passed",
+    multiple=True,
+    help="Output that gets PASSED findings rolled up per check, account and region, use all for every output",
+)
+@click.option(
+    "--priority-first",
+    is_flag=True,
+    help="Run checks that can emit CRITICAL findings first, writing their findings before any other check runs",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    help="Estimate API calls, runtime, findings and cost of a scan using only inventory list calls",
+)
+@click.option("--plan-workers", default=1, show_default=True, help="Workers to estimate runtime for")
+@click.option(
+    "--plan-counts-file",
+    default=None,
+    help="JSON file of cached resource counts per resource type, written back after planning",
+)
+@click.option(
+    "--plan-runs-per-month", default=30, show_default=True, help="Scans per month to estimate cost for"
+)
+@click.option(
+    "--result-cache",
+    default=None,
+    help="Local directory, s3://bucket/prefix or dynamodb://table caching account level check results",
+)
+@click.option(
+    "--result-cache-ttl", default=3600, show_default=True, help="Seconds cached results are reused for"
+)
+@click.option(
+    "--invalidate-result-cache",
+    multiple=True,
+    help="Service whose cached results are dropped before the scan, use all to drop everything",
+)
+@click.option(
+    "--scope-tag",
+    multiple=True,
+    help="Only audit resources with this tag, as key=value or key, repeat a key to match any value",
+)
+@click.option("--scope-include-arn", multiple=True, help="ARN pattern (with * wildcards) to audit")
+@click.option("--scope-exclude-arn", multiple=True, help="ARN pattern (with * wildcards) to skip")
+@click.option(
+    "--scope-vpc-id",
+    multiple=True,
+    help="Only audit VPC resources within this VPC, taken from the VpcId in each finding's resource details",
+)
+@click.option(
+    "--process-pool-workers",
+    default=0,
+    show_default=True,
+    help="Run CPU bound checks within a pool of this many processes, 0 runs them inline",
+)
 @click.option("--list-options", is_flag=True, help="List output options")
 @click.option("--list-checks", is_flag=True, help="List all checks")
 @click.option(
@@ -62,17 +201,37 @@ def run_auditor(auditor_name=None, check_name=None, delay=0, outputs=None, outpu
     is_flag=True,
     help="Create SecurityHub insights for ElectricEye.  This only needs to be done once per SecurityHub instance",
 )
+@click.pass_context
 def main(
+    ctx,
     profile_name,
     auditor_name,
     check_name,
     delay,
     outputs,
     output_file,
+    required_output,
+    aggregate_passed,
+    priority_first,
+    plan,
+    plan_workers,
+    plan_counts_file,
+    plan_runs_per_month,
+    result_cache,
+    result_cache_ttl,
+    invalidate_result_cache,
+    scope_tag,
+    scope_include_arn,
+    scope_exclude_arn,
+    scope_vpc_id,
+    process_pool_workers,
     list_options,
     list_checks,
     create_insights,
 ):
+    if ctx.invoked_subcommand:
+        return
+
     if list_options:
         print(get_providers())
         sys.exit(2)
@@ -88,13 +247,144 @@ def main(
         create_sechub_insights()
         sys.exit(2)
 
-    run_auditor(
+    if plan:
+        plan_scan(
+            auditor_name=auditor_name,
+            check_name=check_name,
+            workers=plan_workers,
+            counts_file=plan_counts_file,
+            runs_per_month=plan_runs_per_month,
+        )
+        sys.exit(2)
+
+    scope = None
+    if scope_tag or scope_include_arn or scope_exclude_arn or scope_vpc_id:
+        scope = ScanScope(
+            tag_filters=scope_tag,
+            include_arns=scope_include_arn,
+            exclude_arns=scope_exclude_arn,
+            vpc_ids=scope_vpc_id,
+        )
+
+    result = run_auditor(
         auditor_name=auditor_name,
         check_name=check_name,
         delay=delay,
         outputs=outputs,
         output_file=output_file,
+        priority_first=priority_first,
+        result_cache=result_cache,
+        result_cache_ttl=result_cache_ttl,
+        invalidate_services=invalidate_result_cache,
+        scope=scope,
+        process_pool_workers=process_pool_workers,
+        required_outputs=required_output,
+        aggregate_outputs=aggregate_passed,
+        profile_name=profile_name or None,
+    )
+    if not result:
+        sys.exit(1)
+
+
+@main.command()
+@click.option("--database", default="output.db", show_default=True, help="SQLite database of the sqlite output")
+@click.option("--status", default=None, help="Compliance status such as FAILED or PASSED")
+@click.option("--severity", default=None, help="Severity label such as CRITICAL")
+@click.option("--account", default=None, help="AWS Account ID")
+@click.option("--region", default=None, help="AWS Region")
+@click.option("--control", default=None, help="Compliance control, * wildcards allowed e.g. 'CIS*'")
+@click.option("--resource-arn", default=None, help="Resource ARN, * wildcards allowed")
+@click.option("--all-runs", is_flag=True, help="Include findings not reported by the latest run")
+@click.option(
+    "--changes",
+    is_flag=True,
+    help="Show what changed between the last two runs of each account and region instead",
+)
+@click.option("--json", "as_json", is_flag=True, help="Print results as JSON")
+def query(database, status, severity, account, region, control, resource_arn, all_runs, changes, as_json):
+    """Query findings stored by the sqlite output"""
+    if not os.path.exists(database):
+        print(f"Database {database} does not exist, run a scan with -o sqlite first")
+        sys.exit(1)
+    if changes:
+        results = finding_changes(database, account=account, region=region)
+        if as_json:
+            print(json.dumps(results, indent=2))
+            return
+        for change, rows in results.items():
+            print(f"{change}: {len(rows)}")
+            for row in rows:
+                print(f"  {row['severity']}\t{row['account_id']}\t{row['region']}\t{row['id']}")
+        return
+    rows = query_findings(
+        database,
+        status=status,
+        severity=severity,
+        account=account,
+        region=region,
+        control=control,
+        resource_arn=resource_arn,
+        latest_run_only=not all_runs,
     )
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        print(
+            f"{row['compliance_status']}\t{row['severity']}\t{row['account_id']}\t{row['region']}\t"
+            f"{row['title']}\t{row['resources']}"
+        )
+    print(f"{len(rows)} findings")
+
+
+@main.command()
+@click.argument("old_scan")
+@click.argument("new_scan")
+@click.option(
+    "-o",
+    "--outputs",
+    multiple=True,
+    help="Outputs to send the changed findings to, disappeared findings are sent archived",
+)
+@click.option("--output-file", default="diff", show_default=True, help="File to output changed findings")
+@click.option(
+    "--buckets",
+    default=64,
+    show_default=True,
+    help="Hashed buckets the scans are spread over on disk, memory holds about one of them",
+)
+@click.option("--work-dir", default=None, help="Directory for the bucket files, the system temp directory by default")
+@click.option("--json", "as_json", is_flag=True, help="Print each change as a line of JSON")
+def diff(old_scan, new_scan, outputs, output_file, buckets, work_dir, as_json):
+    """Compare two scan outputs (JSON, NDJSON, Parquet or SQLite) finding by finding"""
+    for path in (old_scan, new_scan):
+        if not os.path.exists(path):
+            print(f"Scan output {path} does not exist")
+            sys.exit(1)
+    counts = dict.fromkeys(CHANGES, 0)
+
+    def changes():
+        for change, finding in diff_scans(old_scan, new_scan, buckets=buckets, work_dir=work_dir):
+            counts[change] += 1
+            if as_json:
+                print(json.dumps({"Change": change, "Id": finding["Id"], "Finding": finding}))
+            else:
+                print(
+                    f"{change}\t{finding.get('Severity', {}).get('Label')}\t{finding.get('AwsAccountId')}\t"
+                    f"{finding['Id']}"
+                )
+            yield delta_finding(change, finding)
+
+    if outputs:
+        result = process_findings(findings=changes(), outputs=outputs, output_file=output_file)
+    else:
+        result = True
+        for _ in changes():
+            pass
+    if not as_json:
+        print(", ".join(f"{count} {change.replace('_', ' ')}" for change, count in counts.items()))
+    if not result:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -12,19 +12,164 @@
 
 # You should have received a copy of the GNU General Public License along with ElectricEye.
 # If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from functools import partial
 import inspect
 import json
+import multiprocessing
 import os
-from time import sleep
+from time import perf_counter, sleep
 import re
 import boto3
-from check_register import CheckRegister, accumulate_paged_results
+from check_register import DEFAULT_PRIORITY, CheckRegister, accumulate_paged_results
+from finding_factory import to_asff
+import tracing
+from metrics import CHECK_DURATION, timed_findings
 from pluginbase import PluginBase
 
 here = os.path.abspath(os.path.dirname(__file__))
 get_path = partial(os.path.join, here)
 ssm = boto3.client("ssm")
+# plugin source of a process pool worker, loaded once per worker process
+_worker_source = None
+
+
+def init_worker(search_path, profile_name, awsRegion, scope):
+    """Sets a process pool worker up like the scan that started it
+
+    Spawned workers start with a fresh default boto3 session, so the profile and
+    region of the scan are set up again before any Auditor creates its clients.
+    """
+    global _worker_source
+    boto3.setup_default_session(profile_name=profile_name, region_name=awsRegion)
+    CheckRegister.scope = scope
+    _worker_source = PluginBase(package="electriceye").make_plugin_source(
+        searchpath=[search_path], identifier="process pool worker"
+    )
+
+
+def run_check_in_process(plugin_name, service_name, check_name, awsAccountId, awsRegion, awsPartition):
+    """Runs a check within a process pool worker and returns its findings and duration
+
+    The worker loads the Auditor itself so it creates its own boto3 clients, only
+    names, the findings and the seconds the check took are pickled between the processes.
+    """
+    if check_name not in CheckRegister.checks.get(service_name, {}):
+        _worker_source.load_plugin(plugin_name)
+    check = CheckRegister.checks[service_name][check_name]
+    start = perf_counter()
+    findings = list(
+        check(cache={}, awsAccountId=awsAccountId, awsRegion=awsRegion, awsPartition=awsPartition)
+    )
+    return findings, perf_counter() - start
+
+
+class PooledChecks(object):
+    """CPU bound checks running within a process pool alongside the inline checks
+
+    Every check is submitted up front, ready() hands over the findings of the checks
+    done so far and finish() waits for the rest. A worker that crashes breaks the
+    whole pool, so the checks that did not finish are retried once, each within its
+    own pool, to isolate the crashing check. Like inline checks, account level checks
+    go through the result cache and every check gets its duration metric and span,
+    the API calls made within the workers are not traced.
+    """
+
+    def __init__(self, app, pooled_checks):
+        self.app = app
+        self.pending = {
+            check_name: (service_name, check) for service_name, check_name, check in pooled_checks
+        }
+        # check spans are recorded under the span the pooled checks were started in
+        self.trace_context = tracing.current_context()
+        self.cached = []
+        for check_name, (service_name, check) in list(self.pending.items()):
+            findings = app.cached_findings(service_name, check_name, check)
+            if findings is not None:
+                self.cached.extend(findings)
+                self.pending.pop(check_name)
+        self.context = multiprocessing.get_context("spawn")
+        self.pool = self.new_pool(app.process_pool_workers)
+        self.futures = {}
+        for check_name in self.pending:
+            self.submit(self.pool, check_name)
+
+    def new_pool(self, workers):
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=self.context,
+            initializer=init_worker,
+            initargs=(
+                self.app.search_path,
+                self.app.profile_name,
+                self.app.awsRegion,
+                self.app.registry.scope,
+            ),
+        )
+
+    def submit(self, pool, check_name):
+        service_name, check = self.pending[check_name]
+        future = pool.submit(
+            run_check_in_process,
+            check.__module__.rpartition(".")[2],
+            service_name,
+            check_name,
+            self.app.awsAccountId,
+            self.app.awsRegion,
+            self.app.awsPartition,
+        )
+        self.futures[future] = check_name
+        return future
+
+    def collect(self, future):
+        check_name = self.futures.pop(future)
+        try:
+            findings, seconds = future.result()
+        except BrokenProcessPool:
+            # left pending to be retried on its own
+            return []
+        except Exception as e:
+            print(f"Failed to execute check {check_name} with exception {e}")
+            self.pending.pop(check_name)
+            return []
+        service_name, check = self.pending.pop(check_name)
+        CHECK_DURATION.observe(seconds, service=service_name, check=check_name)
+        tracing.record_span(
+            f"check {check_name}",
+            seconds,
+            self.trace_context,
+            {
+                "aws.service": service_name,
+                "electriceye.check": check_name,
+                "electriceye.findings": len(findings),
+            },
+        )
+        return self.app.cache_findings(service_name, check_name, check, findings)
+
+    def ready(self):
+        """Findings of the pooled checks that are done, without waiting for the others"""
+        cached, self.cached = self.cached, []
+        for finding in cached:
+            yield finding
+        for future in [future for future in self.futures if future.done()]:
+            for finding in self.collect(future):
+                yield finding
+
+    def finish(self):
+        """Findings of the remaining pooled checks as they complete"""
+        for finding in self.ready():
+            yield finding
+        for future in as_completed(list(self.futures)):
+            for finding in self.collect(future):
+                yield finding
+        self.pool.shutdown()
+        for check_name in list(self.pending):
+            with self.new_pool(1) as pool:
+                for finding in self.collect(self.submit(pool, check_name)):
+                    yield finding
+        for check_name in self.pending:
+            print(f"Failed to execute check {check_name}, its worker process crashed")
 
 
 class EEAuditor(object):
@@ -50,10 +195,19 @@ class EEAuditor(object):
             self.awsPartition = "aws-us-gov"
         elif self.awsRegion in ["cn-north-1", "cn-northwest-1"]:
             self.awsPartition = "aws-cn"
+        # findings of account level checks are reused from here while they are fresh
+        self.result_cache = None
+        # cpu bound checks run within a process pool of this size, 0 runs them inline
+        self.process_pool_workers = 0
+        # profile of the default boto3 session, set up again within pool workers
+        self.profile_name = None
+        # regions of each service, looked up once per scan
+        self.service_regions = {}
+        self.search_path = get_path(search_path)
         # If there is a desire to add support for multiple clouds, this would be
         # a great place to implement it.
         self.source = self.plugin_base.make_plugin_source(
-            searchpath=[get_path(search_path)], identifier=self.name
+            searchpath=[self.search_path], identifier=self.name
         )
 
     def load_plugins(self, plugin_name=None):
@@ -81,6 +235,8 @@ class EEAuditor(object):
             service = 'waf'
         else:
             service = service
+        if service in self.service_regions:
+            return self.service_regions[service]
         paginator = ssm.get_paginator("get_parameters_by_path")
         response_iterator = paginator.paginate(
             Path=f"/aws/service/global-infrastructure/services/{service}/regions",
@@ -91,9 +247,20 @@ class EEAuditor(object):
         values = []
         for parameter in results["Parameters"]:
             values.append(parameter["Value"])
+        self.service_regions[service] = values
         return values
 
-    def run_checks(self, requested_check_name=None, delay=0):
+    def get_priority_tiers(self):
+        """Returns the sorted priority tiers of all loaded checks"""
+        return sorted(
+            {
+                getattr(check, "priority", DEFAULT_PRIORITY)
+                for check_list in self.registry.checks.values()
+                for check in check_list.values()
+            }
+        )
+
+    def run_checks(self, requested_check_name=None, delay=0, priority=None):
         # TODO: Add multi-region capabilities here
         '''
         regionList = []
@@ -109,33 +276,129 @@ class EEAuditor(object):
         for region in regionList:
             ### TODO: Implement Below... ###
         '''
+        selected_checks = {}
+        pooled_checks = []
         for service_name, check_list in self.registry.checks.items():
+            for check_name, check in check_list.items():
+                # when a priority tier is requested only the checks within it are run
+                if priority and getattr(check, "priority", DEFAULT_PRIORITY) != priority:
+                    continue
+                # if a specific check is requested, only run that one check
+                if requested_check_name and requested_check_name != check_name:
+                    continue
+                if self.process_pool_workers and getattr(check, "cpu_bound", False):
+                    pooled_checks.append((service_name, check_name, check))
+                else:
+                    selected_checks.setdefault(service_name, {})[check_name] = check
+        # pooled checks start first so they overlap with the I/O bound inline checks
+        pool = PooledChecks(self, pooled_checks) if pooled_checks else None
+
+        region_span = tracing.start_span(
+            f"region {self.awsRegion}",
+            attributes={"aws.account_id": self.awsAccountId, "aws.region": self.awsRegion},
+        )
+        for service_name, check_list in selected_checks.items():
             if self.awsRegion not in self.get_regions(service_name):
                 print(f"AWS region {self.awsRegion} not supported for {service_name}")
                 next
 
+            service_span = tracing.start_span(
+                f"service {service_name}", region_span, {"aws.service": service_name}
+            )
             for check_name, check in check_list.items():
                 # clearing cache for each control whithin a auditor
                 auditor_cache = {}
-                # if a specific check is requested, only run that one check
-                if (
-                    not requested_check_name
-                    or requested_check_name
-                    and requested_check_name == check_name
-                ):
-                    try:
-                        # print(f"Executing check {self.name}.{check_name}")
-                        for finding in check(
-                            cache=auditor_cache,
-                            awsAccountId=self.awsAccountId,
-                            awsRegion=self.awsRegion,
-                            awsPartition=self.awsPartition,
-                        ):
-                            yield finding
-                    except Exception as e:
-                        print(f"Failed to execute check {check_name} with exception {e}")
+                check_span = tracing.start_span(
+                    f"check {check_name}",
+                    service_span,
+                    {"aws.service": service_name, "electriceye.check": check_name},
+                )
+                try:
+                    # print(f"Executing check {self.name}.{check_name}")
+                    for finding in tracing.traced_findings(
+                        timed_findings(
+                            self.execute_check(service_name, check_name, check, auditor_cache),
+                            service_name,
+                            check_name,
+                        ),
+                        check_span,
+                    ):
+                        if self.registry.scope and not self.finding_in_scope(finding):
+                            continue
+                        yield finding
+                except Exception as e:
+                    print(f"Failed to execute check {check_name} with exception {e}")
+                if pool:
+                    for finding in self.scoped(pool.ready()):
+                        yield finding
+            tracing.end_span(service_span)
             sleep(delay)
 
+        if pool:
+            for finding in self.scoped(pool.finish()):
+                yield finding
+        tracing.end_span(region_span)
+
+    def scoped(self, findings):
+        for finding in findings:
+            if self.registry.scope and not self.finding_in_scope(finding):
+                continue
+            yield finding
+
+    def finding_in_scope(self, finding):
+        """Drops findings of Auditors that do not check the scan scope themselves"""
+        for resource in finding.get("Resources", []):
+            if not self.registry.scope.resource_in_scope(resource):
+                return False
+        return True
+
+    def caches(self, check):
+        return self.result_cache is not None and getattr(check, "account_level", False)
+
+    def cached_findings(self, service_name, check_name, check):
+        """Findings of an account level check kept in the result cache, None when it has to run"""
+        if not self.caches(check):
+            return None
+        try:
+            return self.result_cache.get(
+                self.awsAccountId, self.awsRegion, service_name, check_name
+            )
+        except Exception as e:
+            # an unreachable cache is a miss, the check still runs
+            print(f"Failed to read cached results of {check_name} with exception {e}")
+            self.result_cache.misses += 1
+            return None
+
+    def cache_findings(self, service_name, check_name, check, findings):
+        """Keeps the findings of an account level check in the result cache and returns them"""
+        if not self.caches(check):
+            return findings
+        findings = [to_asff(finding) for finding in findings]
+        # checks that swallow API errors yield nothing, an empty result is not worth keeping
+        if findings:
+            try:
+                self.result_cache.put(
+                    self.awsAccountId, self.awsRegion, service_name, check_name, findings
+                )
+            except Exception as e:
+                print(f"Failed to cache results of {check_name} with exception {e}")
+        return findings
+
+    def execute_check(self, service_name, check_name, check, auditor_cache):
+        """Runs a single check, account level checks are served from the result cache"""
+        findings = self.cached_findings(service_name, check_name, check)
+        if findings is not None:
+            return findings
+        findings = check(
+            cache=auditor_cache,
+            awsAccountId=self.awsAccountId,
+            awsRegion=self.awsRegion,
+            awsPartition=self.awsPartition,
+        )
+        if self.caches(check):
+            findings = self.cache_findings(service_name, check_name, check, list(findings))
+        return findings
+
     def print_checks_md(self):
         table = []
         table.append(
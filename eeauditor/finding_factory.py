@@ -0,0 +1,266 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import datetime
+import sys
+import time
+from collections.abc import Mapping
+
+ASFF_KEYS = (
+    "SchemaVersion",
+    "Id",
+    "ProductArn",
+    "GeneratorId",
+    "AwsAccountId",
+    "Types",
+    "FirstObservedAt",
+    "CreatedAt",
+    "UpdatedAt",
+    "Severity",
+    "Confidence",
+    "Title",
+    "Description",
+    "Remediation",
+    "ProductFields",
+    "Resources",
+    "Compliance",
+    "Workflow",
+    "RecordState",
+)
+# the timestamp is refreshed at most once a second instead of for every finding
+_clock = [0, ""]
+
+
+def iso_timestamp():
+    """Current UTC time in ISO 8601, cached for the second it was taken in"""
+    now = int(time.time())
+    if now != _clock[0]:
+        _clock[1] = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat()
+        _clock[0] = now
+    return _clock[1]
+
+
+class FindingTemplate(object):
+    """Static parts of the findings of a check, declared once and shared by all of them"""
+
+    def __init__(
+        self,
+        title,
+        types,
+        remediation_text,
+        remediation_url,
+        resource_type,
+        related_requirements,
+        confidence=99,
+    ):
+        self.title = sys.intern(title)
+        self.types = tuple(sys.intern(finding_type) for finding_type in types)
+        self.remediation_text = remediation_text
+        self.remediation_url = remediation_url
+        self.resource_type = sys.intern(resource_type)
+        self.related_requirements = tuple(sys.intern(control) for control in related_requirements)
+        self.confidence = confidence
+
+    def failed(
+        self,
+        finding_id,
+        resource_id,
+        awsAccountId,
+        awsRegion,
+        awsPartition,
+        severity,
+        description,
+        details=None,
+        generator_id=None,
+    ):
+        """Returns a FAILED, ACTIVE finding of the check"""
+        return Finding(
+            self,
+            finding_id,
+            resource_id,
+            awsAccountId,
+            awsRegion,
+            awsPartition,
+            True,
+            severity,
+            description,
+            details,
+            generator_id,
+        )
+
+    def passed(
+        self,
+        finding_id,
+        resource_id,
+        awsAccountId,
+        awsRegion,
+        awsPartition,
+        description,
+        details=None,
+        generator_id=None,
+        severity="INFORMATIONAL",
+    ):
+        """Returns a PASSED, ARCHIVED finding of the check"""
+        return Finding(
+            self,
+            finding_id,
+            resource_id,
+            awsAccountId,
+            awsRegion,
+            awsPartition,
+            False,
+            severity,
+            description,
+            details,
+            generator_id,
+        )
+
+
+class Finding(Mapping):
+    """Compact finding holding only its per resource fields
+
+    Reads like the ASFF dict it stands for, every key is built on access from the
+    template, and asff() turns it into a real dict for the outputs. Lists shared by
+    every finding of a check, such as Types, are kept once as tuples on the template
+    and handed out as lists like any other ASFF finding.
+    """
+
+    __slots__ = (
+        "template",
+        "finding_id",
+        "resource_id",
+        "account_id",
+        "region",
+        "partition",
+        "is_failed",
+        "severity",
+        "description",
+        "details",
+        "generator_id",
+        "timestamp",
+    )
+
+    def __init__(
+        self,
+        template,
+        finding_id,
+        resource_id,
+        account_id,
+        region,
+        partition,
+        is_failed,
+        severity,
+        description,
+        details=None,
+        generator_id=None,
+    ):
+        self.template = template
+        self.finding_id = finding_id
+        self.resource_id = resource_id
+        self.account_id = account_id
+        self.region = region
+        self.partition = partition
+        self.is_failed = is_failed
+        self.severity = severity
+        self.description = description
+        self.details = details
+        self.generator_id = generator_id
+        self.timestamp = iso_timestamp()
+
+    def __getitem__(self, key):
+        if key not in ASFF_KEYS:
+            raise KeyError(key)
+        return getattr(self, f"_{key}")()
+
+    def __iter__(self):
+        return iter(ASFF_KEYS)
+
+    def __len__(self):
+        return len(ASFF_KEYS)
+
+    def asff(self):
+        return {key: self[key] for key in ASFF_KEYS}
+
+    def _SchemaVersion(self):
+        return "2018-10-08"
+
+    def _Id(self):
+        return self.finding_id
+
+    def _ProductArn(self):
+        return f"arn:{self.partition}:securityhub:{self.region}:{self.account_id}:product/{self.account_id}/default"
+
+    def _GeneratorId(self):
+        return self.generator_id or self.resource_id
+
+    def _AwsAccountId(self):
+        return self.account_id
+
+    def _Types(self):
+        return list(self.template.types)
+
+    def _FirstObservedAt(self):
+        return self.timestamp
+
+    _CreatedAt = _FirstObservedAt
+    _UpdatedAt = _FirstObservedAt
+
+    def _Severity(self):
+        return {"Label": self.severity}
+
+    def _Confidence(self):
+        return self.template.confidence
+
+    def _Title(self):
+        return self.template.title
+
+    def _Description(self):
+        return self.description
+
+    def _Remediation(self):
+        return {
+            "Recommendation": {"Text": self.template.remediation_text, "Url": self.template.remediation_url}
+        }
+
+    def _ProductFields(self):
+        return {"Product Name": "ElectricEye"}
+
+    def _Resources(self):
+        resource = {
+            "Type": self.template.resource_type,
+            "Id": self.resource_id,
+            "Partition": self.partition,
+            "Region": self.region,
+        }
+        if self.details:
+            resource["Details"] = self.details
+        return [resource]
+
+    def _Compliance(self):
+        return {
+            "Status": "FAILED" if self.is_failed else "PASSED",
+            "RelatedRequirements": list(self.template.related_requirements),
+        }
+
+    def _Workflow(self):
+        return {"Status": "NEW" if self.is_failed else "RESOLVED"}
+
+    def _RecordState(self):
+        return "ACTIVE" if self.is_failed else "ARCHIVED"
+
+
+def to_asff(finding):
+    """Returns the ASFF dict of a finding, findings built as dicts are returned as they are"""
+    return finding.asff() if isinstance(finding, Finding) else finding
@@ -0,0 +1,363 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+import requests
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+THROTTLE_CODES = frozenset(
+    [
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottledException",
+        "TooManyRequestsException",
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "SlowDown",
+        "RequestThrottled",
+        "PriorRequestNotComplete",
+    ]
+)
+EMF_NAMESPACE = "ElectricEye"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric(object):
+    """Thread safe metric holding one value per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{label}="{escape_label(value)}"' for label, value in pairs) + "}"
+
+    def samples(self):
+        """Yields (name suffix, label values, extra labels, value) of every series"""
+        with self.lock:
+            values = dict(self.values)
+        for key, value in values.items():
+            yield "", key, (), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{self.label_text(key, extra)} {value:g}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(series[0]), series[1], series[2]) for key, series in self.values.items()}
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", key, (("le", f"{bound:g}"),), cumulative
+            yield "_bucket", key, (("le", "+Inf"),), count
+            yield "_sum", key, (), total
+            yield "_count", key, (), count
+
+
+class Registry(object):
+    """Holds every metric and renders them for Prometheus or CloudWatch"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def emf_records(self, namespace=EMF_NAMESPACE):
+        """Yields a CloudWatch embedded metric format record per series, histograms as sum and count"""
+        timestamp = int(time.time() * 1000)
+        for metric in self.metrics:
+            for suffix, key, extra, value in metric.samples():
+                if suffix == "_bucket":
+                    continue
+                name = metric.name + suffix
+                record = {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": namespace,
+                                "Dimensions": [list(metric.labels)],
+                                "Metrics": [{"Name": name}],
+                            }
+                        ],
+                    },
+                    name: value,
+                }
+                record.update(zip(metric.labels, key))
+                yield record
+
+
+REGISTRY = Registry()
+CHECK_DURATION = REGISTRY.register(
+    Histogram("electriceye_check_duration_seconds", "Time spent running a check", ("service", "check"))
+)
+SCAN_DURATION = REGISTRY.register(Gauge("electriceye_scan_duration_seconds", "Duration of the last scan"))
+LAST_SCAN = REGISTRY.register(
+    Gauge("electriceye_last_scan_timestamp_seconds", "Unix time the last scan finished at")
+)
+API_CALLS = REGISTRY.register(
+    Counter("electriceye_api_calls_total", "AWS API calls made by checks", ("service", "operation"))
+)
+API_CALL_DURATION = REGISTRY.register(
+    Histogram(
+        "electriceye_api_call_duration_seconds", "AWS API call latency including retries", ("service", "operation")
+    )
+)
+API_RETRIES = REGISTRY.register(
+    Counter("electriceye_api_retries_total", "AWS API call retries", ("service", "operation"))
+)
+API_THROTTLES = REGISTRY.register(
+    Counter("electriceye_api_throttles_total", "Throttled AWS API call attempts", ("service", "operation"))
+)
+API_ERRORS = REGISTRY.register(
+    Counter("electriceye_api_errors_total", "AWS API calls ending in an error", ("service", "operation", "code"))
+)
+FINDINGS = REGISTRY.register(
+    Counter("electriceye_findings_total", "Findings sent to the outputs", ("severity", "status"))
+)
+OUTPUT_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("electriceye_output_queue_depth", "Findings waiting in the buffer of an output", ("output",))
+)
+OUTPUT_BATCH_DURATION = REGISTRY.register(
+    Histogram("electriceye_output_batch_duration_seconds", "Latency of an output request", ("output",))
+)
+OUTPUT_DURATION = REGISTRY.register(
+    Gauge("electriceye_output_duration_seconds", "Time an output took to write the last scan", ("output",))
+)
+OUTPUT_FINDINGS = REGISTRY.register(
+    Counter("electriceye_output_findings_total", "Findings handed to an output", ("output",))
+)
+RESULT_CACHE_REQUESTS = REGISTRY.register(
+    Gauge("electriceye_result_cache_requests", "Result cache lookups of the last scan", ("result",))
+)
+RESULT_CACHE_HIT_RATIO = REGISTRY.register(
+    Gauge("electriceye_result_cache_hit_ratio", "Share of result cache lookups served from the cache")
+)
+
+
+def timed_findings(findings, service, check):
+    """Passes findings through, timing only the check itself and not the consumer"""
+    elapsed = 0.0
+    iterator = iter(findings)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                finding = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield finding
+    finally:
+        CHECK_DURATION.observe(elapsed, service=service, check=check)
+
+
+def operation_labels(model):
+    return {"service": model.service_model.service_name, "operation": model.name}
+
+
+def before_call(model, context, **kwargs):
+    context["electriceye_started"] = time.perf_counter()
+
+
+def after_call(model, parsed, context, **kwargs):
+    labels = operation_labels(model)
+    API_CALLS.inc(**labels)
+    started = context.get("electriceye_started")
+    if started is not None:
+        API_CALL_DURATION.observe(time.perf_counter() - started, **labels)
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    if retries:
+        API_RETRIES.inc(retries, **labels)
+    code = parsed.get("Error", {}).get("Code")
+    if code:
+        API_ERRORS.inc(code=code, **labels)
+
+
+def needs_retry(operation, response=None, **kwargs):
+    # called after every attempt, the retry handler decides, this one only counts throttles
+    if response and response[1].get("Error", {}).get("Code") in THROTTLE_CODES:
+        API_THROTTLES.inc(**operation_labels(operation))
+
+
+def instrument_session(session):
+    """Counts the API calls of every client the session creates from now on
+
+    Clients copy the session's handlers when they are created, so this has to run
+    before the auditors are loaded.
+    """
+    session.events.register("before-call", before_call, unique_id="electriceye-metrics-before-call")
+    session.events.register("after-call", after_call, unique_id="electriceye-metrics-after-call")
+    session.events.register("needs-retry", needs_retry, unique_id="electriceye-metrics-needs-retry")
+
+
+def record_result_cache(result_cache):
+    if result_cache is None:
+        return
+    RESULT_CACHE_REQUESTS.set(result_cache.hits, result="hit")
+    RESULT_CACHE_REQUESTS.set(result_cache.misses, result="miss")
+    lookups = result_cache.hits + result_cache.misses
+    RESULT_CACHE_HIT_RATIO.set(result_cache.hits / lookups if lookups else 0)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, address=""):
+    """Serves /metrics for Prometheus to scrape from a daemon thread, returns the server"""
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def push(url, job="electriceye"):
+    """Replaces the metrics of this job on a Prometheus Pushgateway"""
+    response = requests.put(
+        f"{url.rstrip('/')}/metrics/job/{job}",
+        data=REGISTRY.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4"},
+        timeout=30,
+    )
+    response.raise_for_status()
+
+
+def write_emf(stream=None):
+    """Writes every series as a CloudWatch embedded metric format line, stdout by default"""
+    stream = stream or sys.stdout
+    for record in REGISTRY.emf_records(os.environ.get("METRICS_EMF_NAMESPACE", EMF_NAMESPACE)):
+        stream.write(json.dumps(record) + "\n")
+    stream.flush()
+
+
+def configure():
+    """Starts the metrics endpoint and instruments botocore when metrics are turned on
+
+    METRICS_PORT serves /metrics, METRICS_PUSHGATEWAY_URL and METRICS_EMF publish at
+    the end of a scan. Returns whether metrics are turned on.
+    """
+    port = os.environ.get("METRICS_PORT")
+    enabled = bool(port or os.environ.get("METRICS_PUSHGATEWAY_URL") or os.environ.get("METRICS_EMF"))
+    if not enabled:
+        return False
+    if port:
+        start_http_server(int(port))
+        print(f"Serving metrics on port {port}")
+    instrument_session(boto3._get_default_session())
+    return True
+
+
+def publish():
+    """Pushes metrics to the Pushgateway and writes EMF lines, where configured"""
+    url = os.environ.get("METRICS_PUSHGATEWAY_URL")
+    if url:
+        try:
+            push(url, os.environ.get("METRICS_PUSHGATEWAY_JOB", "electriceye"))
+        except Exception as e:
+            print(f"Failed to push metrics to {url} with exception {e}")
+    emf = os.environ.get("METRICS_EMF")
+    if emf:
+        if emf.lower() in ("true", "stdout"):
+            write_emf()
+        else:
+            with open(emf, "a") as emf_file:
+                write_emf(emf_file)
@@ -0,0 +1,266 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import json
+import os
+
+import boto3
+import jmespath
+from check_register import DEFAULT_FANOUT
+
+# Pricing used by cost-calculator/electriceye-cost-calculations.csv
+FARGATE_VCPU_HOUR = 0.04048
+FARGATE_GB_HOUR = 0.004445
+FARGATE_VCPU = 2
+FARGATE_GB = 4
+SECHUB_FREE_FINDINGS = 10000
+SECHUB_FINDING_COST = 0.00003
+
+# Cheap inventory calls used to count each type of resource checks iterate over. Every
+# entry is a client name, a list / describe operation, its arguments and a JMESPath
+# expression returning the resources. "{awsAccountId}" is replaced in the arguments.
+INVENTORY = {
+    "acm_certificates": ("acm", "list_certificates", {}, "CertificateSummaryList"),
+    "amplify_apps": ("amplify", "list_apps", {}, "apps"),
+    "apigateway_rest_apis": ("apigateway", "get_rest_apis", {}, "items"),
+    "appmesh_meshes": ("appmesh", "list_meshes", {}, "meshes"),
+    "cloud9_environments": ("cloud9", "list_environments", {}, "environmentIds"),
+    "cloudformation_stacks": ("cloudformation", "describe_stacks", {}, "Stacks"),
+    "cloudfront_distributions": ("cloudfront", "list_distributions", {}, "DistributionList.Items"),
+    "cloudtrail_trails": ("cloudtrail", "list_trails", {}, "Trails"),
+    "codebuild_projects": ("codebuild", "list_projects", {}, "projects"),
+    "dms_replication_instances": ("dms", "describe_replication_instances", {}, "ReplicationInstances"),
+    "docdb_instances": ("docdb", "describe_db_instances", {}, "DBInstances"),
+    "dynamodb_tables": ("dynamodb", "list_tables", {}, "TableNames"),
+    "ebs_snapshots": ("ec2", "describe_snapshots", {"OwnerIds": ["{awsAccountId}"]}, "Snapshots"),
+    "ebs_volumes": ("ec2", "describe_volumes", {}, "Volumes"),
+    "ec2_images": ("ec2", "describe_images", {"Owners": ["self"]}, "Images"),
+    "ec2_instances": ("ec2", "describe_instances", {}, "Reservations[].Instances[]"),
+    "ec2_security_groups": ("ec2", "describe_security_groups", {}, "SecurityGroups"),
+    "ec2_subnets": ("ec2", "describe_subnets", {}, "Subnets"),
+    "ec2_vpcs": ("ec2", "describe_vpcs", {}, "Vpcs"),
+    "ecr_repositories": ("ecr", "describe_repositories", {}, "repositories"),
+    "ecs_clusters": ("ecs", "list_clusters", {}, "clusterArns"),
+    "ecs_task_definitions": ("ecs", "list_task_definitions", {"status": "ACTIVE"}, "taskDefinitionArns"),
+    "efs_file_systems": ("efs", "describe_file_systems", {}, "FileSystems"),
+    "eks_clusters": ("eks", "list_clusters", {}, "clusters"),
+    "elasticache_clusters": ("elasticache", "describe_cache_clusters", {}, "CacheClusters"),
+    "elb_load_balancers": ("elb", "describe_load_balancers", {}, "LoadBalancerDescriptions"),
+    "elbv2_load_balancers": ("elbv2", "describe_load_balancers", {}, "LoadBalancers"),
+    "emr_clusters": ("emr", "list_clusters", {}, "Clusters"),
+    "es_domains": ("es", "list_domain_names", {}, "DomainNames"),
+    "firehose_delivery_streams": ("firehose", "list_delivery_streams", {}, "DeliveryStreamNames"),
+    "glue_crawlers": ("glue", "get_crawlers", {}, "Crawlers"),
+    "iam_groups": ("iam", "list_groups", {}, "Groups"),
+    "iam_policies": ("iam", "list_policies", {"Scope": "Local"}, "Policies"),
+    "iam_roles": ("iam", "list_roles", {}, "Roles"),
+    "iam_server_certificates": ("iam", "list_server_certificates", {}, "ServerCertificateMetadataList"),
+    "iam_users": ("iam", "list_users", {}, "Users"),
+    "kinesis_streams": ("kinesis", "list_streams", {}, "StreamNames"),
+    "kms_keys": ("kms", "list_keys", {}, "Keys"),
+    "lambda_functions": ("lambda", "list_functions", {}, "Functions"),
+    "mq_brokers": ("mq", "list_brokers", {}, "BrokerSummaries"),
+    "msk_clusters": ("kafka", "list_clusters", {}, "ClusterInfoList"),
+    "neptune_instances": ("neptune", "describe_db_instances", {}, "DBInstances"),
+    "rds_instances": ("rds", "describe_db_instances", {}, "DBInstances"),
+    "redshift_clusters": ("redshift", "describe_clusters", {}, "Clusters"),
+    "s3_buckets": ("s3", "list_buckets", {}, "Buckets"),
+    "sagemaker_notebook_instances": ("sagemaker", "list_notebook_instances", {}, "NotebookInstances"),
+    "secretsmanager_secrets": ("secretsmanager", "list_secrets", {}, "SecretList"),
+    "sns_topics": ("sns", "list_topics", {}, "Topics"),
+    "sqs_queues": ("sqs", "list_queues", {}, "QueueUrls"),
+    "wafv2_web_acls": ("wafv2", "list_web_acls", {"Scope": "REGIONAL"}, "WebACLs"),
+    "workspaces": ("workspaces", "describe_workspaces", {}, "Workspaces"),
+}
+# Resource type the checks of each Auditor iterate over
+AUDITOR_RESOURCES = {
+    "AMI_Auditor": "ec2_images",
+    "AWS_ACM_Auditor": "acm_certificates",
+    "AWS_Amplify_Auditor": "amplify_apps",
+    "AWS_AppMesh_Auditor": "appmesh_meshes",
+    "AWS_Cloud9_Auditor": "cloud9_environments",
+    "AWS_CloudFormation_Auditor": "cloudformation_stacks",
+    "AWS_CloudTrail_Auditor": "cloudtrail_trails",
+    "AWS_CodeBuild_Auditor": "codebuild_projects",
+    "AWS_DMS_Auditor": "dms_replication_instances",
+    "AWS_Glue_Auditor": "glue_crawlers",
+    "AWS_IAM_Auditor": "iam_users",
+    "AWS_KMS_Auditor": "kms_keys",
+    "AWS_Lambda_Auditor": "lambda_functions",
+    "AWS_Secrets_Manager_Auditor": "secretsmanager_secrets",
+    "AWS_WAFv2_Auditor": "wafv2_web_acls",
+    "Amazon_APIGW_Auditor": "apigateway_rest_apis",
+    "Amazon_CloudFront_Auditor": "cloudfront_distributions",
+    "Amazon_DocumentDB_Auditor": "docdb_instances",
+    "Amazon_DynamoDB_Auditor": "dynamodb_tables",
+    "Amazon_EBS_Auditor": "ebs_volumes",
+    "Amazon_EC2_Auditor": "ec2_instances",
+    "Amazon_EC2_SSM_Auditor": "ec2_instances",
+    "Amazon_EC2_Security_Group_Auditor": "ec2_security_groups",
+    "Amazon_ECR_Auditor": "ecr_repositories",
+    "Amazon_ECS_Auditor": "ecs_clusters",
+    "Amazon_EFS_Auditor": "efs_file_systems",
+    "Amazon_EKS_Auditor": "eks_clusters",
+    "Amazon_ELB_Auditor": "elb_load_balancers",
+    "Amazon_ELBv2_Auditor": "elbv2_load_balancers",
+    "Amazon_EMR_Auditor": "emr_clusters",
+    "Amazon_Elasticache_Redis_Auditor": "elasticache_clusters",
+    "Amazon_ElasticsearchService_Auditor": "es_domains",
+    "Amazon_Kinesis_Data_Streams_Auditor": "kinesis_streams",
+    "Amazon_Kinesis_Firehose_Auditor": "firehose_delivery_streams",
+    "Amazon_MQ_Auditor": "mq_brokers",
+    "Amazon_MSK_Auditor": "msk_clusters",
+    "Amazon_Neptune_Auditor": "neptune_instances",
+    "Amazon_RDS_Auditor": "rds_instances",
+    "Amazon_Redshift_Auditor": "redshift_clusters",
+    "Amazon_S3_Auditor": "s3_buckets",
+    "Amazon_SNS_Auditor": "sns_topics",
+    "Amazon_SQS_Auditor": "sqs_queues",
+    "Amazon_SageMaker_Auditor": "sagemaker_notebook_instances",
+    "Amazon_VPC_Auditor": "ec2_vpcs",
+    "Amazon_WorkSpaces_Auditor": "workspaces",
+}
+# Checks iterating over another resource type than the rest of their Auditor
+CHECK_RESOURCES = {
+    "ebs_snapshot_encryption_check": "ebs_snapshots",
+    "ebs_snapshot_public_check": "ebs_snapshots",
+    "ecs_task_definition_privileged_container_check": "ecs_task_definitions",
+    "ecs_task_definition_security_labels_check": "ecs_task_definitions",
+    "iam_group_policy_least_priv_check": "iam_groups",
+    "iam_mngd_policy_least_priv_check": "iam_policies",
+    "iam_role_policy_least_priv_check": "iam_roles",
+    "server_certs_check": "iam_server_certificates",
+    "subnet_no_ip_space_check": "ec2_subnets",
+    "subnet_public_ip_check": "ec2_subnets",
+}
+
+
+def resource_type(auditor_name, check_name):
+    """Returns the INVENTORY resource type a check iterates over, None when it is unknown"""
+    return CHECK_RESOURCES.get(check_name, AUDITOR_RESOURCES.get(auditor_name))
+
+
+class ScanPlanner(object):
+    """Estimates the size and cost of a scan without running any checks
+
+    Resource counts come from the cheap inventory calls in INVENTORY, or from a JSON
+    file of cached counts keyed by resource type. Each check is expected to make one
+    list call plus its declared fan-out of calls per resource of its type.
+    """
+
+    def __init__(
+        self,
+        app,
+        counts_file=None,
+        default_resources=5,
+        workers=1,
+        call_latency=0.15,
+        runs_per_month=30,
+    ):
+        self.app = app
+        self.counts_file = counts_file
+        self.default_resources = default_resources
+        self.workers = max(1, workers)
+        self.call_latency = call_latency
+        self.runs_per_month = runs_per_month
+        self.counts = {}
+        if counts_file and os.path.exists(counts_file):
+            with open(counts_file) as cached_counts:
+                self.counts = json.load(cached_counts)
+
+    def count_resources(self, resource):
+        """Returns the number of resources of a type from INVENTORY"""
+        if resource in self.counts:
+            return self.counts[resource]
+        if resource not in INVENTORY:
+            return self.default_resources
+        client_name, operation, kwargs, expression = INVENTORY[resource]
+        kwargs = json.loads(json.dumps(kwargs).replace("{awsAccountId}", self.app.awsAccountId))
+        try:
+            client = boto3.client(client_name)
+            if client.can_paginate(operation):
+                pages = client.get_paginator(operation).paginate(**kwargs)
+                total = sum(1 for item in pages.search(expression) if item is not None)
+            else:
+                total = len(jmespath.search(expression, getattr(client, operation)(**kwargs)) or [])
+        except Exception as e:
+            print(f"Failed to count {resource} with exception {e}")
+            return self.default_resources
+        self.counts[resource] = total
+        return total
+
+    def plan(self, requested_check_name=None):
+        """Returns a list of per check estimates and the totals for the whole scan"""
+        checks = []
+        for service_name, check_list in self.app.registry.checks.items():
+            for check_name, check in check_list.items():
+                if requested_check_name and requested_check_name != check_name:
+                    continue
+                auditor_name = check.__module__.rpartition(".")[2]
+                if getattr(check, "account_level", False):
+                    resources = 1
+                else:
+                    resources = self.count_resources(resource_type(auditor_name, check_name))
+                fanout = getattr(check, "fanout", DEFAULT_FANOUT)
+                checks.append(
+                    {
+                        "Auditor": auditor_name,
+                        "Service": service_name,
+                        "Check": check_name,
+                        "Resources": resources,
+                        "ApiCalls": 1 + fanout * resources,
+                        "Findings": max(resources, 1),
+                    }
+                )
+        if self.counts_file:
+            with open(self.counts_file, "w") as cached_counts:
+                json.dump(self.counts, cached_counts, indent=2)
+
+        api_calls = sum(check["ApiCalls"] for check in checks)
+        findings = sum(check["Findings"] for check in checks)
+        runtime_minutes = api_calls * self.call_latency / self.workers / 60
+        monthly_findings = findings * self.runs_per_month
+        fargate_cost = (
+            runtime_minutes
+            / 60
+            * self.runs_per_month
+            * (FARGATE_VCPU * FARGATE_VCPU_HOUR + FARGATE_GB * FARGATE_GB_HOUR)
+        )
+        sechub_cost = max(monthly_findings - SECHUB_FREE_FINDINGS, 0) * SECHUB_FINDING_COST
+        totals = {
+            "Checks": len(checks),
+            "ApiCalls": api_calls,
+            "Workers": self.workers,
+            "RuntimeMinutes": round(runtime_minutes, 2),
+            "FindingsPerRun": findings,
+            "FindingsPerMonth": monthly_findings,
+            "FargateMonthlyCost": round(fargate_cost, 4),
+            "SecurityHubMonthlyCost": round(sechub_cost, 4),
+            "MonthlyCost": round(fargate_cost + sechub_cost, 4),
+        }
+        return checks, totals
+
+    def print_plan_md(self, requested_check_name=None):
+        checks, totals = self.plan(requested_check_name=requested_check_name)
+        table = []
+        table.append("| Auditor | Check | Resources | API Calls | Findings |")
+        table.append("|---------|-------|-----------|-----------|----------|")
+        for check in checks:
+            table.append(
+                f"|{check['Auditor']} |{check['Check']} |{check['Resources']} |{check['ApiCalls']} |{check['Findings']}"
+            )
+        print("\n".join(table))
+        print(json.dumps(totals, indent=2))
+        return totals
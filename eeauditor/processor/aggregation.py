@@ -0,0 +1,146 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import hashlib
+import json
+import os
+
+# ProductFields values are limited to 2048 characters
+MAX_ID_LIST_LENGTH = 2048
+
+
+def finding_region(finding):
+    resources = finding.get("Resources") or [{}]
+    return resources[0].get("Region") or finding.get("ProductArn", "::::").split(":")[3]
+
+
+class PassedRollup(object):
+    """Collapses the PASSED findings of one check, account and region into a single finding
+
+    Resource Ids are folded into an order independent digest, the Ids themselves are
+    listed as long as they fit into a ProductFields value.
+    """
+
+    def __init__(self, finding):
+        self.first = finding
+        self.count = 0
+        self.digest = 0
+        self.resource_ids = []
+        self.id_list_length = 0
+
+    def add(self, finding):
+        self.count += 1
+        for resource in finding.get("Resources", []):
+            resource_id = resource.get("Id", "")
+            self.digest ^= int.from_bytes(hashlib.sha256(resource_id.encode()).digest(), "big")
+            if self.id_list_length + len(resource_id) + 1 <= MAX_ID_LIST_LENGTH:
+                self.resource_ids.append(resource_id)
+                self.id_list_length += len(resource_id) + 1
+            else:
+                self.id_list_length = MAX_ID_LIST_LENGTH + 1
+
+    def finding(self):
+        first = self.first
+        account = first.get("AwsAccountId")
+        region = finding_region(first)
+        partition = (first.get("Resources") or [{}])[0].get("Partition", "aws")
+        check = hashlib.sha256(first.get("Title", "").encode()).hexdigest()[:16]
+        product_fields = dict(first.get("ProductFields") or {})
+        product_fields["PassedResourceCount"] = str(self.count)
+        product_fields["PassedResourcesDigest"] = f"{self.digest:064x}"
+        if self.id_list_length <= MAX_ID_LIST_LENGTH:
+            product_fields["PassedResourceIds"] = " ".join(self.resource_ids)
+        rollup = dict(first)
+        rollup.update(
+            {
+                "Id": f"{account}/{region}/{check}/passed-rollup",
+                "GeneratorId": f"{account}/{region}/{check}",
+                "Severity": {"Label": "INFORMATIONAL"},
+                "Description": f"{self.count} resources in account {account} and region {region} passed this check.",
+                "ProductFields": product_fields,
+                "Resources": [
+                    {
+                        "Type": "AwsAccount",
+                        "Id": f"AWS::::Account:{account}",
+                        "Partition": partition,
+                        "Region": region,
+                    }
+                ],
+                "Workflow": {"Status": "RESOLVED"},
+                "RecordState": "ARCHIVED",
+            }
+        )
+        return rollup
+
+
+def account_region(finding):
+    return f"{finding.get('AwsAccountId')}/{finding_region(finding)}"
+
+
+def load_failed_ids(state_file):
+    """Returns the failing Ids of every account and region kept in state_file"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as state:
+        return {key: set(ids) for key, ids in json.load(state).items()}
+
+
+def save_failed_ids(state_file, failed, scanned):
+    """Replaces the failing Ids of the scanned accounts and regions, keeping the others
+
+    The file is read again right before it is replaced, so scans of other regions
+    sharing it in the meantime are not lost.
+    """
+    state = load_failed_ids(state_file)
+    for key in scanned:
+        state[key] = failed.get(key, set())
+    temporary = f"{state_file}.tmp{os.getpid()}"
+    with open(temporary, "w") as state_out:
+        json.dump({key: sorted(ids) for key, ids in sorted(state.items())}, state_out)
+    os.replace(temporary, state_file)
+
+
+def aggregate_passed(findings, state_file, output="output"):
+    """Sends FAILED findings on and rolls PASSED findings up per check, account and region
+
+    PASSED findings of resources that failed in the previous run of their account and
+    region are still sent on their own, so they resolve the FAILED finding the output
+    holds. The Ids failing in this run are kept in state_file for the next run, per
+    account and region so scans of different regions do not overwrite each other.
+    """
+    previously_failed = load_failed_ids(state_file)
+    failed = {}
+    scanned = set()
+    rollups = {}
+    passed = 0
+    for finding in findings:
+        key = account_region(finding)
+        scanned.add(key)
+        status = finding.get("Compliance", {}).get("Status")
+        if status == "FAILED":
+            failed.setdefault(key, set()).add(finding["Id"])
+        if status != "PASSED" or finding["Id"] in previously_failed.get(key, ()):
+            yield finding
+            continue
+        passed += 1
+        rollup_key = (finding.get("Title"), finding.get("AwsAccountId"), finding_region(finding))
+        rollup = rollups.get(rollup_key)
+        if rollup is None:
+            rollup = rollups[rollup_key] = PassedRollup(finding)
+        rollup.add(finding)
+    for rollup in rollups.values():
+        yield rollup.finding()
+    save_failed_ids(state_file, failed, scanned)
+    print(f"Rolled {passed} PASSED findings up into {len(rollups)} findings for {output}")
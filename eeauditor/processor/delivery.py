@@ -0,0 +1,200 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+import tracing
+from metrics import OUTPUT_BATCH_DURATION
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# HTTP statuses worth retrying, the rest are not going to succeed on a retry
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class TokenBucket(object):
+    """Thread safe token bucket limiting requests to rate per second with a burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def backoff_delay(attempt, base=0.5, cap=20.0):
+    """Exponential backoff with full jitter for the given retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class DeliveryStats(object):
+    """Thread safe per run delivery statistics of an output provider
+
+    Request latencies are also recorded as metrics labelled with the output's name,
+    and as spans of the output when tracing is on.
+    """
+
+    def __init__(self, name, output=None):
+        self.name = name
+        self.output = output or name.lower()
+        # requests are sent from worker threads, their spans are parented to the output's span
+        self.trace_context = tracing.current_context()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.latencies = []
+
+    def record_batch(self, latency):
+        OUTPUT_BATCH_DURATION.observe(latency, output=self.output)
+        tracing.record_span(f"{self.output} batch", latency, self.trace_context, {"electriceye.output": self.output})
+        with self.lock:
+            self.batches += 1
+            self.latencies.append(latency)
+
+    def add(self, delivered=0, retried=0, failed=0):
+        with self.lock:
+            self.delivered += delivered
+            self.retried += retried
+            self.failed += failed
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        return (
+            f"{self.name}: {self.delivered} delivered, {self.failed} failed, {self.retried} retried "
+            f"in {self.batches} requests (p50 {p50 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms)"
+        )
+
+
+def deliver_batches(batches, send, stats, max_in_flight, workers=None, size=len, on_result=None):
+    """Sends batches from a thread pool, keeping at most max_in_flight of them queued or sending
+
+    Batches are only read from the iterator while there is room, so memory stays bounded
+    however many findings there are. A batch whose send raised counts size(batch) findings as
+    failed in stats, on_result(batch, result) is given what send returned for the others.
+    """
+    with ThreadPoolExecutor(max_workers=workers or max_in_flight) as pool:
+        in_flight = {}
+
+        def check(done):
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error writing findings to {stats.name}: {e}")
+                    stats.add(failed=size(batch))
+                    continue
+                if on_result:
+                    on_result(batch, result)
+
+        for batch in batches:
+            if len(in_flight) >= max_in_flight:
+                check(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            in_flight[pool.submit(send, batch)] = batch
+        check(wait(in_flight).done)
+
+
+def resource_key(finding):
+    """Partition key spreading findings by resource, so one resource's findings stay in order"""
+    resources = finding.get("Resources") or [{}]
+    return resources[0].get("Id") or finding.get("Id", "")
+
+
+def pooled_session(pool_size=10, retries=5, backoff_factor=0.5):
+    """Returns a requests Session reusing pooled connections and retrying 429s and 5xxs
+
+    Retries honour Retry-After headers and back off exponentially between attempts.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class SpillQueue(object):
+    """Newline delimited JSON file holding records that could not be delivered
+
+    Records are appended while an endpoint is down and replayed on the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def spill(self, records):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as spill_file:
+                for record in records:
+                    spill_file.write(json.dumps(record) + "\n")
+
+    def drain(self):
+        """Yields the spilled records, replayed() is called once they have all been sent
+
+        Records failing again are re-spilled. The replay file is kept until then, so a
+        crash while the replayed records are still in flight replays them again.
+        """
+        replay_path = self.path + ".replay"
+        with self.lock:
+            # a replay interrupted by a crash is finished before taking newer records
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.path):
+                    return
+                os.replace(self.path, replay_path)
+        with open(replay_path) as replay_file:
+            for line in replay_file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def replayed(self):
+        """Removes the replay file once every record drain() yielded was sent or spilled again"""
+        try:
+            os.remove(self.path + ".replay")
+        except FileNotFoundError:
+            pass
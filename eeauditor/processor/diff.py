@@ -0,0 +1,202 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from processor.outputs.parquet import flatten_finding, pa, unflatten_finding
+from processor.outputs.sqlite import LATEST_RUNS, connect
+from processor.serializers import get_serializer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHANGES = ["newly_failing", "newly_passing", "disappeared", "changed"]
+# fields left out of the content comparison, they change every run
+VOLATILE_COLUMNS = ["FirstObservedAt", "CreatedAt", "UpdatedAt"]
+
+
+def open_text(path):
+    """Opens a possibly gzip or zstd compressed file for reading text"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    if path.endswith(".zst"):
+        if not zstandard:
+            raise ValueError("Reading zstd files needs the zstandard package to be installed")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path)
+
+
+def iter_json_array(stream, chunk_size=1024 * 1024):
+    """Yields the objects of the first JSON array in stream without loading the whole document
+
+    Reads the {"Findings": [...]} document of the json output as well as a bare list.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while "[" not in buffer:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+    position = buffer.index("[") + 1
+    end_of_stream = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            value, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if end_of_stream:
+                raise
+            chunk = stream.read(chunk_size)
+            end_of_stream = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield value
+
+
+def read_parquet(path):
+    if pa is None:
+        raise ImportError("Reading Parquet scans needs pyarrow, install it with pip3 install pyarrow")
+    import pyarrow.dataset as ds
+
+    for batch in ds.dataset(path, format="parquet", partitioning="hive").to_batches():
+        for row in batch.to_pylist():
+            yield unflatten_finding(row)
+
+
+def read_sqlite(path):
+    """Yields the findings of a sqlite output database's latest finished run of every account and region"""
+    connection = connect(path)
+    try:
+        cursor = connection.execute(f"SELECT finding FROM findings WHERE last_run_id IN ({LATEST_RUNS})")
+        for row in cursor:
+            yield json.loads(row["finding"])
+    finally:
+        connection.close()
+
+
+def read_scan(path):
+    """Streams the findings of a scan output, the format is taken from the file name
+
+    JSON, NDJSON (optionally .gz or .zst), Parquet files or dataset directories and
+    SQLite databases are read.
+    """
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        yield from read_parquet(path)
+    elif path.endswith((".db", ".sqlite")):
+        yield from read_sqlite(path)
+    elif ".ndjson" in path or ".jsonl" in path:
+        with open_text(path) as stream:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open_text(path) as stream:
+            yield from iter_json_array(stream)
+
+
+def finding_digest(finding):
+    """Hash of what a finding says, comparable across output formats and runs"""
+    row = flatten_finding(finding)
+    for column in VOLATILE_COLUMNS:
+        row.pop(column)
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def bucket_of(finding_id, buckets):
+    return int.from_bytes(hashlib.blake2b(finding_id.encode(), digest_size=8).digest(), "big") % buckets
+
+
+def partition_scan(path, directory, name, buckets, serialize):
+    """Spreads the findings of a scan over bucket files by a hash of their Id, returns the count"""
+    files = [open(os.path.join(directory, f"{name}-{bucket}.ndjson"), "wb") for bucket in range(buckets)]
+    count = 0
+    try:
+        for finding in read_scan(path):
+            files[bucket_of(finding["Id"], buckets)].write(serialize(finding) + b"\n")
+            count += 1
+    finally:
+        for bucket_file in files:
+            bucket_file.close()
+    return count
+
+
+def classify(old, new):
+    """Returns the change between two states of a finding, or None when nothing changed"""
+    old_status = old.get("Compliance", {}).get("Status")
+    new_status = new.get("Compliance", {}).get("Status")
+    if new_status == "FAILED" and old_status != "FAILED":
+        return "newly_failing"
+    if new_status == "PASSED" and old_status == "FAILED":
+        return "newly_passing"
+    if finding_digest(old) != finding_digest(new):
+        return "changed"
+    return None
+
+
+def diff_scans(old_path, new_path, buckets=64, work_dir=None):
+    """Yields (change, finding) for every finding that changed between two scans
+
+    Both scans are first spread over hashed bucket files on disk, then compared one
+    bucket at a time, so memory holds only about 1/buckets of the older scan.
+    New FAILED findings are newly_failing, new PASSED findings are not reported.
+    Disappeared findings are yielded as they were in the older scan.
+    """
+    serialize = get_serializer()
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="electriceye-diff-") as directory:
+        partition_scan(old_path, directory, "old", buckets, serialize)
+        partition_scan(new_path, directory, "new", buckets, serialize)
+        for bucket in range(buckets):
+            old_findings = {}
+            with open(os.path.join(directory, f"old-{bucket}.ndjson"), "rb") as old_file:
+                for line in old_file:
+                    # the raw line takes less memory than the parsed finding, it is parsed again when compared
+                    old_findings[json.loads(line)["Id"]] = line
+            with open(os.path.join(directory, f"new-{bucket}.ndjson"), "rb") as new_file:
+                for line in new_file:
+                    new = json.loads(line)
+                    old_line = old_findings.pop(new["Id"], None)
+                    if old_line is None:
+                        failed = new.get("Compliance", {}).get("Status") == "FAILED"
+                        change = "newly_failing" if failed else None
+                    elif old_line == line:
+                        change = None
+                    else:
+                        change = classify(json.loads(old_line), new)
+                    if change:
+                        yield change, new
+            for old_line in old_findings.values():
+                yield "disappeared", json.loads(old_line)
+
+
+def delta_finding(change, finding):
+    """The finding sent to outputs for a change, disappeared findings are archived"""
+    delta = dict(finding)
+    delta["ProductFields"] = {**(finding.get("ProductFields") or {}), "ElectricEyeChange": change}
+    if change == "disappeared":
+        delta["RecordState"] = "ARCHIVED"
+        delta["Workflow"] = {"Status": "RESOLVED"}
+    return delta
@@ -1,14 +1,177 @@
+import os
+import queue
+import threading
+import time
+
+import tracing
+from finding_factory import to_asff
+from metrics import FINDINGS, OUTPUT_DURATION, OUTPUT_FINDINGS, OUTPUT_QUEUE_DEPTH
+from processor.aggregation import aggregate_passed
 from processor.outputs.output_base import ElectricEyeOutput
+from processor.validation import FindingValidator
 
+END_OF_FINDINGS = object()
 
-def process_findings(findings: list, outputs: list, **kwargs):
-    """Process all findings from json file and send to outputs sepecified"""
-    for output in outputs:
-        try:
 
-            ElectricEyeOutput.get_provider(output)().write_findings(findings=findings, **kwargs)
+class OutputBranch(object):
+    """Runs one output provider on its own thread, fed through a bounded buffer"""
+
+    def __init__(self, output, buffer_size, aggregate=False, **kwargs):
+        self.output = output
+        self.aggregate = aggregate
+        self.kwargs = kwargs
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.finished = threading.Event()
+        self.aborted = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"output-{output}", daemon=True)
+        self.findings_written = 0
+        self.success = False
+        self.error = None
+        self.seconds = 0.0
+        # the scan's span, the output thread's span is made its child
+        self.trace_context = tracing.current_context()
+
+    def findings(self):
+        while True:
+            finding = self.queue.get()
+            if finding is END_OF_FINDINGS or self.aborted.is_set():
+                return
+            self.findings_written += 1
+            yield finding
+
+    def run(self):
+        with tracing.attached(self.trace_context), tracing.span(
+            f"output {self.output}", {"electriceye.output": self.output}
+        ):
+            self.write()
+
+    def write(self):
+        start = time.monotonic()
+        try:
+            provider = ElectricEyeOutput.get_provider(self.output)
+            if not provider:
+                raise ValueError(f"Designated output provider {self.output} does not exist")
+            findings = self.findings()
+            if self.aggregate:
+                # the Ids failing per account and region, kept for the next run of the same output and file
+                output_name = os.path.basename(self.kwargs.get("output_file") or "output")
+                state_file = os.path.join(
+                    os.environ.get("AGGREGATE_STATE_DIR", "."), f"{output_name}-{self.output}-failed-ids.json"
+                )
+                findings = aggregate_passed(findings, state_file, output=self.output)
+            result = provider().write_findings(findings=findings, **self.kwargs)
+            # providers that do not return anything are taken at their word
+            self.success = result is not False
         except Exception as e:
-            print(f"Error writing output: {e}")
+            self.error = e
+            print(f"Error writing output {self.output}: {e}")
+        finally:
+            self.seconds = time.monotonic() - start
+            OUTPUT_DURATION.set(self.seconds, output=self.output)
+            OUTPUT_FINDINGS.inc(self.findings_written, output=self.output)
+            OUTPUT_QUEUE_DEPTH.set(0, output=self.output)
+            self.finished.set()
+
+    def put(self, finding, stall_timeout):
+        """Hands a finding to the provider, False once it stopped taking findings"""
+        waited = 0.0
+        while not self.finished.is_set():
+            try:
+                self.queue.put(finding, timeout=1)
+                return True
+            except queue.Full:
+                waited += 1
+                if waited >= stall_timeout:
+                    # a provider stuck for this long is dropped so the other outputs carry on
+                    self.error = f"stalled for {stall_timeout:.0f} seconds with a full buffer"
+                    print(f"Output {self.output} {self.error}, no longer sending it findings")
+                    self.abort()
+                    return False
+        return False
+
+    def abort(self):
+        """Tells a dropped provider its findings are over, so it stops once it reads again"""
+        self.aborted.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.queue.put_nowait(END_OF_FINDINGS)
+
+
+def process_findings(findings, outputs: list, required_outputs=(), aggregate_outputs=(), **kwargs):
+    """Tees the findings to every output specified, each writing on its own thread
+
+    Returns False when a required output failed, "all" makes every output required.
+    Outputs in aggregate_outputs (or "all") get PASSED findings rolled up.
+    Invalid findings are quarantined before they reach the outputs, unless
+    FINDING_VALIDATION is off.
+    """
+    validator = None
+    if os.environ.get("FINDING_VALIDATION", "quarantine") != "off":
+        validator = FindingValidator(
+            os.environ.get(
+                "FINDING_DEAD_LETTER_FILE", f"{kwargs.get('output_file') or 'output'}-dead-letter.ndjson"
+            )
+        )
+    buffer_size = int(os.environ.get("OUTPUT_BUFFER_SIZE", 1000))
+    stall_timeout = float(os.environ.get("OUTPUT_STALL_TIMEOUT", 600))
+    abort_timeout = float(os.environ.get("OUTPUT_ABORT_TIMEOUT", 30))
+    branches = [
+        OutputBranch(
+            output,
+            buffer_size,
+            aggregate=output in aggregate_outputs or "all" in aggregate_outputs,
+            **kwargs,
+        )
+        for output in dict.fromkeys(outputs)
+    ]
+    for branch in branches:
+        branch.thread.start()
+
+    live = branches
+    sent = 0
+    for finding in findings:
+        # findings built from a FindingTemplate become ASFF dicts only here
+        finding = to_asff(finding)
+        if validator and validator(finding) is None:
+            continue
+        FINDINGS.inc(
+            severity=finding.get("Severity", {}).get("Label"),
+            status=finding.get("Compliance", {}).get("Status"),
+        )
+        sent += 1
+        if sent % 100 == 0:
+            for branch in live:
+                OUTPUT_QUEUE_DEPTH.set(branch.queue.qsize(), output=branch.output)
+        live = [branch for branch in live if branch.put(finding, stall_timeout)]
+        if not live:
+            print("Every output failed, no longer sending findings")
+            break
+    for branch in live:
+        if branch.put(END_OF_FINDINGS, stall_timeout):
+            branch.thread.join()
+    for branch in branches:
+        # stalled outputs were aborted, they get a last chance to stop before the summary
+        branch.thread.join(timeout=abort_timeout)
+        if branch.thread.is_alive():
+            print(f"Output {branch.output} did not stop within {abort_timeout:.0f} seconds of being aborted")
+    if validator:
+        validator.close()
+
+    success = True
+    for branch in branches:
+        required = branch.output in required_outputs or "all" in required_outputs
+        failed = not branch.success or branch.error is not None
+        print(
+            f"Output {branch.output}: {'failed' if failed else 'succeeded'} with "
+            f"{branch.findings_written} findings in {branch.seconds:.1f}s"
+            f"{' (required)' if required else ''}"
+        )
+        if failed and required:
+            success = False
+    return success
 
 
 def get_providers():
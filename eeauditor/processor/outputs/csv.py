@@ -14,51 +14,108 @@
 # If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
 
 import csv
-import json
-from functools import reduce
+import io
+import os
+from collections.abc import Mapping
 
 from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import EXTENSIONS, open_compressed
+
+DEFAULT_COLUMNS = [
+    {"name": "Id", "path": "Id"},
+    {"name": "Title", "path": "Title"},
+    {"name": "ProductArn", "path": "ProductArn"},
+    {"name": "AwsAccountId", "path": "AwsAccountId"},
+    {"name": "Severity", "path": "Severity.Label"},
+    {"name": "Confidence", "path": "Confidence"},
+    {"name": "Description", "path": "Description"},
+    {"name": "RecordState", "path": "RecordState"},
+    {"name": "Compliance Status", "path": "Compliance.Status"},
+    {"name": "Remediation Recommendation", "path": "Remediation.Recommendation.Text",},
+    {"name": "Remediation Recommendation Link", "path": "Remediation.Recommendation.Url",},
+]
+REQUIREMENT_COLUMN = "Related Requirement"
+
+
+def parse_columns(spec):
+    """Parses a comma separated column spec such as Id,Severity=Severity.Label,Resource=Resources.0.Id"""
+    columns = []
+    for column in spec.split(","):
+        column = column.strip()
+        if not column:
+            continue
+        name, _, path = column.partition("=")
+        columns.append({"name": name, "path": path or name})
+    return columns
+
+
+def compile_extractor(path):
+    """Returns a function reading the "." separated path from a finding
+
+    The path is split once, numeric parts index into lists and a missing key gives None.
+    """
+    keys = [(key, int(key) if key.isdigit() else None) for key in path.split(".")]
+    if len(keys) == 1:
+        key = keys[0][0]
+        return lambda finding: finding.get(key)
+
+    def extract(finding):
+        value = finding
+        for key, index in keys:
+            if isinstance(value, list):
+                if index is None or index >= len(value):
+                    return None
+                value = value[index]
+            elif isinstance(value, Mapping):
+                value = value.get(key)
+            else:
+                return None
+        return value
+
+    return extract
+
+
+def cell(value):
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    return value
 
 
 @ElectricEyeOutput
 class CsvProvider(object):
     __provider__ = "csv"
 
+    def __init__(self):
+        spec = os.environ.get("CSV_COLUMNS")
+        self.columns = parse_columns(spec) if spec else DEFAULT_COLUMNS
+        self.extractors = [compile_extractor(column["path"]) for column in self.columns]
+        # one row per related requirement, so findings can be filtered by control in a spreadsheet
+        self.flatten_requirements = os.environ.get("CSV_FLATTEN_REQUIREMENTS", "false").lower() == "true"
+        self.compression = os.environ.get("CSV_COMPRESSION", "none")
+        if self.compression not in EXTENSIONS:
+            raise ValueError(f"Unknown CSV_COMPRESSION {self.compression}")
+
     def write_findings(self, findings: list, output_file: str, **kwargs):
-        csv_columns = [
-            {"name": "Id", "path": "Id"},
-            {"name": "Title", "path": "Title"},
-            {"name": "ProductArn", "path": "ProductArn"},
-            {"name": "AwsAccountId", "path": "AwsAccountId"},
-            {"name": "Severity", "path": "Severity.Label"},
-            {"name": "Confidence", "path": "Confidence"},
-            {"name": "Description", "path": "Description"},
-            {"name": "RecordState", "path": "RecordState"},
-            {"name": "Compliance Status", "path": "Compliance.Status"},
-            {"name": "Remediation Recommendation", "path": "Remediation.Recommendation.Text",},
-            {"name": "Remediation Recommendation Link", "path": "Remediation.Recommendation.Url",},
-        ]
-        csv_file = output_file + ".csv"
+        csv_file = f"{output_file}.csv{EXTENSIONS[self.compression]}"
+        extractors = self.extractors
+        written = 0
         try:
-            with open(csv_file, "w") as csvfile:
-                print(f"Writing {len(findings)} findings to {csv_file}")
+            with io.TextIOWrapper(open_compressed(csv_file, self.compression), newline="") as csvfile:
                 writer = csv.writer(csvfile, dialect="excel")
-                writer.writerow(item["name"] for item in csv_columns)
+                header = [column["name"] for column in self.columns]
+                if self.flatten_requirements:
+                    header.append(REQUIREMENT_COLUMN)
+                writer.writerow(header)
                 for finding in findings:
-                    row_data = []
-                    for column_dict in csv_columns:
-                        row_data.append(self.deep_get(finding, column_dict["path"]))
-                    writer.writerow(row_data)
-            csvfile.close()
+                    row = [cell(extract(finding)) for extract in extractors]
+                    if self.flatten_requirements:
+                        requirements = finding.get("Compliance", {}).get("RelatedRequirements") or [None]
+                        writer.writerows(row + [requirement] for requirement in requirements)
+                    else:
+                        writer.writerow(row)
+                    written += 1
         except IOError as e:
             print(f"Error writing to file {output_file} with exception {e}")
             return False
+        print(f"Wrote {written} findings to {csv_file}")
         return True
-
-    # Return nested dictionary values by passing in dictionary and keys separated by "."
-    def deep_get(self, dictionary, keys):
-        return reduce(
-            lambda d, key: d.get(key) if isinstance(d, dict) else None,
-            keys.split("."),
-            dictionary,
-        )
@@ -1,7 +1,13 @@
 import boto3
+import itertools
 import json
 import os
+import tempfile
+import time
+from functools import partial
+
 import requests
+from processor.delivery import RETRY_STATUSES, DeliveryStats, SpillQueue, deliver_batches, pooled_session
 from processor.outputs.output_base import ElectricEyeOutput
 
 
@@ -12,22 +18,13 @@ class DopsProvider(object):
     def __init__(self):
         ssm = boto3.client("ssm")
 
-        try:
-            dops_client_id_param = os.environ["DOPS_CLIENT_ID_PARAM"]
-        except Exception as e:
-            if str(e) == '"DOPS_CLIENT_ID_PARAM"':
-                dops_client_id_param == "placeholder"
-            else:
-                print(e)
-        try:
-            dops_api_key_param = os.environ["DOPS_API_KEY_PARAM"]
-        except Exception as e:
-            if str(e) == '"DOPS_API_KEY_PARAM"':
-                dops_api_key_param == "placeholder"
-            else:
-                print(e)
-
-        if dops_api_key_param or dops_client_id_param == "placeholder":
+        self.url = None
+        self.client_id = None
+        self.api_key = None
+        dops_client_id_param = os.environ.get("DOPS_CLIENT_ID_PARAM", "placeholder")
+        dops_api_key_param = os.environ.get("DOPS_API_KEY_PARAM", "placeholder")
+
+        if "placeholder" in (dops_api_key_param, dops_client_id_param):
             print('Either the DisruptOps API Keys were not provided, or the "placeholder" value was kept')
         else:
             client_id_response = ssm.get_parameter(Name=dops_client_id_param, WithDecryption=True)
@@ -37,12 +34,63 @@ class DopsProvider(object):
             self.client_id = str(client_id_response["Parameter"]["Value"])
             self.api_key = str(api_key_response["Parameter"]["Value"])
 
+        self.max_workers = int(os.environ.get("DOPS_MAX_WORKERS", 8))
+        # the collector takes one event per request, a batch size above 1 posts JSON arrays
+        self.batch_size = int(os.environ.get("DOPS_BATCH_SIZE", 1))
+        self.timeout = float(os.environ.get("DOPS_TIMEOUT", 10))
+        self.max_retries = int(os.environ.get("DOPS_MAX_RETRIES", 5))
+        self.spill_queue = SpillQueue(
+            os.environ.get(
+                "DOPS_SPILL_FILE", os.path.join(tempfile.gettempdir(), "electriceye-dops-spill.json")
+            )
+        )
+        self.stats = DeliveryStats("DisruptOps", output="dops")
+
     def write_findings(self, findings: list, **kwargs):
-        print(f"Writing {len(findings)} results to DisruptOps")
-        if self.client_id and self.api_key and self.url:
-            for finding in findings:
-                response = requests.post(
-                    self.url, data=json.dumps(finding), auth=(self.client_id, self.api_key)
-                )
-        else:
-            raise ValueError("Missing credentials for client_id or api_key")
\ No newline at end of file
+        print("Writing results to DisruptOps")
+        if not (self.client_id and self.api_key and self.url):
+            raise ValueError("Missing credentials for client_id or api_key")
+        session = pooled_session(pool_size=self.max_workers, retries=self.max_retries)
+        # findings spilled during an earlier outage are sent ahead of this run's findings
+        events = itertools.chain(self.spill_queue.drain(), findings)
+        deliver_batches(
+            iter(lambda: list(itertools.islice(events, self.batch_size)), []),
+            partial(self.post_batch, session),
+            self.stats,
+            self.max_workers * 2,
+            workers=self.max_workers,
+        )
+        # every replayed finding has now been delivered or spilled again
+        self.spill_queue.replayed()
+        session.close()
+        print(self.stats.summary())
+        return self.stats.failed == 0
+
+    def post_batch(self, session, batch):
+        """Posts a batch, spilling it to disk when the collector can not be reached"""
+        payload = json.dumps(batch[0] if self.batch_size == 1 else batch)
+        start = time.monotonic()
+        try:
+            response = session.post(
+                self.url,
+                data=payload,
+                auth=(self.client_id, self.api_key),
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+            )
+            delivered = response.ok
+            # only outages are spilled, a finding the collector rejects is rejected again
+            spill = response.status_code in RETRY_STATUSES
+            if not delivered:
+                print(f"DisruptOps rejected {len(batch)} findings with status {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to send {len(batch)} findings to DisruptOps with exception {e}")
+            delivered = False
+            spill = True
+        self.stats.record_batch(time.monotonic() - start)
+        if delivered:
+            self.stats.add(delivered=len(batch))
+            return
+        if spill:
+            self.spill_queue.spill(batch)
+        self.stats.add(failed=len(batch))
@@ -0,0 +1,167 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import hashlib
+import json
+import os
+import re
+import time
+
+import boto3
+from processor.aggregation import finding_region
+from processor.delivery import DeliveryStats, backoff_delay, deliver_batches
+from processor.outputs.output_base import ElectricEyeOutput
+
+# BatchGetItem takes up to 100 keys and BatchWriteItem up to 25 items, items are capped at 400 KB
+MAX_GET_KEYS = 100
+MAX_WRITE_ITEMS = 25
+MAX_ITEM_BYTES = 400 * 1024
+# timestamps change every run without the finding changing
+VOLATILE_FIELDS = ["FirstObservedAt", "LastObservedAt", "CreatedAt", "UpdatedAt", "ProcessedAt"]
+
+
+def content_hash(finding):
+    """Hash of the parts of a finding that matter, stable across runs of an unchanged finding"""
+    content = {key: value for key, value in finding.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def control_id(title):
+    """Control id of the check a finding comes from, e.g. EBS.3 from the title "[EBS.3] ..." """
+    match = re.match(r"\s*\[([^\]]+)\]", title or "")
+    return match.group(1) if match else title or "NONE"
+
+
+def finding_item(finding, digest):
+    """DynamoDB item of a finding, keyed by Id with attributes shaped for the GSIs
+
+    AccountRegion, Control (the check's control id) and Severity are GSI partition keys,
+    StatusUpdatedAt sorts within them so FAILED findings can be read newest first. Every
+    compliance requirement of the finding is kept in the Controls string set.
+    """
+    compliance = finding.get("Compliance") or {}
+    requirements = compliance.get("RelatedRequirements")
+    status = compliance.get("Status", "NOT_AVAILABLE")
+    updated_at = finding.get("UpdatedAt", "")
+    item = {
+        "FindingId": {"S": finding["Id"]},
+        "AccountRegion": {"S": f"{finding.get('AwsAccountId', 'unknown')}#{finding_region(finding)}"},
+        "Control": {"S": control_id(finding.get("Title"))},
+        "Severity": {"S": (finding.get("Severity") or {}).get("Label", "INFORMATIONAL")},
+        "ComplianceStatus": {"S": status},
+        "StatusUpdatedAt": {"S": f"{status}#{updated_at}"},
+        "Title": {"S": finding.get("Title", "")},
+        "UpdatedAt": {"S": updated_at},
+        "ContentHash": {"S": digest},
+        "Finding": {"S": json.dumps(finding, default=str)},
+    }
+    if requirements:
+        item["Controls"] = {"SS": sorted(set(requirements))}
+    return item
+
+
+@ElectricEyeOutput
+class DynamoDBProvider(object):
+    """Keeps the latest state of every finding in a DynamoDB table, skipping unchanged findings"""
+
+    __provider__ = "dynamodb"
+
+    def __init__(self):
+        self.dynamodb_client = boto3.client("dynamodb")
+        self.table = os.environ.get("DYNAMODB_TABLE")
+        self.skip_unchanged = os.environ.get("DYNAMODB_SKIP_UNCHANGED", "true").lower() == "true"
+        self.max_in_flight = int(os.environ.get("DYNAMODB_MAX_IN_FLIGHT", 8))
+        self.max_retries = int(os.environ.get("DYNAMODB_MAX_RETRIES", 8))
+        self.stats = DeliveryStats("DynamoDB", output="dynamodb")
+        self.unchanged = 0
+
+    def chunks(self, findings):
+        """Groups findings into chunks of up to 100 distinct Ids, a later finding replaces an earlier one"""
+        chunk = {}
+        for finding in findings:
+            chunk[finding["Id"]] = finding
+            if len(chunk) >= MAX_GET_KEYS:
+                yield chunk
+                chunk = {}
+        if chunk:
+            yield chunk
+
+    def write_findings(self, findings: list, **kwargs):
+        print("Writing results to DynamoDB")
+        if not self.table:
+            raise ValueError("DYNAMODB_TABLE was not provided")
+        deliver_batches(self.chunks(findings), self.write_chunk, self.stats, self.max_in_flight)
+        print(f"{self.stats.summary()}, {self.unchanged} unchanged findings skipped")
+        return self.stats.failed == 0
+
+    def write_chunk(self, chunk):
+        items = []
+        for finding_id, finding in chunk.items():
+            item = finding_item(finding, content_hash(finding))
+            if len(item["Finding"]["S"]) > MAX_ITEM_BYTES - 4096:
+                print(f"Skipping finding {finding_id} over the 400 KB DynamoDB item limit")
+                self.stats.add(failed=1)
+                continue
+            items.append(item)
+        if self.skip_unchanged:
+            # BatchWriteItem cannot be conditional, so the stored hashes are read first
+            stored = self.stored_hashes([item["FindingId"]["S"] for item in items])
+            changed = [item for item in items if stored.get(item["FindingId"]["S"]) != item["ContentHash"]["S"]]
+            with self.stats.lock:
+                self.unchanged += len(items) - len(changed)
+            items = changed
+        for start in range(0, len(items), MAX_WRITE_ITEMS):
+            self.write_batch(items[start : start + MAX_WRITE_ITEMS])
+
+    def stored_hashes(self, finding_ids):
+        """Returns the stored ContentHash of each Id, retrying UnprocessedKeys with backoff"""
+        hashes = {}
+        request = {
+            self.table: {
+                "Keys": [{"FindingId": {"S": finding_id}} for finding_id in finding_ids],
+                "ProjectionExpression": "FindingId, ContentHash",
+            }
+        }
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            response = self.dynamodb_client.batch_get_item(RequestItems=request)
+            for item in response.get("Responses", {}).get(self.table, []):
+                hashes[item["FindingId"]["S"]] = item.get("ContentHash", {}).get("S")
+            request = response.get("UnprocessedKeys")
+            if not request:
+                return hashes
+        # hashes that could not be read are treated as changed, the write goes ahead
+        return hashes
+
+    def write_batch(self, items):
+        """Writes up to 25 items, retrying UnprocessedItems with backoff"""
+        request = {self.table: [{"PutRequest": {"Item": item}} for item in items]}
+        pending = len(items)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            start = time.monotonic()
+            response = self.dynamodb_client.batch_write_item(RequestItems=request)
+            self.stats.record_batch(time.monotonic() - start)
+            request = response.get("UnprocessedItems")
+            unprocessed = len(request.get(self.table, [])) if request else 0
+            self.stats.add(delivered=pending - unprocessed)
+            pending = unprocessed
+            if not pending:
+                return
+            self.stats.add(retried=pending)
+        print(f"Failed to write {pending} findings to DynamoDB after {self.max_retries} retries")
+        self.stats.add(failed=pending)
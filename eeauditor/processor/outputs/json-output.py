@@ -10,10 +10,10 @@ class JsonProvider(object):
 
     def write_findings(self, findings: list, output_file: str, **kwargs):
         first = True
+        written = 0
         jsonfile = output_file + ".json"
         json_out_location = ""
         with open(jsonfile, "w") as json_out:
-            print(f"Writing {len(findings)} findings to {jsonfile}")
             print('{"Findings":[', file=json_out)
             json_out_location = os.path.abspath(json_out.name)
             for finding in findings:
@@ -23,6 +23,8 @@ class JsonProvider(object):
                 else:
                     print(",", file=json_out)
                 json.dump(finding, json_out, indent=2)
+                written += 1
             print("]}", file=json_out)
         json_out.close()
+        print(f"Wrote {written} findings to {jsonfile}")
         return True
@@ -0,0 +1,87 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import json
+import os
+
+from processor.delivery import DeliveryStats, resource_key
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import get_serializer
+
+try:
+    from confluent_kafka import KafkaException, Producer
+except ImportError:
+    Producer = None
+
+
+@ElectricEyeOutput
+class KafkaProvider(object):
+    """Produces findings to a Kafka topic keyed by resource ARN"""
+
+    __provider__ = "kafka"
+
+    def __init__(self):
+        if Producer is None:
+            raise ImportError("The kafka output needs confluent-kafka, install it with pip3 install confluent-kafka")
+        self.topic = os.environ.get("KAFKA_TOPIC", "electriceye-findings")
+        # the producer batches records per partition itself, these bound the batches by size and wait
+        self.config = {
+            "bootstrap.servers": os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092"),
+            "compression.type": os.environ.get("KAFKA_COMPRESSION", "none"),
+            "batch.size": int(os.environ.get("KAFKA_BATCH_BYTES", 1024 * 1024)),
+            "linger.ms": int(os.environ.get("KAFKA_LINGER_MS", 50)),
+            # only failed records are retried, idempotence keeps the retries from duplicating records
+            "enable.idempotence": True,
+            "message.send.max.retries": int(os.environ.get("KAFKA_MAX_RETRIES", 5)),
+        }
+        # extra producer settings such as security.protocol and sasl.mechanisms, as a JSON object
+        self.config.update(json.loads(os.environ.get("KAFKA_PRODUCER_CONFIG", "{}")))
+        self.serialize = get_serializer()
+        self.stats = DeliveryStats("Kafka", output="kafka")
+
+    def delivered(self, error, message):
+        if error is not None:
+            print(f"Failed to deliver finding {message.key()} to Kafka: {error}")
+            self.stats.add(failed=1)
+        else:
+            self.stats.add(delivered=1)
+
+    def write_findings(self, findings: list, **kwargs):
+        print("Writing results to Kafka")
+        producer = Producer(self.config)
+        for finding in findings:
+            while True:
+                try:
+                    producer.produce(
+                        self.topic,
+                        key=resource_key(finding).encode(),
+                        value=self.serialize(finding),
+                        on_delivery=self.delivered,
+                    )
+                    break
+                except BufferError:
+                    # the local queue is full, wait for deliveries to free it up
+                    producer.poll(1)
+            producer.poll(0)
+        try:
+            remaining = producer.flush(float(os.environ.get("KAFKA_FLUSH_TIMEOUT", 120)))
+        except KafkaException as e:
+            print(f"Error flushing findings to Kafka: {e}")
+            return False
+        if remaining:
+            print(f"{remaining} findings were not delivered to Kafka before the flush timeout")
+            self.stats.add(failed=remaining)
+        print(self.stats.summary())
+        return self.stats.failed == 0
@@ -0,0 +1,146 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import gzip
+import hashlib
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+from processor.delivery import DeliveryStats, backoff_delay, deliver_batches, resource_key
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import get_serializer
+
+# PutRecords accepts up to 500 records and 5 MB per request, and 1 MB per record
+MAX_BATCH_RECORDS = 500
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+MAX_RECORD_BYTES = 1024 * 1024
+RETRYABLE_REQUEST_ERRORS = ["ProvisionedThroughputExceededException", "ThrottlingException", "InternalFailure"]
+
+
+def partition_key(finding):
+    key = resource_key(finding)
+    # partition keys are limited to 256 characters, longer ARNs are hashed
+    return key if len(key) <= 256 else hashlib.sha256(key.encode()).hexdigest()
+
+
+@ElectricEyeOutput
+class KinesisProvider(object):
+    """Puts findings onto a Kinesis Data Stream keyed by resource ARN"""
+
+    __provider__ = "kinesis"
+
+    def __init__(self):
+        self.kinesis_client = boto3.client("kinesis")
+        self.stream_name = os.environ.get("KINESIS_STREAM_NAME")
+        self.compression = os.environ.get("KINESIS_COMPRESSION", "none")
+        if self.compression not in ("none", "gzip"):
+            raise ValueError(f"Unknown KINESIS_COMPRESSION {self.compression}")
+        # findings per record, aggregated records hold newline delimited findings
+        self.aggregate = int(os.environ.get("KINESIS_AGGREGATE", 1))
+        self.max_in_flight = int(os.environ.get("KINESIS_MAX_IN_FLIGHT", 4))
+        self.max_retries = int(os.environ.get("KINESIS_MAX_RETRIES", 5))
+        self.serialize = get_serializer()
+        self.stats = DeliveryStats("Kinesis", output="kinesis")
+
+    def encode(self, lines):
+        data = b"\n".join(lines)
+        return gzip.compress(data) if self.compression == "gzip" else data
+
+    def records(self, findings):
+        """Yields (record, findings in record), aggregating up to self.aggregate findings per record"""
+        lines = []
+        lines_bytes = 0
+        key = None
+        for finding in findings:
+            line = self.serialize(finding)
+            if lines and (
+                len(lines) >= self.aggregate or lines_bytes + len(line) > MAX_RECORD_BYTES - 1024
+            ):
+                yield {"Data": self.encode(lines), "PartitionKey": key}, len(lines)
+                lines = []
+                lines_bytes = 0
+            if not lines:
+                key = partition_key(finding)
+            lines.append(line)
+            lines_bytes += len(line) + 1
+        if lines:
+            yield {"Data": self.encode(lines), "PartitionKey": key}, len(lines)
+
+    def batches(self, findings):
+        """Groups records into PutRecords requests capped by count and size"""
+        batch = []
+        batch_bytes = 0
+        for record, count in self.records(findings):
+            size = len(record["Data"]) + len(record["PartitionKey"])
+            if size > MAX_RECORD_BYTES:
+                print(f"Skipping a record of {count} findings over the 1 MB Kinesis limit")
+                self.stats.add(failed=count)
+                continue
+            if batch and (len(batch) >= MAX_BATCH_RECORDS or batch_bytes + size > MAX_BATCH_BYTES):
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append((record, count))
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def write_findings(self, findings: list, **kwargs):
+        print("Writing results to Kinesis")
+        if not self.stream_name:
+            raise ValueError("KINESIS_STREAM_NAME was not provided")
+        deliver_batches(
+            self.batches(findings),
+            self.put_batch,
+            self.stats,
+            self.max_in_flight,
+            # aggregated records hold several findings
+            size=lambda batch: sum(count for record, count in batch),
+        )
+        print(self.stats.summary())
+        return self.stats.failed == 0
+
+    def put_batch(self, batch):
+        """Puts a batch, retrying only the records that failed with backoff"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            start = time.monotonic()
+            try:
+                response = self.kinesis_client.put_records(
+                    StreamName=self.stream_name, Records=[record for record, count in batch]
+                )
+            except ClientError as e:
+                self.stats.record_batch(time.monotonic() - start)
+                if e.response["Error"]["Code"] not in RETRYABLE_REQUEST_ERRORS:
+                    print(f"Failed to put {len(batch)} records with exception {e}")
+                    break
+                self.stats.add(retried=sum(count for record, count in batch))
+                continue
+            self.stats.record_batch(time.monotonic() - start)
+            # results are in the order of the records sent, failed ones carry an ErrorCode
+            failed = [
+                entry for entry, result in zip(batch, response["Records"]) if "ErrorCode" in result
+            ]
+            self.stats.add(
+                delivered=sum(count for record, count in batch) - sum(count for record, count in failed)
+            )
+            batch = failed
+            if not batch:
+                return
+            self.stats.add(retried=sum(count for record, count in batch))
+        self.stats.add(failed=sum(count for record, count in batch))
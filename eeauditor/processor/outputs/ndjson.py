@@ -0,0 +1,68 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import os
+
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import EXTENSIONS, get_serializer, open_compressed
+
+
+@ElectricEyeOutput
+class NdjsonProvider(object):
+    """Streams findings as JSON Lines, one compact finding per line"""
+
+    __provider__ = "ndjson"
+
+    def __init__(self):
+        self.compression = os.environ.get("NDJSON_COMPRESSION", "none")
+        if self.compression not in EXTENSIONS:
+            raise ValueError(f"Unknown NDJSON_COMPRESSION {self.compression}")
+        # a new file is started once either limit is reached, 0 disables the limit
+        self.rotate_bytes = int(os.environ.get("NDJSON_ROTATE_BYTES", 0))
+        self.rotate_count = int(os.environ.get("NDJSON_ROTATE_COUNT", 0))
+        self.flush_every = int(os.environ.get("NDJSON_FLUSH_EVERY", 500))
+        self.serialize = get_serializer()
+
+    def file_name(self, output_file, part):
+        suffix = f"-{part:05d}" if self.rotate_bytes or self.rotate_count else ""
+        return f"{output_file}{suffix}.ndjson{EXTENSIONS[self.compression]}"
+
+    def write_findings(self, findings: list, output_file: str, **kwargs):
+        part = 0
+        written = 0
+        file_findings = 0
+        file_bytes = 0
+        out = open_compressed(self.file_name(output_file, part), self.compression)
+        try:
+            for finding in findings:
+                if (self.rotate_count and file_findings >= self.rotate_count) or (
+                    self.rotate_bytes and file_bytes >= self.rotate_bytes
+                ):
+                    out.close()
+                    part += 1
+                    file_findings = 0
+                    file_bytes = 0
+                    out = open_compressed(self.file_name(output_file, part), self.compression)
+                line = self.serialize(finding) + b"\n"
+                out.write(line)
+                file_findings += 1
+                file_bytes += len(line)
+                written += 1
+                if written % self.flush_every == 0:
+                    out.flush()
+        finally:
+            out.close()
+        print(f"Wrote {written} findings to {part + 1} file(s) starting at {self.file_name(output_file, 0)}")
+        return True
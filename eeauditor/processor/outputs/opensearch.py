@@ -0,0 +1,150 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import os
+import time
+from functools import partial
+
+import boto3
+import requests
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from requests.auth import AuthBase
+from processor.delivery import RETRY_STATUSES, DeliveryStats, backoff_delay, deliver_batches, pooled_session
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import get_serializer
+
+
+class SigV4RequestAuth(AuthBase):
+    """Signs requests to an Amazon OpenSearch Service domain with the boto3 credentials"""
+
+    def __init__(self, region):
+        self.session = boto3.Session()
+        self.region = region or self.session.region_name
+
+    def __call__(self, request):
+        aws_request = AWSRequest(
+            method=request.method,
+            url=request.url,
+            data=request.body,
+            headers={"Content-Type": request.headers.get("Content-Type")},
+        )
+        credentials = self.session.get_credentials().get_frozen_credentials()
+        SigV4Auth(credentials, "es", self.region).add_auth(aws_request)
+        request.headers.update(dict(aws_request.headers))
+        return request
+
+
+@ElectricEyeOutput
+class OpenSearchProvider(object):
+    """Indexes findings into OpenSearch with the _bulk API, using the finding Id as document id"""
+
+    __provider__ = "opensearch"
+
+    def __init__(self):
+        self.url = os.environ.get("OPENSEARCH_URL", "").rstrip("/")
+        self.index = os.environ.get("OPENSEARCH_INDEX", "electriceye-findings")
+        # date based indices append the day the finding was updated, e.g. electriceye-findings-2021.03.01
+        self.date_indices = os.environ.get("OPENSEARCH_DATE_INDICES", "false").lower() == "true"
+        self.batch_bytes = int(os.environ.get("OPENSEARCH_BATCH_BYTES", 5 * 1024 * 1024))
+        self.max_in_flight = int(os.environ.get("OPENSEARCH_MAX_IN_FLIGHT", 4))
+        self.max_retries = int(os.environ.get("OPENSEARCH_MAX_RETRIES", 5))
+        self.timeout = float(os.environ.get("OPENSEARCH_TIMEOUT", 30))
+        self.auth = None
+        auth_type = os.environ.get("OPENSEARCH_AUTH", "none")
+        if auth_type == "sigv4":
+            self.auth = SigV4RequestAuth(os.environ.get("OPENSEARCH_REGION"))
+        elif auth_type == "basic":
+            password_param = os.environ.get("OPENSEARCH_PASSWORD_PARAM")
+            password = boto3.client("ssm").get_parameter(Name=password_param, WithDecryption=True)
+            self.auth = (os.environ.get("OPENSEARCH_USERNAME"), password["Parameter"]["Value"])
+        self.serialize = get_serializer()
+        self.stats = DeliveryStats("OpenSearch", output="opensearch")
+
+    def index_name(self, finding):
+        if not self.date_indices:
+            return self.index
+        return f"{self.index}-{finding.get('UpdatedAt', '')[:10].replace('-', '.')}"
+
+    def bulk_batches(self, findings):
+        """Groups findings into lists of bulk action and document lines capped by size"""
+        batch = []
+        batch_bytes = 0
+        for finding in findings:
+            action = self.serialize({"index": {"_index": self.index_name(finding), "_id": finding["Id"]}})
+            document = self.serialize(finding)
+            size = len(action) + len(document) + 2
+            if batch and batch_bytes + size > self.batch_bytes:
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append((action, document))
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def write_findings(self, findings: list, **kwargs):
+        print("Writing results to OpenSearch")
+        if not self.url:
+            raise ValueError("OPENSEARCH_URL was not provided")
+        session = pooled_session(pool_size=self.max_in_flight, retries=self.max_retries)
+        deliver_batches(
+            self.bulk_batches(findings), partial(self.post_batch, session), self.stats, self.max_in_flight
+        )
+        session.close()
+        print(self.stats.summary())
+        return self.stats.failed == 0
+
+    def post_batch(self, session, batch):
+        """Posts a bulk request, retrying the items OpenSearch rejected with a retryable status"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            payload = b"".join(action + b"\n" + document + b"\n" for action, document in batch)
+            start = time.monotonic()
+            try:
+                response = session.post(
+                    f"{self.url}/_bulk",
+                    data=payload,
+                    auth=self.auth,
+                    headers={"Content-Type": "application/x-ndjson"},
+                    timeout=self.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to send {len(batch)} findings to OpenSearch with exception {e}")
+                break
+            self.stats.record_batch(time.monotonic() - start)
+            if not response.ok:
+                print(f"OpenSearch rejected {len(batch)} findings with status {response.status_code}")
+                break
+            result = response.json()
+            if not result.get("errors"):
+                self.stats.add(delivered=len(batch))
+                return
+            retry = []
+            for item, line in zip(result["items"], batch):
+                status = item["index"]["status"]
+                if status < 300:
+                    self.stats.add(delivered=1)
+                elif status in RETRY_STATUSES:
+                    retry.append(line)
+                else:
+                    print(f"Finding {item['index']['_id']} was rejected: {item['index'].get('error')}")
+                    self.stats.add(failed=1)
+            batch = retry
+            if not batch:
+                return
+            self.stats.add(retried=len(batch))
+        self.stats.add(failed=len(batch))
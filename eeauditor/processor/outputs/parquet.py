@@ -0,0 +1,235 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import datetime
+import json
+import os
+import uuid
+
+from processor.outputs.output_base import ElectricEyeOutput
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# highly repetitive columns which shrink to a fraction of their size when dictionary encoded,
+# list columns are named by the path of their leaf as that is what pyarrow matches against
+DICTIONARY_COLUMNS = [
+    "SchemaVersion",
+    "ProductArn",
+    "AwsAccountId",
+    "Types.list.element",
+    "SeverityLabel",
+    "Title",
+    "RemediationText",
+    "RemediationUrl",
+    "ProductName",
+    "ComplianceStatus",
+    "RelatedRequirements.list.element",
+    "WorkflowStatus",
+    "RecordState",
+]
+
+
+def finding_schema():
+    resource = pa.struct(
+        [
+            ("Type", pa.string()),
+            ("Id", pa.string()),
+            ("Partition", pa.string()),
+            ("Region", pa.string()),
+            ("Details", pa.string()),
+        ]
+    )
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema(
+        [
+            ("SchemaVersion", pa.string()),
+            ("Id", pa.string()),
+            ("ProductArn", pa.string()),
+            ("GeneratorId", pa.string()),
+            ("AwsAccountId", pa.string()),
+            ("Types", pa.list_(pa.string())),
+            ("FirstObservedAt", timestamp),
+            ("CreatedAt", timestamp),
+            ("UpdatedAt", timestamp),
+            ("SeverityLabel", pa.string()),
+            ("Confidence", pa.int32()),
+            ("Title", pa.string()),
+            ("Description", pa.string()),
+            ("RemediationText", pa.string()),
+            ("RemediationUrl", pa.string()),
+            ("ProductName", pa.string()),
+            ("Resources", pa.list_(resource)),
+            ("ComplianceStatus", pa.string()),
+            ("RelatedRequirements", pa.list_(pa.string())),
+            ("WorkflowStatus", pa.string()),
+            ("RecordState", pa.string()),
+        ]
+    )
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def finding_service(finding):
+    """Returns the AWS service of a finding's first resource, e.g. s3 or ec2"""
+    resources = finding.get("Resources") or [{}]
+    resource_id = resources[0].get("Id", "")
+    if resource_id.startswith("arn:"):
+        return resource_id.split(":")[2]
+    resource_type = resources[0].get("Type", "Other")
+    return resource_type[3:].lower() if resource_type.startswith("Aws") else resource_type.lower()
+
+
+def flatten_finding(finding):
+    """Flattens an ASFF finding into a row of the Parquet schema"""
+    remediation = finding.get("Remediation", {}).get("Recommendation", {})
+    compliance = finding.get("Compliance", {})
+    return {
+        "SchemaVersion": finding.get("SchemaVersion"),
+        "Id": finding.get("Id"),
+        "ProductArn": finding.get("ProductArn"),
+        "GeneratorId": finding.get("GeneratorId"),
+        "AwsAccountId": finding.get("AwsAccountId"),
+        "Types": finding.get("Types"),
+        "FirstObservedAt": parse_timestamp(finding.get("FirstObservedAt")),
+        "CreatedAt": parse_timestamp(finding.get("CreatedAt")),
+        "UpdatedAt": parse_timestamp(finding.get("UpdatedAt")),
+        "SeverityLabel": finding.get("Severity", {}).get("Label"),
+        "Confidence": finding.get("Confidence"),
+        "Title": finding.get("Title"),
+        "Description": finding.get("Description"),
+        "RemediationText": remediation.get("Text"),
+        "RemediationUrl": remediation.get("Url"),
+        "ProductName": finding.get("ProductFields", {}).get("Product Name"),
+        "Resources": [
+            {
+                "Type": resource.get("Type"),
+                "Id": resource.get("Id"),
+                "Partition": resource.get("Partition"),
+                "Region": resource.get("Region"),
+                "Details": json.dumps(resource["Details"]) if "Details" in resource else None,
+            }
+            for resource in finding.get("Resources", [])
+        ],
+        "ComplianceStatus": compliance.get("Status"),
+        "RelatedRequirements": compliance.get("RelatedRequirements"),
+        "WorkflowStatus": finding.get("Workflow", {}).get("Status"),
+        "RecordState": finding.get("RecordState"),
+    }
+
+
+def unflatten_finding(row):
+    """Turns a row of the Parquet schema back into an ASFF finding, the inverse of flatten_finding"""
+
+    def timestamp(value):
+        return value.isoformat().replace("+00:00", "Z") if value else None
+
+    finding = {
+        "SchemaVersion": row.get("SchemaVersion"),
+        "Id": row.get("Id"),
+        "ProductArn": row.get("ProductArn"),
+        "GeneratorId": row.get("GeneratorId"),
+        "AwsAccountId": row.get("AwsAccountId"),
+        "Types": row.get("Types"),
+        "FirstObservedAt": timestamp(row.get("FirstObservedAt")),
+        "CreatedAt": timestamp(row.get("CreatedAt")),
+        "UpdatedAt": timestamp(row.get("UpdatedAt")),
+        "Severity": {"Label": row.get("SeverityLabel")},
+        "Confidence": row.get("Confidence"),
+        "Title": row.get("Title"),
+        "Description": row.get("Description"),
+        "Remediation": {"Recommendation": {"Text": row.get("RemediationText"), "Url": row.get("RemediationUrl")}},
+        "ProductFields": {"Product Name": row.get("ProductName")},
+        "Resources": [],
+        "Compliance": {"Status": row.get("ComplianceStatus"), "RelatedRequirements": row.get("RelatedRequirements")},
+        "Workflow": {"Status": row.get("WorkflowStatus")},
+        "RecordState": row.get("RecordState"),
+    }
+    for resource in row.get("Resources") or []:
+        resource = {key: value for key, value in resource.items() if value is not None}
+        if "Details" in resource:
+            resource["Details"] = json.loads(resource["Details"])
+        finding["Resources"].append(resource)
+    return finding
+
+
+def finding_partition(finding):
+    """Returns the hive style date / account / region / service partition of a finding"""
+    resources = finding.get("Resources") or [{}]
+    return (
+        f"date={(finding.get('UpdatedAt') or datetime.datetime.utcnow().isoformat())[:10]}",
+        f"account={finding.get('AwsAccountId', 'unknown')}",
+        f"region={resources[0].get('Region', 'global')}",
+        f"service={finding_service(finding)}",
+    )
+
+
+@ElectricEyeOutput
+class ParquetProvider(object):
+    """Writes findings to a Parquet dataset partitioned by date, account, region and service"""
+
+    __provider__ = "parquet"
+
+    def __init__(self):
+        if pa is None:
+            raise ImportError("The parquet output needs pyarrow, install it with pip3 install pyarrow")
+        self.schema = finding_schema()
+        self.row_group_size = int(os.environ.get("PARQUET_ROW_GROUP_SIZE", 50000))
+        self.compression = os.environ.get("PARQUET_COMPRESSION", "zstd")
+
+    def write_findings(self, findings: list, output_file: str, **kwargs):
+        dataset = os.environ.get("PARQUET_DATASET_PATH", f"{output_file}-parquet")
+        file_name = f"part-{uuid.uuid4().hex}.parquet"
+        writers = {}
+        buffers = {}
+        written = 0
+        try:
+            for finding in findings:
+                partition = finding_partition(finding)
+                buffer = buffers.setdefault(partition, [])
+                buffer.append(flatten_finding(finding))
+                written += 1
+                if len(buffer) >= self.row_group_size:
+                    self.write_row_group(writers, dataset, file_name, partition, buffer)
+                    buffers[partition] = []
+            for partition, buffer in buffers.items():
+                if buffer:
+                    self.write_row_group(writers, dataset, file_name, partition, buffer)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        print(f"Wrote {written} findings to {len(writers)} partition(s) of {dataset}")
+        return True
+
+    def write_row_group(self, writers, dataset, file_name, partition, rows):
+        if partition not in writers:
+            directory = os.path.join(dataset, *partition)
+            os.makedirs(directory, exist_ok=True)
+            writers[partition] = pq.ParquetWriter(
+                os.path.join(directory, file_name),
+                self.schema,
+                compression=self.compression,
+                use_dictionary=DICTIONARY_COLUMNS,
+            )
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        writers[partition].write_table(table, row_group_size=self.row_group_size)
@@ -0,0 +1,183 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import csv
+import datetime
+import io
+import json
+import os
+
+import boto3
+from processor.outputs.output_base import ElectricEyeOutput
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+COLUMNS = [
+    "id",
+    "run_date",
+    "account_id",
+    "region",
+    "generator_id",
+    "title",
+    "severity",
+    "compliance_status",
+    "record_state",
+    "created_at",
+    "updated_at",
+    "finding",
+]
+# connections are kept for the life of the process, so repeated scans from one process reuse them
+_connections = {}
+
+
+def get_connection(dsn):
+    connection = _connections.get(dsn)
+    if connection is None or connection.closed:
+        connection = psycopg2.connect(dsn)
+        _connections[dsn] = connection
+    return connection
+
+
+def finding_row(finding, run_date):
+    resources = finding.get("Resources") or [{}]
+    return (
+        finding["Id"],
+        run_date,
+        finding.get("AwsAccountId"),
+        resources[0].get("Region"),
+        finding.get("GeneratorId"),
+        finding.get("Title"),
+        finding.get("Severity", {}).get("Label"),
+        finding.get("Compliance", {}).get("Status"),
+        finding.get("RecordState"),
+        finding.get("CreatedAt"),
+        finding.get("UpdatedAt"),
+        json.dumps(finding),
+    )
+
+
+class CopyStream(object):
+    """Read only file object rendering rows as CSV as COPY reads them
+
+    Only about one read of rows is held in memory however many findings are copied.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or self.buffer.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.count += 1
+        data = self.buffer.getvalue()
+        if size >= 0 and len(data) > size:
+            data, rest = data[:size], data[size:]
+        else:
+            rest = ""
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffer.write(rest)
+        return data
+
+
+@ElectricEyeOutput
+class PostgresProvider(object):
+    """Copies findings into PostgreSQL through a staging table merged on the finding Id"""
+
+    __provider__ = "postgres"
+
+    def __init__(self):
+        if psycopg2 is None:
+            raise ImportError("The postgres output needs psycopg2, install it with pip3 install psycopg2-binary")
+        self.dsn = os.environ.get("POSTGRES_DSN")
+        dsn_param = os.environ.get("POSTGRES_DSN_PARAM")
+        if dsn_param:
+            ssm = boto3.client("ssm")
+            self.dsn = ssm.get_parameter(Name=dsn_param, WithDecryption=True)["Parameter"]["Value"]
+        self.table = os.environ.get("POSTGRES_TABLE", "electriceye_findings")
+        # partitioned tables keep one snapshot of the findings per run date
+        self.partition_by_date = os.environ.get("POSTGRES_PARTITION_BY_DATE", "false").lower() == "true"
+
+    def create_table(self, cursor, run_date):
+        primary_key = "run_date, id" if self.partition_by_date else "id"
+        partitioning = " PARTITION BY RANGE (run_date)" if self.partition_by_date else ""
+        cursor.execute(
+            f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                id TEXT NOT NULL,
+                run_date DATE NOT NULL,
+                account_id TEXT,
+                region TEXT,
+                generator_id TEXT,
+                title TEXT,
+                severity TEXT,
+                compliance_status TEXT,
+                record_state TEXT,
+                created_at TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ,
+                finding JSONB,
+                PRIMARY KEY ({primary_key})
+            ){partitioning}"""
+        )
+        if self.partition_by_date:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table}_{run_date:%Y%m%d} PARTITION OF {self.table} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                (run_date, run_date + datetime.timedelta(days=1)),
+            )
+        for column in ("account_id", "severity", "compliance_status"):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_{column} ON {self.table} ({column})")
+
+    def write_findings(self, findings: list, **kwargs):
+        if not self.dsn:
+            raise ValueError("Neither POSTGRES_DSN nor POSTGRES_DSN_PARAM were provided")
+        run_date = datetime.datetime.utcnow().date()
+        connection = get_connection(self.dsn)
+        columns = ", ".join(COLUMNS)
+        keys = ["run_date", "id"] if self.partition_by_date else ["id"]
+        # unpartitioned rows take the date of the latest run that reported them
+        updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS if column not in keys)
+        conflict = ", ".join(keys)
+        stream = CopyStream(finding_row(finding, run_date) for finding in findings)
+        try:
+            # a single transaction, readers see either all or none of this run's findings
+            with connection, connection.cursor() as cursor:
+                self.create_table(cursor, run_date)
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {self.table}_staging "
+                    f"(LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                cursor.copy_expert(
+                    f"COPY {self.table}_staging ({columns}) FROM STDIN WITH (FORMAT csv)", stream
+                )
+                # ON CONFLICT can not update a row twice, so a finding reported twice is merged once
+                cursor.execute(
+                    f"INSERT INTO {self.table} ({columns}) "
+                    f"SELECT DISTINCT ON (id) {columns} FROM {self.table}_staging ORDER BY id "
+                    f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+                )
+        except psycopg2.Error as e:
+            print(f"Error writing findings to PostgreSQL with exception {e}")
+            return False
+        print(f"Wrote {stream.count} findings to PostgreSQL table {self.table}")
+        return True
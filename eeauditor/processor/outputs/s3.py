@@ -0,0 +1,262 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import boto3
+from processor.delivery import backoff_delay
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.outputs.parquet import finding_schema, flatten_finding, pa, pq
+from processor.serializers import get_serializer
+
+# every part but the last has to be at least 5 MB
+MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+def scan_partition(finding):
+    """Account and region a finding was scanned in, taken from its ProductArn"""
+    arn = finding.get("ProductArn", "").split(":")
+    region = arn[3] if len(arn) > 4 else "unknown"
+    return finding.get("AwsAccountId", "unknown"), region
+
+
+class MultipartWriter(object):
+    """Write only file object streaming into an S3 multipart upload
+
+    Parts are uploaded with a SHA-256 checksum as soon as part_bytes are buffered,
+    up to max_in_flight at once, and retried with backoff when they fail.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_bytes, max_in_flight, max_retries):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = max(part_bytes, MIN_PART_BYTES)
+        self.max_retries = max_retries
+        self.buffer = bytearray()
+        self.size = 0
+        self.closed = False
+        self.upload_id = s3_client.create_multipart_upload(
+            Bucket=bucket, Key=key, ChecksumAlgorithm="SHA256"
+        )["UploadId"]
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.in_flight = set()
+        self.parts = []
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        if len(self.buffer) >= self.part_bytes:
+            self.flush_part()
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def flush_part(self):
+        if len(self.in_flight) >= self.max_in_flight:
+            done, self.in_flight = wait(self.in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.parts.append(future.result())
+        part_number = len(self.parts) + len(self.in_flight) + 1
+        self.in_flight.add(self.pool.submit(self.upload_part, part_number, bytes(self.buffer)))
+        self.buffer = bytearray()
+
+    def upload_part(self, part_number, data):
+        checksum = base64.b64encode(hashlib.sha256(data).digest()).decode()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self.upload_id,
+                    PartNumber=part_number,
+                    Body=data,
+                    ChecksumAlgorithm="SHA256",
+                    ChecksumSHA256=checksum,
+                )
+                return {"PartNumber": part_number, "ETag": response["ETag"], "ChecksumSHA256": checksum}
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Retrying part {part_number} of s3://{self.bucket}/{self.key} after exception {e}")
+
+    def close(self):
+        """Uploads the last part and completes the upload, returns its composite checksum"""
+        if self.closed:
+            return None
+        self.closed = True
+        try:
+            if self.buffer or not (self.parts or self.in_flight):
+                self.flush_part()
+            for future in wait(self.in_flight).done:
+                self.parts.append(future.result())
+            self.pool.shutdown()
+            response = self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": sorted(self.parts, key=lambda part: part["PartNumber"])},
+            )
+        except Exception:
+            self.abort()
+            raise
+        return response.get("ChecksumSHA256")
+
+    def abort(self):
+        self.closed = True
+        self.pool.shutdown(cancel_futures=True)
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+class NdjsonObject(object):
+    """A gzip compressed NDJSON object of the findings of one partition"""
+
+    extension = "ndjson.gz"
+
+    def __init__(self, writer, serialize):
+        self.writer = writer
+        self.serialize = serialize
+        self.stream = gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=6)
+
+    def add(self, finding):
+        self.stream.write(self.serialize(finding) + b"\n")
+
+    def close(self):
+        self.stream.close()
+
+
+class ParquetObject(object):
+    """A Parquet object of the findings of one partition, written a row group at a time"""
+
+    extension = "parquet"
+
+    def __init__(self, writer, row_group_size):
+        self.schema = finding_schema()
+        self.parquet_writer = pq.ParquetWriter(pa.PythonFile(writer, mode="w"), self.schema, compression="zstd")
+        self.row_group_size = row_group_size
+        self.rows = []
+
+    def add(self, finding):
+        self.rows.append(flatten_finding(finding))
+        if len(self.rows) >= self.row_group_size:
+            self.write_rows()
+
+    def write_rows(self):
+        if self.rows:
+            self.parquet_writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.write_rows()
+        self.parquet_writer.close()
+
+
+@ElectricEyeOutput
+class S3Provider(object):
+    """Streams findings into S3 objects partitioned by account, region, date and scan"""
+
+    __provider__ = "s3"
+
+    def __init__(self):
+        self.s3_client = boto3.client("s3")
+        self.bucket = os.environ.get("S3_BUCKET")
+        self.prefix = os.environ.get("S3_PREFIX", "electriceye").strip("/")
+        self.format = os.environ.get("S3_FORMAT", "ndjson")
+        if self.format not in ("ndjson", "parquet"):
+            raise ValueError(f"Unknown S3_FORMAT {self.format}")
+        if self.format == "parquet" and pa is None:
+            raise ImportError("Parquet objects need pyarrow, install it with pip3 install pyarrow")
+        self.part_bytes = int(os.environ.get("S3_PART_BYTES", 16 * 1024 * 1024))
+        self.max_in_flight = int(os.environ.get("S3_MAX_IN_FLIGHT", 4))
+        self.max_retries = int(os.environ.get("S3_MAX_RETRIES", 5))
+        self.row_group_size = int(os.environ.get("PARQUET_ROW_GROUP_SIZE", 50000))
+        self.serialize = get_serializer()
+
+    def body_class(self):
+        return ParquetObject if self.format == "parquet" else NdjsonObject
+
+    def open_object(self, key):
+        writer = MultipartWriter(
+            self.s3_client, self.bucket, key, self.part_bytes, self.max_in_flight, self.max_retries
+        )
+        if self.format == "parquet":
+            return writer, ParquetObject(writer, self.row_group_size)
+        return writer, NdjsonObject(writer, self.serialize)
+
+    def write_findings(self, findings: list, **kwargs):
+        if not self.bucket:
+            raise ValueError("S3_BUCKET was not provided")
+        now = datetime.datetime.utcnow()
+        scan_id = f"{now:%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+        objects = {}
+        counts = {}
+        try:
+            for finding in findings:
+                partition = scan_partition(finding)
+                if partition not in objects:
+                    account, region = partition
+                    key = (
+                        f"{self.prefix}/account={account}/region={region}/date={now:%Y-%m-%d}/"
+                        f"scan={scan_id}/findings.{self.body_class().extension}"
+                    )
+                    objects[partition] = (key, *self.open_object(key))
+                    counts[partition] = 0
+                objects[partition][2].add(finding)
+                counts[partition] += 1
+            files = []
+            for partition, (key, writer, body) in objects.items():
+                body.close()
+                checksum = writer.close()
+                files.append(
+                    {"Key": key, "Findings": counts[partition], "Bytes": writer.size, "ChecksumSHA256": checksum}
+                )
+        except Exception:
+            for key, writer, body in objects.values():
+                if not writer.closed:
+                    writer.abort()
+            raise
+        manifest = {
+            "ScanId": scan_id,
+            "CreatedAt": now.isoformat() + "Z",
+            "Format": self.format,
+            "Findings": sum(counts.values()),
+            "Files": files,
+        }
+        manifest_body = json.dumps(manifest, indent=2).encode()
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}/manifests/scan={scan_id}.json",
+            Body=manifest_body,
+            ContentType="application/json",
+            ChecksumAlgorithm="SHA256",
+            ChecksumSHA256=base64.b64encode(hashlib.sha256(manifest_body).digest()).decode(),
+        )
+        print(f"Wrote {manifest['Findings']} findings to {len(files)} objects in s3://{self.bucket}/{self.prefix}")
+        return True
@@ -1,17 +1,90 @@
-import itertools
+import json
+import os
+import time
 
 import boto3
+from botocore.exceptions import ClientError
+from processor.delivery import DeliveryStats, TokenBucket, backoff_delay, deliver_batches
 from processor.outputs.output_base import ElectricEyeOutput
 
+# BatchImportFindings accepts up to 100 findings and 6 MB per request
+MAX_BATCH_FINDINGS = 100
+MAX_BATCH_BYTES = 6 * 1024 * 1024 - 64 * 1024
+# failed findings with these error codes are never going to be accepted
+NON_RETRYABLE_ERRORS = ["InvalidInput", "AccessDeniedException", "FindingSizeExceeded"]
+# request level errors that are worth retrying
+RETRYABLE_REQUEST_ERRORS = ["ThrottlingException", "TooManyRequestsException", "InternalException"]
+
+
+def batch_findings(findings, max_findings=MAX_BATCH_FINDINGS, max_bytes=MAX_BATCH_BYTES):
+    """Groups findings into batches capped by both count and serialized size"""
+    batch = []
+    batch_bytes = 0
+    for finding in findings:
+        size = len(json.dumps(finding, separators=(",", ":")))
+        if batch and (len(batch) >= max_findings or batch_bytes + size > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(finding)
+        batch_bytes += size
+    if batch:
+        yield batch
+
 
 @ElectricEyeOutput
 class SecHubProvider(object):
     __provider__ = "sechub"
 
+    def __init__(self):
+        self.sechub_client = boto3.client("securityhub")
+        # BatchImportFindings is limited to 10 TPS with bursts of 30 per account and region
+        self.max_in_flight = int(os.environ.get("SECHUB_MAX_IN_FLIGHT", 4))
+        self.max_retries = int(os.environ.get("SECHUB_MAX_RETRIES", 5))
+        self.rate_limit = TokenBucket(
+            rate=float(os.environ.get("SECHUB_TPS", 10)),
+            burst=float(os.environ.get("SECHUB_BURST", 30)),
+        )
+        self.stats = DeliveryStats("SecurityHub", output="sechub")
+
     def write_findings(self, findings: list, **kwargs):
-        print(f"Writing {len(findings)} results to SecurityHub")
-        if findings:
-            sechub_client = boto3.client("securityhub")
-            for i in range(0, len(findings), 100):
-                sechub_client.batch_import_findings(Findings=findings[i : i + 100])
-        return
+        print("Writing results to SecurityHub")
+        deliver_batches(batch_findings(findings), self.import_batch, self.stats, self.max_in_flight)
+        print(self.stats.summary())
+        return self.stats.failed == 0
+
+    def import_batch(self, batch):
+        """Imports a batch, retrying throttled requests and failed findings with backoff"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            self.rate_limit.acquire()
+            start = time.monotonic()
+            try:
+                response = self.sechub_client.batch_import_findings(Findings=batch)
+            except ClientError as e:
+                self.stats.record_batch(time.monotonic() - start)
+                if e.response["Error"]["Code"] not in RETRYABLE_REQUEST_ERRORS:
+                    print(f"Failed to import {len(batch)} findings with exception {e}")
+                    break
+                self.stats.add(retried=len(batch))
+                continue
+            except Exception as e:
+                print(f"Failed to import {len(batch)} findings with exception {e}")
+                break
+            self.stats.record_batch(time.monotonic() - start)
+            self.stats.add(delivered=response["SuccessCount"])
+            if not response["FailedCount"]:
+                return
+            retryable = set()
+            for failed in response["FailedFindings"]:
+                if failed["ErrorCode"] in NON_RETRYABLE_ERRORS:
+                    print(f"Finding {failed['Id']} was rejected: {failed['ErrorMessage']}")
+                    self.stats.add(failed=1)
+                else:
+                    retryable.add(failed["Id"])
+            batch = [finding for finding in batch if finding["Id"] in retryable]
+            if not batch:
+                return
+            self.stats.add(retried=len(batch))
+        self.stats.add(failed=len(batch))
@@ -0,0 +1,189 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import datetime
+import gzip
+import itertools
+import os
+import tempfile
+import time
+import uuid
+from functools import partial
+
+import boto3
+import requests
+from processor.delivery import RETRY_STATUSES, DeliveryStats, SpillQueue, deliver_batches, pooled_session
+from processor.outputs.output_base import ElectricEyeOutput
+from processor.serializers import get_serializer
+
+
+def event_time(finding):
+    """Epoch seconds of the finding's UpdatedAt, which Splunk uses as the event time"""
+    try:
+        return datetime.datetime.fromisoformat(finding["UpdatedAt"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, ValueError):
+        return time.time()
+
+
+@ElectricEyeOutput
+class SplunkHecProvider(object):
+    """Sends findings to a Splunk HTTP Event Collector as batched multi event payloads"""
+
+    __provider__ = "splunk_hec"
+
+    def __init__(self):
+        self.url = os.environ.get("SPLUNK_HEC_URL", "").rstrip("/")
+        self.token = os.environ.get("SPLUNK_HEC_TOKEN")
+        token_param = os.environ.get("SPLUNK_HEC_TOKEN_PARAM")
+        if token_param:
+            ssm = boto3.client("ssm")
+            self.token = ssm.get_parameter(Name=token_param, WithDecryption=True)["Parameter"]["Value"]
+        self.index = os.environ.get("SPLUNK_HEC_INDEX")
+        self.sourcetype = os.environ.get("SPLUNK_HEC_SOURCETYPE", "electriceye:finding")
+        # HEC rejects payloads over max_content_length, 800 KB by default, before decompression
+        self.batch_bytes = int(os.environ.get("SPLUNK_HEC_BATCH_BYTES", 750 * 1024))
+        self.compress = os.environ.get("SPLUNK_HEC_GZIP", "true").lower() == "true"
+        self.max_in_flight = int(os.environ.get("SPLUNK_HEC_MAX_IN_FLIGHT", 4))
+        self.max_retries = int(os.environ.get("SPLUNK_HEC_MAX_RETRIES", 5))
+        self.timeout = float(os.environ.get("SPLUNK_HEC_TIMEOUT", 30))
+        self.verify = os.environ.get("SPLUNK_HEC_VERIFY_TLS", "true").lower() == "true"
+        # indexer acknowledgement must also be enabled on the HEC token
+        self.use_ack = os.environ.get("SPLUNK_HEC_ACK", "false").lower() == "true"
+        self.ack_timeout = float(os.environ.get("SPLUNK_HEC_ACK_TIMEOUT", 120))
+        self.channel = str(uuid.uuid4())
+        self.spill_queue = SpillQueue(
+            os.environ.get(
+                "SPLUNK_HEC_SPILL_FILE", os.path.join(tempfile.gettempdir(), "electriceye-splunk-spill.json")
+            )
+        )
+        self.serialize = get_serializer()
+        self.stats = DeliveryStats("Splunk HEC", output="splunk_hec")
+
+    def headers(self):
+        headers = {"Authorization": f"Splunk {self.token}", "X-Splunk-Request-Channel": self.channel}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+        return headers
+
+    def event_batches(self, findings):
+        """Groups findings into lists of serialized HEC events capped by size"""
+        batch = []
+        batch_bytes = 0
+        for finding in findings:
+            event = {"time": event_time(finding), "sourcetype": self.sourcetype, "event": finding}
+            if self.index:
+                event["index"] = self.index
+            line = self.serialize(event) + b"\n"
+            if batch and batch_bytes + len(line) > self.batch_bytes:
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append((finding, line))
+            batch_bytes += len(line)
+        if batch:
+            yield batch
+
+    def write_findings(self, findings: list, **kwargs):
+        print("Writing results to Splunk")
+        if not (self.url and self.token):
+            raise ValueError("Missing SPLUNK_HEC_URL or a HEC token")
+        session = pooled_session(pool_size=self.max_in_flight, retries=self.max_retries)
+        session.verify = self.verify
+        # findings spilled during an earlier outage are sent ahead of this run's findings
+        events = itertools.chain(self.spill_queue.drain(), findings)
+        pending_acks = {}
+
+        def acknowledged(batch, ack_id):
+            if ack_id is not None:
+                pending_acks[ack_id] = batch
+
+        deliver_batches(
+            self.event_batches(events),
+            partial(self.post_batch, session),
+            self.stats,
+            self.max_in_flight,
+            on_result=acknowledged,
+        )
+        if pending_acks:
+            self.wait_for_acks(session, pending_acks)
+        # every replayed finding has now been delivered or spilled again
+        self.spill_queue.replayed()
+        session.close()
+        print(self.stats.summary())
+        return self.stats.failed == 0
+
+    def post_batch(self, session, batch):
+        """Posts a batch, spilling it to disk when HEC can not be reached
+
+        Returns the ackId to poll for when indexer acknowledgement is on.
+        """
+        payload = b"".join(line for finding, line in batch)
+        if self.compress:
+            payload = gzip.compress(payload, compresslevel=6)
+        start = time.monotonic()
+        try:
+            response = session.post(
+                f"{self.url}/services/collector/event",
+                data=payload,
+                headers=self.headers(),
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to send {len(batch)} findings to Splunk with exception {e}")
+            self.spill(batch)
+            return None
+        self.stats.record_batch(time.monotonic() - start)
+        if not response.ok:
+            print(f"Splunk rejected {len(batch)} findings with status {response.status_code}: {response.text}")
+            # only outages are spilled, findings HEC rejects are rejected again
+            if response.status_code in RETRY_STATUSES:
+                self.spill(batch)
+            else:
+                self.stats.add(failed=len(batch))
+            return None
+        if not self.use_ack:
+            self.stats.add(delivered=len(batch))
+            return None
+        return response.json()["ackId"]
+
+    def wait_for_acks(self, session, pending_acks):
+        """Polls HEC until the indexers acknowledged every batch, spilling those that never are"""
+        deadline = time.monotonic() + self.ack_timeout
+        delay = 1.0
+        while pending_acks and time.monotonic() < deadline:
+            try:
+                response = session.post(
+                    f"{self.url}/services/collector/ack",
+                    json={"acks": list(pending_acks)},
+                    headers={"Authorization": f"Splunk {self.token}", "X-Splunk-Request-Channel": self.channel},
+                    timeout=self.timeout,
+                )
+                acks = response.json().get("acks", {}) if response.ok else {}
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to poll Splunk for acknowledgements with exception {e}")
+                acks = {}
+            for ack_id, acked in acks.items():
+                if acked and int(ack_id) in pending_acks:
+                    self.stats.add(delivered=len(pending_acks.pop(int(ack_id))))
+            if pending_acks:
+                time.sleep(delay)
+                delay = min(delay * 2, 10)
+        for batch in pending_acks.values():
+            print(f"Splunk did not acknowledge {len(batch)} findings within {self.ack_timeout:.0f} seconds")
+            self.spill(batch)
+
+    def spill(self, batch):
+        self.spill_queue.spill([finding for finding, line in batch])
+        self.stats.add(failed=len(batch))
@@ -0,0 +1,314 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+
+from processor.outputs.output_base import ElectricEyeOutput
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    findings INTEGER DEFAULT 0,
+    account_id TEXT,
+    region TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id TEXT PRIMARY KEY,
+    account_id TEXT,
+    region TEXT,
+    generator_id TEXT,
+    title TEXT,
+    description TEXT,
+    severity TEXT,
+    compliance_status TEXT,
+    previous_status TEXT,
+    record_state TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    first_run_id INTEGER REFERENCES runs(run_id),
+    last_run_id INTEGER REFERENCES runs(run_id),
+    finding TEXT
+);
+CREATE TABLE IF NOT EXISTS resources (
+    finding_id TEXT REFERENCES findings(id),
+    resource_arn TEXT,
+    resource_type TEXT,
+    partition TEXT,
+    region TEXT,
+    PRIMARY KEY (finding_id, resource_arn)
+);
+CREATE TABLE IF NOT EXISTS compliance_requirements (
+    finding_id TEXT REFERENCES findings(id),
+    control TEXT,
+    PRIMARY KEY (finding_id, control)
+);
+CREATE INDEX IF NOT EXISTS runs_account_region ON runs (account_id, region, run_id);
+CREATE INDEX IF NOT EXISTS findings_severity ON findings (severity);
+CREATE INDEX IF NOT EXISTS findings_compliance_status ON findings (compliance_status);
+CREATE INDEX IF NOT EXISTS findings_account_region ON findings (account_id, region);
+CREATE INDEX IF NOT EXISTS findings_last_run ON findings (last_run_id);
+CREATE INDEX IF NOT EXISTS resources_arn ON resources (resource_arn);
+CREATE INDEX IF NOT EXISTS compliance_requirements_control ON compliance_requirements (control);
+"""
+
+# findings are upserted on their Id, the status they had in the previous run is kept for diffs
+UPSERT_FINDING = """
+INSERT INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    account_id = excluded.account_id,
+    region = excluded.region,
+    generator_id = excluded.generator_id,
+    title = excluded.title,
+    description = excluded.description,
+    severity = excluded.severity,
+    previous_status = findings.compliance_status,
+    compliance_status = excluded.compliance_status,
+    record_state = excluded.record_state,
+    updated_at = excluded.updated_at,
+    last_run_id = excluded.last_run_id,
+    finding = excluded.finding
+"""
+
+# the latest finished run of every account and region, each scan covers one of them
+LATEST_RUNS = """
+SELECT MAX(run_id) FROM runs WHERE finished_at IS NOT NULL GROUP BY account_id, region
+"""
+
+
+def connect(database):
+    """Opens the findings database in WAL mode, creating the schema if needed"""
+    connection = sqlite3.connect(database)
+    connection.row_factory = sqlite3.Row
+    # WAL lets queries read the database while a scan is writing to it
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    # databases written before runs were scoped get the columns added, their runs stay unscoped
+    columns = [row["name"] for row in connection.execute("PRAGMA table_info(runs)")]
+    if columns and "account_id" not in columns:
+        with connection:
+            connection.execute("ALTER TABLE runs ADD COLUMN account_id TEXT")
+            connection.execute("ALTER TABLE runs ADD COLUMN region TEXT")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def finding_row(finding, run_id):
+    resources = finding.get("Resources") or [{}]
+    return (
+        finding["Id"],
+        finding.get("AwsAccountId"),
+        resources[0].get("Region"),
+        finding.get("GeneratorId"),
+        finding.get("Title"),
+        finding.get("Description"),
+        finding.get("Severity", {}).get("Label"),
+        finding.get("Compliance", {}).get("Status"),
+        finding.get("RecordState"),
+        finding.get("CreatedAt"),
+        finding.get("UpdatedAt"),
+        run_id,
+        run_id,
+        json.dumps(finding),
+    )
+
+
+@ElectricEyeOutput
+class SqliteProvider(object):
+    """Writes findings into a normalized SQLite database which is kept between runs"""
+
+    __provider__ = "sqlite"
+
+    def __init__(self):
+        self.batch_size = int(os.environ.get("SQLITE_BATCH_SIZE", 1000))
+
+    def write_findings(self, findings: list, output_file: str, **kwargs):
+        database = os.environ.get("SQLITE_DATABASE", f"{output_file}.db")
+        connection = connect(database)
+        with connection:
+            run_id = connection.execute(
+                "INSERT INTO runs (started_at) VALUES (?)", (datetime.datetime.utcnow().isoformat(),)
+            ).lastrowid
+        written = 0
+        scope = (None, None)
+        findings = iter(findings)
+        try:
+            while True:
+                batch = list(itertools.islice(findings, self.batch_size))
+                if not batch:
+                    break
+                if not written:
+                    # the run is of the account and region its findings come from
+                    first = finding_row(batch[0], run_id)
+                    scope = (first[1], first[2])
+                # each batch is a single transaction
+                with connection:
+                    self.write_batch(connection, batch, run_id)
+                written += len(batch)
+            with connection:
+                connection.execute(
+                    "UPDATE runs SET finished_at = ?, findings = ?, account_id = ?, region = ? "
+                    "WHERE run_id = ?",
+                    (datetime.datetime.utcnow().isoformat(), written, *scope, run_id),
+                )
+        finally:
+            connection.close()
+        print(f"Wrote {written} findings to {database} as run {run_id}")
+        return True
+
+    def write_batch(self, connection, batch, run_id):
+        finding_ids = [(finding["Id"],) for finding in batch]
+        connection.executemany(UPSERT_FINDING, [finding_row(finding, run_id) for finding in batch])
+        connection.executemany("DELETE FROM resources WHERE finding_id = ?", finding_ids)
+        connection.executemany("DELETE FROM compliance_requirements WHERE finding_id = ?", finding_ids)
+        connection.executemany(
+            "INSERT OR IGNORE INTO resources VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    finding["Id"],
+                    resource.get("Id"),
+                    resource.get("Type"),
+                    resource.get("Partition"),
+                    resource.get("Region"),
+                )
+                for finding in batch
+                for resource in finding.get("Resources", [])
+            ],
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO compliance_requirements VALUES (?, ?)",
+            [
+                (finding["Id"], control)
+                for finding in batch
+                for control in finding.get("Compliance", {}).get("RelatedRequirements", [])
+            ],
+        )
+
+
+def query_findings(
+    database,
+    status=None,
+    severity=None,
+    account=None,
+    region=None,
+    control=None,
+    resource_arn=None,
+    latest_run_only=True,
+):
+    """Returns findings matching every given filter, control and resource_arn accept * wildcards"""
+    clauses = []
+    params = []
+    if status:
+        clauses.append("f.compliance_status = ?")
+        params.append(status.upper())
+    if severity:
+        clauses.append("f.severity = ?")
+        params.append(severity.upper())
+    if account:
+        clauses.append("f.account_id = ?")
+        params.append(account)
+    if region:
+        clauses.append("f.region = ?")
+        params.append(region)
+    if control:
+        clauses.append(
+            "f.id IN (SELECT finding_id FROM compliance_requirements WHERE control GLOB ?)"
+        )
+        params.append(control)
+    if resource_arn:
+        clauses.append("f.id IN (SELECT finding_id FROM resources WHERE resource_arn GLOB ?)")
+        params.append(resource_arn)
+    if latest_run_only:
+        clauses.append(f"f.last_run_id IN ({LATEST_RUNS})")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    connection = connect(database)
+    try:
+        return [
+            dict(row)
+            for row in connection.execute(
+                "SELECT f.id, f.account_id, f.region, f.severity, f.compliance_status, f.title, "
+                "(SELECT GROUP_CONCAT(resource_arn, ' ') FROM resources WHERE finding_id = f.id) "
+                f"AS resources FROM findings f {where} ORDER BY f.account_id, f.region, f.id",
+                params,
+            )
+        ]
+    finally:
+        connection.close()
+
+
+def finding_changes(database, account=None, region=None):
+    """Compares the last two finished runs of every account and region
+
+    Returns findings that started failing, started passing and those the last run no longer reported.
+    account and region limit the comparison to the runs of that account or region.
+    """
+    connection = connect(database)
+    try:
+        clauses = ["finished_at IS NOT NULL"]
+        params = []
+        if account:
+            clauses.append("account_id = ?")
+            params.append(account)
+        if region:
+            clauses.append("region = ?")
+            params.append(region)
+        scopes = {}
+        for row in connection.execute(
+            f"SELECT run_id, account_id, region FROM runs WHERE {' AND '.join(clauses)} ORDER BY run_id DESC",
+            params,
+        ):
+            runs = scopes.setdefault((row["account_id"], row["region"]), [])
+            if len(runs) < 2:
+                runs.append(row["run_id"])
+
+        def select(where, *params):
+            return [
+                dict(row)
+                for row in connection.execute(
+                    "SELECT id, account_id, region, severity, compliance_status, previous_status, title "
+                    f"FROM findings WHERE {where}",
+                    params,
+                )
+            ]
+
+        changes = {"newly_failing": [], "newly_passing": [], "disappeared": []}
+        for runs in scopes.values():
+            latest = runs[0]
+            previous = runs[1] if len(runs) > 1 else None
+            changes["newly_failing"].extend(
+                select(
+                    "last_run_id = ? AND compliance_status = 'FAILED' "
+                    "AND (first_run_id = ? OR previous_status IS NOT 'FAILED')",
+                    latest,
+                    latest,
+                )
+            )
+            changes["newly_passing"].extend(
+                select(
+                    "last_run_id = ? AND compliance_status = 'PASSED' AND previous_status = 'FAILED'",
+                    latest,
+                )
+            )
+            changes["disappeared"].extend(select("last_run_id = ?", previous))
+        for rows in changes.values():
+            rows.sort(key=lambda row: (row["account_id"] or "", row["region"] or "", row["id"]))
+        return changes
+    finally:
+        connection.close()
@@ -0,0 +1,73 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def json_dumps(finding):
+    return json.dumps(finding, separators=(",", ":")).encode("utf-8")
+
+
+def orjson_dumps(finding):
+    return orjson.dumps(finding)
+
+
+SERIALIZERS = {"json": json_dumps}
+if orjson:
+    SERIALIZERS["orjson"] = orjson_dumps
+
+
+def get_serializer(name=None):
+    """Returns a function serializing a finding to compact JSON bytes
+
+    The name defaults to the ELECTRICEYE_SERIALIZER environment variable, or orjson
+    when it is installed and the standard library json module otherwise.
+    """
+    name = name or os.environ.get("ELECTRICEYE_SERIALIZER") or ("orjson" if orjson else "json")
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        print(f"Serializer {name} is not available, using json")
+        return json_dumps
+
+
+EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def open_compressed(path, compression):
+    """Opens a binary file for writing with optional gzip or zstd compression
+
+    flush() on the returned file ends a compressed block, so readers can decompress
+    everything written up to that point while the file is still being written.
+    """
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        if not zstandard:
+            raise ValueError("zstd compression needs the zstandard package to be installed")
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb", buffering=1024 * 1024)
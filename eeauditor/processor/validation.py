@@ -0,0 +1,217 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import json
+import re
+import threading
+
+REQUIRED_FIELDS = [
+    "SchemaVersion",
+    "Id",
+    "ProductArn",
+    "GeneratorId",
+    "AwsAccountId",
+    "Types",
+    "CreatedAt",
+    "UpdatedAt",
+    "Severity",
+    "Title",
+    "Description",
+    "Resources",
+]
+# fields Security Hub rejects past a length, but which are still useful when cut short
+TRUNCATABLE_FIELDS = [
+    (("Title",), 256),
+    (("Description",), 1024),
+    (("Remediation", "Recommendation", "Text"), 512),
+]
+MAX_ID_LENGTH = 512
+MAX_TYPES = 50
+MAX_RESOURCES = 32
+MAX_RELATED_REQUIREMENTS = 32
+TYPE_NAMESPACES = [
+    "Software and Configuration Checks",
+    "TTPs",
+    "Effects",
+    "Unusual Behaviors",
+    "Sensitive Data Identifications",
+]
+SEVERITY_LABELS = ["INFORMATIONAL", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+COMPLIANCE_STATUSES = ["PASSED", "WARNING", "FAILED", "NOT_AVAILABLE"]
+WORKFLOW_STATUSES = ["NEW", "NOTIFIED", "RESOLVED", "SUPPRESSED"]
+RECORD_STATES = ["ACTIVE", "ARCHIVED"]
+
+ACCOUNT_ID = re.compile(r"^\d{12}$")
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})$")
+RESOURCE_TYPE = re.compile(r"^[A-Za-z][A-Za-z0-9]{0,255}$")
+
+
+def required(field):
+    def validate(finding):
+        if not finding.get(field):
+            return f"{field} is missing"
+
+    return validate
+
+
+def max_length(field, limit):
+    def validate(finding):
+        value = finding.get(field)
+        if isinstance(value, str) and len(value) > limit:
+            return f"{field} is longer than {limit} characters"
+
+    return validate
+
+
+def matches(field, pattern):
+    def validate(finding):
+        value = finding.get(field)
+        if value is not None and not (isinstance(value, str) and pattern.match(value)):
+            return f"{field} {value!r} is not valid"
+
+    return validate
+
+
+def one_of(path, allowed):
+    allowed = frozenset(allowed)
+
+    def validate(finding):
+        value = finding
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        if value not in allowed:
+            return f"{'.'.join(path)} {value!r} is not one of {', '.join(sorted(allowed))}"
+
+    return validate
+
+
+def validate_types(finding):
+    types = finding.get("Types")
+    if not types:
+        return None
+    if len(types) > MAX_TYPES:
+        return f"Types has more than {MAX_TYPES} entries"
+    for finding_type in types:
+        if not isinstance(finding_type, str) or finding_type.split("/")[0] not in TYPE_NAMESPACES:
+            return f"Types entry {finding_type!r} does not start with a valid namespace"
+
+
+def validate_resources(finding):
+    resources = finding.get("Resources")
+    if not resources:
+        return None
+    if len(resources) > MAX_RESOURCES:
+        return f"Resources has more than {MAX_RESOURCES} entries"
+    for resource in resources:
+        if not isinstance(resource, dict) or not resource.get("Id"):
+            return "Resources entry without an Id"
+        if not RESOURCE_TYPE.match(str(resource.get("Type", ""))):
+            return f"Resources Type {resource.get('Type')!r} is not valid"
+
+
+def validate_confidence(finding):
+    confidence = finding.get("Confidence")
+    if confidence is not None and not (isinstance(confidence, int) and 0 <= confidence <= 100):
+        return f"Confidence {confidence!r} is not between 0 and 100"
+
+
+def compile_validators():
+    """Builds the list of validators once, each returns the reason a finding is invalid or None"""
+    validators = [required(field) for field in REQUIRED_FIELDS]
+    validators += [max_length(field, MAX_ID_LENGTH) for field in ("Id", "GeneratorId")]
+    validators.append(matches("AwsAccountId", ACCOUNT_ID))
+    validators += [matches(field, TIMESTAMP) for field in ("FirstObservedAt", "CreatedAt", "UpdatedAt")]
+    validators.append(one_of(("Severity", "Label"), SEVERITY_LABELS))
+    validators.append(one_of(("Compliance", "Status"), COMPLIANCE_STATUSES))
+    validators.append(one_of(("Workflow", "Status"), WORKFLOW_STATUSES))
+    validators.append(one_of(("RecordState",), RECORD_STATES))
+    validators += [validate_types, validate_resources, validate_confidence]
+    return validators
+
+
+def truncate(finding):
+    """Cuts truncatable fields down to their limit, returns the names of the fields it cut
+
+    Nested dicts are copied rather than changed, they may be shared with other findings.
+    """
+    truncated = []
+    for path, limit in TRUNCATABLE_FIELDS:
+        parents = [finding]
+        for key in path[:-1]:
+            value = parents[-1].get(key)
+            if not isinstance(value, dict):
+                break
+            parents.append(value)
+        else:
+            value = parents[-1].get(path[-1])
+            if isinstance(value, str) and len(value) > limit:
+                replacement = value[: limit - 3] + "..."
+                for parent, key in zip(reversed(parents[1:]), reversed(path[1:])):
+                    replacement = {**parent, key: replacement}
+                finding[path[0]] = replacement
+                truncated.append(".".join(path))
+    compliance = finding.get("Compliance")
+    if compliance and len(compliance.get("RelatedRequirements") or ()) > MAX_RELATED_REQUIREMENTS:
+        finding["Compliance"] = {
+            **compliance,
+            "RelatedRequirements": list(compliance["RelatedRequirements"][:MAX_RELATED_REQUIREMENTS]),
+        }
+        truncated.append("Compliance.RelatedRequirements")
+    return truncated
+
+
+class FindingValidator(object):
+    """Checks findings against the ASFF before they reach the outputs
+
+    Truncatable fields are cut to size, findings that are still invalid are
+    written with their reasons to a dead letter file instead of the outputs.
+    """
+
+    def __init__(self, dead_letter_file):
+        self.dead_letter_file = dead_letter_file
+        self.validators = compile_validators()
+        self.dead_letters = None
+        self.lock = threading.Lock()
+        self.validated = 0
+        self.truncated = 0
+        self.quarantined = 0
+
+    def __call__(self, finding):
+        """Returns the finding ready for the outputs, or None when it was quarantined"""
+        self.validated += 1
+        if truncate(finding):
+            self.truncated += 1
+        reasons = [reason for reason in (validate(finding) for validate in self.validators) if reason]
+        if not reasons:
+            return finding
+        self.quarantine(finding, reasons)
+        return None
+
+    def quarantine(self, finding, reasons):
+        with self.lock:
+            if self.dead_letters is None:
+                self.dead_letters = open(self.dead_letter_file, "a")
+            self.dead_letters.write(json.dumps({"Reasons": reasons, "Finding": finding}, default=str) + "\n")
+            self.quarantined += 1
+
+    def close(self):
+        if self.dead_letters is not None:
+            self.dead_letters.close()
+        summary = f"Validated {self.validated} findings, {self.truncated} truncated"
+        if self.quarantined:
+            summary += f", {self.quarantined} invalid findings quarantined to {self.dead_letter_file}"
+        print(summary)
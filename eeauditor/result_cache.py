@@ -0,0 +1,197 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import abc
+import datetime
+import json
+import os
+import shutil
+import time
+
+import boto3
+
+
+class ResultCache(abc.ABC):
+    """Stores the findings of account level checks so frequent scans can reuse them
+
+    Entries are keyed by account, region, service and check name and expire after
+    ttl seconds. Invalidating a service, e.g. from a change event for that service,
+    drops every entry stored for it.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, awsAccountId, awsRegion, service_name, check_name):
+        """Returns the cached findings or None when there is no unexpired entry"""
+        entry = self._read(awsAccountId, awsRegion, service_name, check_name)
+        if not entry or entry["ExpiresAt"] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        # cached findings are re-reported, so they are marked as updated by this scan
+        iso8601Time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).isoformat()
+        findings = entry["Findings"]
+        for finding in findings:
+            finding["UpdatedAt"] = iso8601Time
+        return findings
+
+    def put(self, awsAccountId, awsRegion, service_name, check_name, findings):
+        entry = {"ExpiresAt": int(time.time() + self.ttl), "Findings": findings}
+        self._write(awsAccountId, awsRegion, service_name, check_name, entry)
+
+    @abc.abstractmethod
+    def invalidate(self, awsAccountId, awsRegion, service_name=None):
+        """Drops the entries of one service, or all entries when no service is given"""
+
+    @abc.abstractmethod
+    def _read(self, awsAccountId, awsRegion, service_name, check_name):
+        """Returns the stored entry or None when there is none"""
+
+    @abc.abstractmethod
+    def _write(self, awsAccountId, awsRegion, service_name, check_name, entry):
+        """Stores an entry, replacing any previous one"""
+
+
+class LocalResultCache(ResultCache):
+    """Result cache stored as JSON files within a local directory"""
+
+    def __init__(self, directory, ttl=3600):
+        super().__init__(ttl=ttl)
+        self.directory = directory
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _read(self, awsAccountId, awsRegion, service_name, check_name):
+        try:
+            with open(self._path(awsAccountId, awsRegion, service_name, f"{check_name}.json")) as entry:
+                return json.load(entry)
+        except (IOError, ValueError):
+            return None
+
+    def _write(self, awsAccountId, awsRegion, service_name, check_name, entry):
+        os.makedirs(self._path(awsAccountId, awsRegion, service_name), exist_ok=True)
+        with open(self._path(awsAccountId, awsRegion, service_name, f"{check_name}.json"), "w") as out:
+            json.dump(entry, out)
+
+    def invalidate(self, awsAccountId, awsRegion, service_name=None):
+        if service_name:
+            shutil.rmtree(self._path(awsAccountId, awsRegion, service_name), ignore_errors=True)
+        else:
+            shutil.rmtree(self._path(awsAccountId, awsRegion), ignore_errors=True)
+
+
+class S3ResultCache(ResultCache):
+    """Result cache stored as JSON objects within an S3 bucket"""
+
+    def __init__(self, bucket, prefix="", ttl=3600):
+        super().__init__(ttl=ttl)
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.s3 = boto3.client("s3")
+
+    def _key(self, *parts):
+        return "/".join(part for part in (self.prefix, *parts) if part)
+
+    def _read(self, awsAccountId, awsRegion, service_name, check_name):
+        try:
+            response = self.s3.get_object(
+                Bucket=self.bucket,
+                Key=self._key(awsAccountId, awsRegion, service_name, f"{check_name}.json"),
+            )
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(response["Body"].read())
+
+    def _write(self, awsAccountId, awsRegion, service_name, check_name, entry):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self._key(awsAccountId, awsRegion, service_name, f"{check_name}.json"),
+            Body=json.dumps(entry).encode("utf-8"),
+        )
+
+    def invalidate(self, awsAccountId, awsRegion, service_name=None):
+        paginator = self.s3.get_paginator("list_objects_v2")
+        prefix = self._key(awsAccountId, awsRegion, service_name) + "/"
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                self.s3.delete_objects(Bucket=self.bucket, Delete={"Objects": objects})
+
+
+class DynamoDBResultCache(ResultCache):
+    """Result cache stored within a DynamoDB table
+
+    The table needs a string partition key "pk" and a string sort key "sk", the
+    "ExpiresAt" attribute can be used as the table's TTL attribute.
+    """
+
+    def __init__(self, table_name, ttl=3600):
+        super().__init__(ttl=ttl)
+        self.table_name = table_name
+        self.dynamodb = boto3.client("dynamodb")
+
+    def _read(self, awsAccountId, awsRegion, service_name, check_name):
+        response = self.dynamodb.get_item(
+            TableName=self.table_name,
+            Key={
+                "pk": {"S": f"{awsAccountId}#{awsRegion}"},
+                "sk": {"S": f"{service_name}#{check_name}"},
+            },
+        )
+        if "Item" not in response:
+            return None
+        return {
+            "ExpiresAt": int(response["Item"]["ExpiresAt"]["N"]),
+            "Findings": json.loads(response["Item"]["Findings"]["S"]),
+        }
+
+    def _write(self, awsAccountId, awsRegion, service_name, check_name, entry):
+        self.dynamodb.put_item(
+            TableName=self.table_name,
+            Item={
+                "pk": {"S": f"{awsAccountId}#{awsRegion}"},
+                "sk": {"S": f"{service_name}#{check_name}"},
+                "ExpiresAt": {"N": str(entry["ExpiresAt"])},
+                "Findings": {"S": json.dumps(entry["Findings"])},
+            },
+        )
+
+    def invalidate(self, awsAccountId, awsRegion, service_name=None):
+        query = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "pk = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": f"{awsAccountId}#{awsRegion}"}},
+            "ProjectionExpression": "pk, sk",
+        }
+        if service_name:
+            query["KeyConditionExpression"] += " AND begins_with(sk, :sk)"
+            query["ExpressionAttributeValues"][":sk"] = {"S": f"{service_name}#"}
+        for page in self.dynamodb.get_paginator("query").paginate(**query):
+            for item in page["Items"]:
+                self.dynamodb.delete_item(TableName=self.table_name, Key=item)
+
+
+def get_result_cache(location, ttl=3600):
+    """Returns a result cache for a s3://bucket/prefix, dynamodb://table or local path"""
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://") :].partition("/")
+        return S3ResultCache(bucket, prefix=prefix, ttl=ttl)
+    if location.startswith("dynamodb://"):
+        return DynamoDBResultCache(location[len("dynamodb://") :], ttl=ttl)
+    return LocalResultCache(location, ttl=ttl)
@@ -0,0 +1,152 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import fnmatch
+import re
+
+import boto3
+
+
+def resource_id_from_arn(arn):
+    """Returns the trailing resource id of an ARN, e.g. vol-0abc from a volume ARN"""
+    return re.split(r"[/:]", arn)[-1]
+
+
+def resource_key(arn):
+    """Returns the (service, resource type, resource id) of an ARN
+
+    The type is empty for ARNs without one, such as S3 buckets or the volume ARNs the
+    EBS Auditor builds without the resource segment.
+    """
+    parts = arn.split(":", 5)
+    service = parts[2] if len(parts) > 2 else ""
+    if len(parts) < 6:
+        return service, "", resource_id_from_arn(arn)
+    resource = parts[5]
+    for separator in ("/", ":"):
+        if separator in resource:
+            resource_type, _, rest = resource.partition(separator)
+            return service, resource_type, resource_id_from_arn(rest)
+    return service, "", resource
+
+
+def resource_vpc_id(resource):
+    """Returns the VPC of a finding's resource when it is a VPC or its details carry a VpcId"""
+    if resource.get("Type") == "AwsEc2Vpc":
+        return resource_id_from_arn(resource["Id"])
+    values = [resource.get("Details") or {}]
+    while values:
+        value = values.pop()
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key in ("VpcId", "vpcId") and isinstance(item, str):
+                    return item
+                values.append(item)
+        elif isinstance(value, list):
+            values.extend(value)
+    return None
+
+
+def parse_tag_filters(tags):
+    """Turns a list of key=value strings into TagFilters for tag:GetResources
+
+    Repeating a key matches any of its values, a key without a value matches any value.
+    """
+    values = {}
+    for tag in tags:
+        key, _, value = tag.partition("=")
+        values.setdefault(key, [])
+        if value:
+            values[key].append(value)
+    return [
+        {"Key": key, "Values": tag_values} if tag_values else {"Key": key}
+        for key, tag_values in values.items()
+    ]
+
+
+class ScanScope(object):
+    """Limits a scan to the resources matching tag filters, ARN patterns and VPCs
+
+    Tag filters are resolved up front with tag:GetResources into an index of ARNs
+    and one of (service, resource type, resource id), so Auditors can skip the detail
+    calls for any resource outside of the scope with CheckRegister.in_scope. The
+    second index matches the ARNs Auditors build in another format than the tagging
+    API reports, without a bare id matching resources of another type.
+    """
+
+    def __init__(self, tag_filters=None, include_arns=None, exclude_arns=None, vpc_ids=None):
+        self.tag_filters = parse_tag_filters(tag_filters or [])
+        self.include = self._compile(include_arns)
+        self.exclude = self._compile(exclude_arns)
+        self.vpc_ids = set(vpc_ids or [])
+        # None until tag filters are resolved
+        self.arns = None
+        self.resources = set()
+        # (service, resource id) of the indexed resources, for ARNs without a resource type
+        self.service_ids = set()
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+    def resolve(self):
+        """Builds the ARN index of every tagged resource matching the tag filters"""
+        if not self.tag_filters:
+            return self
+        self.arns = set()
+        tagging = boto3.client("resourcegroupstaggingapi")
+        paginator = tagging.get_paginator("get_resources")
+        for page in paginator.paginate(TagFilters=self.tag_filters, ResourcesPerPage=100):
+            for resource in page["ResourceTagMappingList"]:
+                self.add(resource["ResourceARN"])
+        print(f"Resolved {len(self.arns)} resources within the scan scope")
+        return self
+
+    def add(self, arn):
+        """Adds a tagged resource to the index"""
+        if self.arns is None:
+            self.arns = set()
+        self.arns.add(arn)
+        service, resource_type, resource_id = resource_key(arn)
+        self.resources.add((service, resource_type, resource_id))
+        self.service_ids.add((service, resource_id))
+
+    def indexed(self, arn):
+        if arn in self.arns:
+            return True
+        service, resource_type, resource_id = resource_key(arn)
+        if resource_type:
+            return (service, resource_type, resource_id) in self.resources
+        return (service, resource_id) in self.service_ids
+
+    def in_scope(self, arn, vpc_id=None):
+        if self.exclude and self.exclude.match(arn):
+            return False
+        if self.include and not self.include.match(arn):
+            return False
+        if self.vpc_ids and vpc_id and vpc_id not in self.vpc_ids:
+            return False
+        if self.arns is not None:
+            return self.indexed(arn)
+        return True
+
+    def resource_in_scope(self, resource):
+        """Checks the resource of a finding, its VPC is read from the finding itself"""
+        vpc_id = resource_vpc_id(resource) if self.vpc_ids else None
+        if resource["Id"].startswith("arn:"):
+            return self.in_scope(resource["Id"], vpc_id=vpc_id)
+        return not vpc_id or vpc_id in self.vpc_ids
@@ -0,0 +1,61 @@
+import json
+
+from . import context
+from processor.aggregation import aggregate_passed
+
+
+def make_finding(i, status, title="[Test.1] Test", region="us-east-1"):
+    return {
+        "Id": f"finding-{i}",
+        "AwsAccountId": "012345678901",
+        "Title": title,
+        "ProductFields": {"Product Name": "ElectricEye"},
+        "Resources": [
+            {"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}", "Partition": "aws", "Region": region}
+        ],
+        "Compliance": {"Status": status},
+    }
+
+
+def test_passed_findings_are_rolled_up(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    findings = [make_finding(i, "PASSED") for i in range(10)]
+    findings += [make_finding(10, "FAILED"), make_finding(11, "PASSED", region="eu-west-1")]
+    sent = list(aggregate_passed(iter(findings), state_file))
+    assert [finding["Id"] for finding in sent[:1]] == ["finding-10"]
+    rollups = sent[1:]
+    assert len(rollups) == 2
+    assert rollups[0]["ProductFields"]["PassedResourceCount"] == "10"
+    assert rollups[0]["ProductFields"]["PassedResourceIds"].split() == [
+        f"arn:aws:s3:::bucket-{i}" for i in range(10)
+    ]
+    assert rollups[0]["Resources"][0]["Id"] == "AWS::::Account:012345678901"
+    assert rollups[1]["Id"].startswith("012345678901/eu-west-1/")
+    assert json.load(open(state_file)) == {"012345678901/eu-west-1": [], "012345678901/us-east-1": ["finding-10"]}
+
+    # the digest does not depend on the order resources were seen in
+    reordered = list(aggregate_passed(iter(reversed(findings[:10])), str(tmp_path / "other.json")))
+    digest = rollups[0]["ProductFields"]["PassedResourcesDigest"]
+    assert reordered[0]["ProductFields"]["PassedResourcesDigest"] == digest
+
+
+def test_previously_failed_resources_resolve(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    list(aggregate_passed(iter([make_finding(0, "FAILED"), make_finding(1, "PASSED")]), state_file))
+    sent = list(aggregate_passed(iter([make_finding(0, "PASSED"), make_finding(1, "PASSED")]), state_file))
+    assert sent[0]["Id"] == "finding-0"
+    assert sent[0]["Compliance"]["Status"] == "PASSED"
+    assert sent[1]["ProductFields"]["PassedResourceCount"] == "1"
+    assert json.load(open(state_file)) == {"012345678901/us-east-1": []}
+
+
+def test_regions_keep_their_failed_ids(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    list(aggregate_passed(iter([make_finding(0, "FAILED")]), state_file))
+    # a scan of another region sharing the state file
+    list(aggregate_passed(iter([make_finding(1, "FAILED", region="eu-west-1")]), state_file))
+    sent = list(aggregate_passed(iter([make_finding(0, "PASSED"), make_finding(2, "PASSED")]), state_file))
+    assert sent[0]["Id"] == "finding-0"
+    assert sent[0]["Compliance"]["Status"] == "PASSED"
+    assert sent[1]["ProductFields"]["PassedResourceIds"] == "arn:aws:s3:::bucket-2"
+    assert json.load(open(state_file)) == {"012345678901/eu-west-1": ["finding-1"], "012345678901/us-east-1": []}
@@ -0,0 +1,31 @@
+from . import context
+from check_register import CheckRegister, infer_priority
+
+registry = CheckRegister()
+
+
+def critical_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
+    """[Test.1] Check that can emit a CRITICAL finding"""
+    if cache.get("public"):
+        yield {"Severity": {"Label": "CRITICAL"}}
+    else:
+        yield {"Severity": {"Label": "INFORMATIONAL"}}
+
+
+def medium_check(cache: dict, awsAccountId: str, awsRegion: str, awsPartition: str) -> dict:
+    """[Test.2] Check that can emit at most a MEDIUM finding"""
+    yield from ({"Severity": {"Label": label}} for label in ("MEDIUM", "LOW"))
+
+
+def test_infer_priority_critical():
+    assert infer_priority(critical_check) == 1
+
+
+def test_infer_priority_nested_code():
+    assert infer_priority(medium_check) == 3
+
+
+def test_register_check_priority_override():
+    registry.register_check("test-priority", priority=2)(critical_check)
+    assert registry.checks["test-priority"]["critical_check"].priority == 2
+    registry.checks.pop("test-priority")
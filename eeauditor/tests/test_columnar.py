@@ -0,0 +1,98 @@
+import datetime
+import time
+
+import pytest
+
+from . import context
+import columnar
+from auditors.aws.Amazon_EBS_Auditor import (
+    ebs_snapshot_encryption_check,
+    ebs_volume_attachment_check,
+    ebs_volume_delete_on_termination_check,
+    ebs_volume_encryption_check,
+)
+from auditors.aws.AWS_Secrets_Manager_Auditor import secret_age_check
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+describe_volumes = {
+    "Volumes": [
+        {
+            "VolumeId": "vol-attached",
+            "Encrypted": True,
+            "Attachments": [{"State": "attached", "DeleteOnTermination": True}],
+        },
+        {
+            "VolumeId": "vol-detaching",
+            "Encrypted": False,
+            "Attachments": [{"State": "detaching", "DeleteOnTermination": False}],
+        },
+        {"VolumeId": "vol-available", "Encrypted": False, "Attachments": []},
+    ]
+}
+
+list_secrets = {
+    "SecretList": [
+        {"ARN": "arn:aws:secretsmanager:us-east-1:012345678901:secret:old", "Name": "old", "LastChangedDate": NOW - datetime.timedelta(days=120)},
+        {"ARN": "arn:aws:secretsmanager:us-east-1:012345678901:secret:new", "Name": "new", "LastChangedDate": NOW - datetime.timedelta(days=3)},
+    ]
+}
+
+
+@pytest.fixture(params=["arrow", "lists"])
+def backend(request, monkeypatch):
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(columnar, "pa", None)
+    return request.param
+
+
+def statuses(findings):
+    return {finding["Id"]: finding["Compliance"]["Status"] for finding in findings}
+
+
+def test_masks(backend):
+    records = [{"Encrypted": True}, {}, {"Encrypted": False}]
+    assert columnar.to_list(columnar.negate(columnar.flags(records, lambda r: r.get("Encrypted")))) == [False, True, True]
+    states = columnar.labels([{"State": "attached"}, {"State": "busy"}], lambda r: r["State"])
+    assert columnar.to_list(columnar.not_equal(states, "attached")) == [False, True]
+    epochs = columnar.epoch_seconds(list_secrets["SecretList"], lambda s: s["LastChangedDate"])
+    assert columnar.to_list(columnar.older_than(epochs, 90)) == [True, False]
+
+
+def test_ebs_volume_checks(backend):
+    cache = {"describe_volumes": describe_volumes}
+    attachment = statuses(ebs_volume_attachment_check(cache, "012345678901", "us-east-1", "aws"))
+    assert attachment == {
+        "arn:aws:ec2:us-east-1:012345678901/vol-attached/ebs-volume-attachment-check": "PASSED",
+        "arn:aws:ec2:us-east-1:012345678901/vol-detaching/ebs-volume-attachment-check": "FAILED",
+    }
+    termination = statuses(ebs_volume_delete_on_termination_check(cache, "012345678901", "us-east-1", "aws"))
+    assert list(termination.values()) == ["PASSED", "FAILED"]
+    findings = list(ebs_volume_encryption_check(cache, "012345678901", "us-east-1", "aws"))
+    assert [finding["Compliance"]["Status"] for finding in findings] == ["PASSED", "FAILED", "FAILED"]
+    assert findings[1]["Severity"] == {"Label": "HIGH"}
+    assert findings[1]["Description"].startswith("EBS Volume vol-detaching is not encrypted.")
+    assert findings[0]["Resources"][0]["Details"] == {"Other": {"volumeId": "vol-attached"}}
+
+
+def test_secret_age_check(backend):
+    findings = list(secret_age_check({"list_secrets": list_secrets}, "012345678901", "us-east-1", "aws"))
+    assert [finding["Compliance"]["Status"] for finding in findings] == ["FAILED", "PASSED"]
+    assert findings[0]["Severity"] == {"Label": "MEDIUM"}
+
+
+def test_snapshots_are_evaluated_a_column_at_a_time():
+    pytest.importorskip("pyarrow")
+    snapshots = [{"SnapshotId": f"snap-{i:08x}", "Encrypted": i % 10 != 0} for i in range(500000)]
+    cache = {"describe_snapshots": {"Snapshots": snapshots}}
+    start = time.perf_counter()
+    failed = [
+        finding
+        for finding in ebs_snapshot_encryption_check(cache, "012345678901", "us-east-1", "aws")
+        if finding.is_failed
+    ]
+    assert len(failed) == 50000
+    assert failed[1]["Id"] == "arn:aws:ec2:us-east-1::snapshot/snap-0000000a/ebs-snapshot-encryption-check"
+    assert time.perf_counter() - start < 30
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from . import context
+import controller
+
+
+def test_priority_tiers_stream_into_one_run():
+    events = []
+
+    def run_checks(requested_check_name=None, delay=0, priority=None):
+        events.append(f"tier {priority} checks started")
+        yield {"Id": f"tier-{priority}-first"}
+        yield {"Id": f"tier-{priority}-second"}
+
+    app = SimpleNamespace(get_priority_tiers=lambda: [1, 4], run_checks=run_checks)
+    for finding in controller.priority_first_findings(app):
+        events.append(f"output got {finding['Id']}")
+    # the first tier 1 finding reaches the outputs before any other tier has run
+    assert events == [
+        "tier 1 checks started",
+        "output got tier-1-first",
+        "output got tier-1-second",
+        "tier 4 checks started",
+        "output got tier-4-first",
+        "output got tier-4-second",
+    ]
@@ -0,0 +1,67 @@
+import csv
+import gzip
+
+from . import context
+from finding_factory import FindingTemplate
+from processor.outputs.csv import CsvProvider, compile_extractor
+
+finding = {
+    "Id": "finding-0",
+    "Title": "Check",
+    "Severity": {"Label": "HIGH"},
+    "Resources": [{"Id": "arn:aws:s3:::bucket"}],
+    "Compliance": {"Status": "FAILED", "RelatedRequirements": ["NIST CSF PR.DS-1", "CIS 2.1"]},
+}
+
+
+def test_compile_extractor():
+    assert compile_extractor("Severity.Label")(finding) == "HIGH"
+    assert compile_extractor("Resources.0.Id")(finding) == "arn:aws:s3:::bucket"
+    assert compile_extractor("Remediation.Recommendation.Url")(finding) is None
+    assert compile_extractor("Resources.3.Id")(finding) is None
+    # numeric parts only index into lists, never into strings
+    assert compile_extractor("Title.0")(finding) is None
+    assert compile_extractor("Severity.Label.0")(finding) is None
+
+
+def test_csv_default_columns(tmp_path):
+    output_file = str(tmp_path / "output")
+    assert CsvProvider().write_findings(findings=iter([finding]), output_file=output_file)
+    rows = list(csv.reader(open(f"{output_file}.csv", newline="")))
+    assert rows[0][:2] == ["Id", "Title"]
+    assert rows[1][4] == "HIGH"
+
+
+def test_csv_custom_columns_flattened_requirements(tmp_path, monkeypatch):
+    monkeypatch.setenv("CSV_COLUMNS", "Id,Resource=Resources.0.Id,Compliance.Status")
+    monkeypatch.setenv("CSV_FLATTEN_REQUIREMENTS", "true")
+    monkeypatch.setenv("CSV_COMPRESSION", "gzip")
+    output_file = str(tmp_path / "output")
+    assert CsvProvider().write_findings(findings=iter([finding]), output_file=output_file)
+    rows = list(csv.reader(gzip.open(f"{output_file}.csv.gz", "rt", newline="")))
+    assert rows == [
+        ["Id", "Resource", "Compliance.Status", "Related Requirement"],
+        ["finding-0", "arn:aws:s3:::bucket", "FAILED", "NIST CSF PR.DS-1"],
+        ["finding-0", "arn:aws:s3:::bucket", "FAILED", "CIS 2.1"],
+    ]
+
+
+def test_csv_joins_template_finding_lists(tmp_path, monkeypatch):
+    monkeypatch.setenv("CSV_COLUMNS", "Id,Types,Compliance.RelatedRequirements")
+    template = FindingTemplate(
+        title="[Test.1] Test resources should be tested",
+        types=["Software and Configuration Checks/AWS Security Best Practices"],
+        remediation_text="Test the resource",
+        remediation_url="https://example.com",
+        resource_type="AwsS3Bucket",
+        related_requirements=["NIST CSF PR.DS-1", "CIS 2.1"],
+    )
+    passed = template.passed("finding-1", "arn:aws:s3:::bucket", "012345678901", "us-east-1", "aws", description="ok")
+    output_file = str(tmp_path / "output")
+    assert CsvProvider().write_findings(findings=iter([passed]), output_file=output_file)
+    rows = list(csv.reader(open(f"{output_file}.csv", newline="")))
+    assert rows[1] == [
+        "finding-1",
+        "Software and Configuration Checks/AWS Security Best Practices",
+        "NIST CSF PR.DS-1; CIS 2.1",
+    ]
@@ -0,0 +1,37 @@
+import threading
+
+from . import context
+from processor.delivery import DeliveryStats, deliver_batches
+
+
+def test_deliver_batches_bounds_the_batches_in_flight():
+    lock = threading.Lock()
+    sending = []
+    most = []
+    read = []
+
+    def batches():
+        for i in range(20):
+            read.append(i)
+            yield [f"finding-{i}"] * (i % 3 + 1)
+
+    def send(batch):
+        with lock:
+            sending.append(batch)
+            most.append(len(sending))
+        try:
+            if batch[0] == "finding-4":
+                raise RuntimeError("endpoint is down")
+            return batch[0]
+        finally:
+            with lock:
+                sending.remove(batch)
+
+    results = []
+    stats = DeliveryStats("Test")
+    deliver_batches(batches(), send, stats, 3, on_result=lambda batch, result: results.append(result))
+    assert len(read) == 20
+    assert max(most) <= 3
+    # every finding of the batch that raised is counted as failed
+    assert stats.failed == 2
+    assert sorted(results) == sorted(f"finding-{i}" for i in range(20) if i != 4)
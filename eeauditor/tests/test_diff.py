@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+
+from . import context
+from processor.diff import delta_finding, diff_scans, iter_json_array, read_scan
+from processor.outputs.output_base import ElectricEyeOutput
+
+
+def make_finding(i, status="FAILED", description="Bucket is public"):
+    return {
+        "SchemaVersion": "2018-10-08",
+        "Id": f"finding-{i}",
+        "AwsAccountId": "012345678901",
+        "ProductArn": "arn:aws:securityhub:us-east-1:012345678901:product/012345678901/default",
+        "GeneratorId": f"generator-{i}",
+        "Types": ["Software and Configuration Checks"],
+        "CreatedAt": "2024-01-01T00:00:00+00:00",
+        "UpdatedAt": "2024-01-01T00:00:00+00:00",
+        "Severity": {"Label": "HIGH" if status == "FAILED" else "INFORMATIONAL"},
+        "Title": f"Check {i}",
+        "Description": description,
+        "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}", "Region": "us-east-1"}],
+        "Compliance": {"Status": status, "RelatedRequirements": ["NIST CSF PR.DS-1"]},
+        "RecordState": "ACTIVE" if status == "FAILED" else "ARCHIVED",
+    }
+
+
+OLD = [make_finding(0), make_finding(1), make_finding(2, "PASSED"), make_finding(3), make_finding(4, "PASSED")]
+NEW = [
+    make_finding(0),
+    {**make_finding(1, "PASSED"), "UpdatedAt": "2024-01-02T00:00:00+00:00"},
+    make_finding(2),
+    {**make_finding(4, "PASSED", description="Bucket is private"), "UpdatedAt": "2024-01-02T00:00:00+00:00"},
+    make_finding(5),
+    make_finding(6, "PASSED"),
+]
+EXPECTED = {
+    "finding-1": "newly_passing",
+    "finding-2": "newly_failing",
+    "finding-3": "disappeared",
+    "finding-4": "changed",
+    "finding-5": "newly_failing",
+}
+
+
+def test_iter_json_array_reads_across_chunks():
+    document = json.dumps({"Findings": OLD}, indent=2)
+    assert list(iter_json_array(io.StringIO(document), chunk_size=7)) == OLD
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+
+
+@pytest.mark.parametrize(
+    "provider,suffix", [("json", ".json"), ("ndjson", ".ndjson"), ("parquet", "-parquet"), ("sqlite", ".db")]
+)
+def test_diff_scans(tmp_path, monkeypatch, provider, suffix):
+    if provider == "parquet":
+        pytest.importorskip("pyarrow")
+    paths = []
+    for name, findings in (("old", OLD), ("new", NEW)):
+        output_file = str(tmp_path / name)
+        monkeypatch.setenv("PARQUET_DATASET_PATH", f"{output_file}-parquet")
+        output = ElectricEyeOutput.get_provider(provider)()
+        assert output.write_findings(findings=iter(findings), output_file=output_file)
+        paths.append(output_file + suffix)
+    assert len(list(read_scan(paths[0]))) == len(OLD)
+    changes = {finding["Id"]: change for change, finding in diff_scans(*paths, buckets=3, work_dir=tmp_path)}
+    assert changes == EXPECTED
+
+
+def test_delta_finding_archives_disappeared_findings():
+    delta = delta_finding("disappeared", make_finding(3))
+    assert delta["RecordState"] == "ARCHIVED"
+    assert delta["Workflow"] == {"Status": "RESOLVED"}
+    assert delta["ProductFields"]["ElectricEyeChange"] == "disappeared"
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from . import context
+from processor.outputs.dops import DopsProvider
+
+
+class CollectorStub(BaseHTTPRequestHandler):
+    received = []
+    fail_first = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if CollectorStub.fail_first:
+            CollectorStub.fail_first -= 1
+            self.send_response(503)
+        else:
+            CollectorStub.received.append(json.loads(body))
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="function")
+def dops_provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOPS_SPILL_FILE", str(tmp_path / "spill.json"))
+    monkeypatch.setenv("DOPS_MAX_RETRIES", "2")
+    server = HTTPServer(("127.0.0.1", 0), CollectorStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    CollectorStub.received = []
+    provider = DopsProvider()
+    provider.url = f"http://127.0.0.1:{server.server_port}/event"
+    provider.client_id = "client"
+    provider.api_key = "key"
+    yield provider
+    server.shutdown()
+
+
+def test_dops_delivers_with_retries(dops_provider):
+    CollectorStub.fail_first = 1
+    findings = [{"Id": f"finding-{i}"} for i in range(20)]
+    assert dops_provider.write_findings(findings=iter(findings)) is True
+    assert sorted(event["Id"] for event in CollectorStub.received) == sorted(
+        finding["Id"] for finding in findings
+    )
+    assert dops_provider.stats.delivered == 20
+
+
+def test_dops_spills_when_collector_is_down(dops_provider):
+    dops_provider.url = "http://127.0.0.1:1/event"
+    assert dops_provider.write_findings(findings=[{"Id": "finding-0"}]) is False
+    assert [event["Id"] for event in dops_provider.spill_queue.drain()] == ["finding-0"]
+
+
+def test_dops_counts_batches_that_raise(dops_provider):
+    # a finding that can not be serialized raises within the worker thread
+    assert dops_provider.write_findings(findings=[{"Id": "finding-0", "Bad": object()}]) is False
+    assert dops_provider.stats.failed == 1
+
+
+def test_dops_keeps_replayed_findings_until_sent(dops_provider, monkeypatch):
+    dops_provider.spill_queue.spill([{"Id": "spilled-0"}, {"Id": "spilled-1"}])
+    replay_path = dops_provider.spill_queue.path + ".replay"
+    posted = []
+
+    def post_batch(session, batch):
+        # the replay file is still there while its findings are in flight
+        posted.append(os.path.exists(replay_path))
+        dops_provider.stats.add(delivered=len(batch))
+
+    monkeypatch.setattr(dops_provider, "post_batch", post_batch)
+    assert dops_provider.write_findings(findings=[{"Id": "finding-0"}]) is True
+    assert posted == [True, True, True]
+    assert not os.path.exists(replay_path)
@@ -0,0 +1,123 @@
+import pytest
+from botocore.stub import ANY, Stubber
+
+from . import context
+from processor.outputs import dynamodb
+from processor.outputs.dynamodb import DynamoDBProvider, content_hash, finding_item
+
+
+def make_finding(i, description="open"):
+    return {
+        "Id": f"finding-{i}",
+        "AwsAccountId": "111111111111",
+        "ProductArn": "arn:aws:securityhub:us-east-1:111111111111:product/x/default",
+        "Title": "check",
+        "Description": description,
+        "UpdatedAt": f"2024-01-0{i % 9 + 1}T00:00:00Z",
+        "Severity": {"Label": "HIGH"},
+        "Compliance": {"Status": "FAILED", "RelatedRequirements": ["NIST CSF PR.AC-3", "AICPA TSC CC6.1"]},
+        "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}", "Region": "eu-west-1"}],
+    }
+
+
+@pytest.fixture(scope="function")
+def dynamodb_provider(monkeypatch):
+    monkeypatch.setenv("DYNAMODB_TABLE", "findings")
+    monkeypatch.setattr(dynamodb, "backoff_delay", lambda attempt: 0)
+    provider = DynamoDBProvider()
+    provider.max_in_flight = 1
+    stubber = Stubber(provider.dynamodb_client)
+    stubber.activate()
+    yield provider, stubber
+    stubber.deactivate()
+
+
+def test_content_hash_ignores_timestamps():
+    finding = make_finding(1)
+    assert content_hash(finding) == content_hash({**finding, "UpdatedAt": "2030-01-01T00:00:00Z"})
+    assert content_hash(finding) != content_hash(make_finding(1, description="closed"))
+
+
+def test_finding_item_keys():
+    item = finding_item(make_finding(1), "hash")
+    assert item["AccountRegion"] == {"S": "111111111111#eu-west-1"}
+    assert item["Control"] == {"S": "check"}
+    assert item["Severity"] == {"S": "HIGH"}
+    assert item["StatusUpdatedAt"]["S"].startswith("FAILED#")
+    assert item["Controls"] == {"SS": ["AICPA TSC CC6.1", "NIST CSF PR.AC-3"]}
+
+
+def test_control_is_the_check_control_id():
+    finding = dict(make_finding(1), Title="[EBS.3] EBS Volumes should be encrypted")
+    finding["Compliance"] = {"Status": "PASSED", "RelatedRequirements": ["NIST CSF PR.DS-1"]}
+    item = finding_item(finding, "hash")
+    assert item["Control"] == {"S": "EBS.3"}
+    assert item["Controls"] == {"SS": ["NIST CSF PR.DS-1"]}
+
+
+def test_unchanged_findings_are_skipped(dynamodb_provider):
+    provider, stubber = dynamodb_provider
+    findings = [make_finding(i) for i in range(30)]
+    stubber.add_response(
+        "batch_get_item",
+        {
+            "Responses": {
+                "findings": [
+                    {"FindingId": {"S": f"finding-{i}"}, "ContentHash": {"S": content_hash(findings[i])}}
+                    for i in range(3)
+                ]
+            }
+        },
+        {"RequestItems": ANY},
+    )
+    stubber.add_response("batch_write_item", {}, {"RequestItems": ANY})
+    stubber.add_response("batch_write_item", {}, {"RequestItems": ANY})
+    assert provider.write_findings(findings=iter(findings), output_file="unused")
+    stubber.assert_no_pending_responses()
+    assert provider.unchanged == 3
+    assert provider.stats.delivered == 27
+    assert provider.stats.batches == 2
+
+
+def test_unprocessed_items_are_retried(dynamodb_provider):
+    provider, stubber = dynamodb_provider
+    provider.skip_unchanged = False
+    item = finding_item(make_finding(2), content_hash(make_finding(2)))
+    stubber.add_response(
+        "batch_write_item",
+        {"UnprocessedItems": {"findings": [{"PutRequest": {"Item": item}}]}},
+        {"RequestItems": ANY},
+    )
+    stubber.add_response(
+        "batch_write_item", {}, {"RequestItems": {"findings": [{"PutRequest": {"Item": item}}]}}
+    )
+    assert provider.write_findings(findings=iter([make_finding(1), make_finding(2)]), output_file="unused")
+    stubber.assert_no_pending_responses()
+    assert provider.stats.delivered == 2
+    assert provider.stats.retried == 1
+
+
+def test_unprocessed_items_fail_after_retries(dynamodb_provider):
+    provider, stubber = dynamodb_provider
+    provider.skip_unchanged = False
+    provider.max_retries = 1
+    item = finding_item(make_finding(1), content_hash(make_finding(1)))
+    for _ in range(2):
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {"findings": [{"PutRequest": {"Item": item}}]}},
+            {"RequestItems": ANY},
+        )
+    assert not provider.write_findings(findings=iter([make_finding(1)]), output_file="unused")
+    assert provider.stats.failed == 1
+
+
+def test_chunk_exceptions_fail_the_whole_chunk(dynamodb_provider, monkeypatch):
+    provider, stubber = dynamodb_provider
+
+    def write_chunk(chunk):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(provider, "write_chunk", write_chunk)
+    assert provider.write_findings(findings=iter([make_finding(i) for i in range(120)])) is False
+    assert provider.stats.failed == 120
@@ -36,3 +36,118 @@ def test_eeauditor_plugin_run_one_check():
     app.load_plugins(plugin_name="plugin1")
     for result in app.run_checks(requested_check_name="plugin_func_1"):
         assert result == {"SchemaVersion": "2018-10-08", "Id": "test-finding"}
+
+
+POOL_PLUGIN = '''
+import os
+import time
+
+import boto3
+from check_register import CheckRegister
+
+registry = CheckRegister()
+
+
+@registry.register_check("pooltest")
+def inline_check(cache, awsAccountId, awsRegion, awsPartition):
+    # waits for the pooled check, which only finishes in time when the pool overlaps
+    deadline = time.monotonic() + 60
+    while not os.path.exists(os.environ["POOL_MARKER"]) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield {"Id": "inline", "Overlapped": os.path.exists(os.environ["POOL_MARKER"])}
+
+
+@registry.register_check("pooltest", cpu_bound=True)
+def pooled_check(cache, awsAccountId, awsRegion, awsPartition):
+    open(os.environ["POOL_MARKER"], "w").close()
+    yield {
+        "Id": "pooled",
+        "AwsAccountId": awsAccountId,
+        "Profile": boto3.DEFAULT_SESSION.profile_name,
+        "InScope": registry.in_scope("arn:aws:s3:::excluded-bucket"),
+    }
+
+
+@registry.register_check("pooltest", cpu_bound=True, account_level=True)
+def account_check(cache, awsAccountId, awsRegion, awsPartition):
+    yield {"SchemaVersion": "2018-10-08", "Id": "account", "Cached": False}
+
+
+@registry.register_check("pooltest", cpu_bound=True)
+def crashing_check(cache, awsAccountId, awsRegion, awsPartition):
+    os._exit(1)
+    yield {}
+'''
+
+
+def test_pooled_checks(tmp_path, monkeypatch, capsys):
+    import boto3
+    from botocore.stub import Stubber
+
+    import eeauditor
+    from check_register import CheckRegister
+    from metrics import CHECK_DURATION
+    from result_cache import LocalResultCache
+    from scan_scope import ScanScope
+
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    (plugins / "pool_plugin.py").write_text(POOL_PLUGIN)
+    config = tmp_path / "config"
+    config.write_text("[profile auditor]\nregion = us-east-1\naws_access_key_id = x\naws_secret_access_key = x\n")
+    # spawned workers inherit the environment
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    monkeypatch.setenv("POOL_MARKER", str(tmp_path / "pooled-started"))
+    monkeypatch.setattr(CheckRegister, "checks", {})
+    monkeypatch.setattr(CheckRegister, "scope", ScanScope(exclude_arns=["arn:aws:s3:::excluded-*"]))
+
+    sts = boto3.client("sts", region_name="us-east-1")
+    stubber = Stubber(sts)
+    stubber.add_response("get_caller_identity", {"Account": "012345678901"})
+    monkeypatch.setattr(eeauditor.boto3, "client", lambda *args, **kwargs: sts)
+    with stubber:
+        app = eeauditor.EEAuditor(name="test controller", search_path=str(plugins))
+    app.get_regions = lambda service: [app.awsRegion]
+    app.process_pool_workers = 2
+    app.profile_name = "auditor"
+    app.result_cache = LocalResultCache(str(tmp_path / "cache"), ttl=60)
+    app.result_cache.put(
+        "012345678901",
+        "us-east-1",
+        "pooltest",
+        "account_check",
+        [{"SchemaVersion": "2018-10-08", "Id": "account", "Cached": True}],
+    )
+    app.load_plugins()
+    observed = CHECK_DURATION.values.get(("pooltest", "pooled_check"), [None, 0.0, 0])[2]
+
+    findings = {finding["Id"]: finding for finding in app.run_checks()}
+    assert set(findings) == {"inline", "pooled", "account"}
+    # pooled account level checks are served from the result cache without running
+    assert findings["account"]["Cached"]
+    assert CHECK_DURATION.values[("pooltest", "pooled_check")][2] == observed + 1
+    assert findings["inline"]["Overlapped"]
+    assert findings["pooled"]["AwsAccountId"] == "012345678901"
+    assert findings["pooled"]["Profile"] == "auditor"
+    assert findings["pooled"]["InScope"] is False
+    assert "Failed to execute check crashing_check, its worker process crashed" in capsys.readouterr().out
+
+
+def test_service_regions_are_looked_up_once(monkeypatch):
+    import boto3
+    from botocore.stub import Stubber
+
+    import eeauditor
+
+    ssm = boto3.client("ssm", region_name="us-east-1")
+    monkeypatch.setattr(eeauditor, "ssm", ssm)
+    app = eeauditor.EEAuditor.__new__(eeauditor.EEAuditor)
+    app.service_regions = {}
+    with Stubber(ssm) as stubber:
+        stubber.add_response(
+            "get_parameters_by_path",
+            {"Parameters": [{"Value": "us-east-1"}, {"Value": "eu-west-1"}]},
+        )
+        assert app.get_regions("kinesisanalyticsv2") == ["us-east-1", "eu-west-1"]
+        assert app.get_regions("kinesisanalytics") == ["us-east-1", "eu-west-1"]
+        stubber.assert_no_pending_responses()
@@ -0,0 +1,54 @@
+import json
+import pickle
+
+from . import context
+from finding_factory import Finding, FindingTemplate, to_asff
+
+template = FindingTemplate(
+    title="[Test.1] Test resources should be tested",
+    types=["Software and Configuration Checks/AWS Security Best Practices"],
+    remediation_text="Test the resource",
+    remediation_url="https://example.com",
+    resource_type="AwsEc2SecurityGroup",
+    related_requirements=["NIST CSF PR.AC-3", "AICPA TSC CC6.6"],
+)
+
+
+def make_finding():
+    return template.failed(
+        "arn:aws:ec2:us-east-1:012345678901:security-group/sg-1/test",
+        "arn:aws:ec2:us-east-1:012345678901:security-group/sg-1",
+        "012345678901",
+        "us-east-1",
+        "aws",
+        severity="HIGH",
+        description="sg-1 is not tested",
+        details={"AwsEc2SecurityGroup": {"GroupId": "sg-1"}},
+    )
+
+
+def test_finding_reads_as_asff():
+    finding = make_finding()
+    assert finding["Compliance"]["Status"] == "FAILED"
+    assert finding.get("Resources")[0]["Details"] == {"AwsEc2SecurityGroup": {"GroupId": "sg-1"}}
+    assert finding["ProductArn"] == "arn:aws:securityhub:us-east-1:012345678901:product/012345678901/default"
+    assert finding.get("Missing") is None
+    assert json.loads(json.dumps(to_asff(finding)))["Types"] == list(template.types)
+    assert to_asff({"Id": "plain"}) == {"Id": "plain"}
+
+
+def test_findings_share_static_parts():
+    first, second = make_finding(), make_finding()
+    assert first.template is second.template
+    assert first["Compliance"]["RelatedRequirements"][0] is second["Compliance"]["RelatedRequirements"][0]
+    assert first.asff()["Types"] == ["Software and Configuration Checks/AWS Security Best Practices"]
+    assert not hasattr(first, "__dict__")
+
+
+def test_passed_finding_and_pickling():
+    finding = template.passed("id", "resource", "012345678901", "us-east-1", "aws", description="ok")
+    assert finding["RecordState"] == "ARCHIVED"
+    assert finding["Workflow"] == {"Status": "RESOLVED"}
+    assert "Details" not in finding["Resources"][0]
+    assert pickle.loads(pickle.dumps(finding)).asff() == finding.asff()
+    assert isinstance(pickle.loads(pickle.dumps(finding)), Finding)
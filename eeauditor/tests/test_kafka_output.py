@@ -0,0 +1,92 @@
+import pytest
+
+from . import context
+from processor.outputs import kafka
+from processor.outputs.kafka import KafkaProvider
+
+
+class FakeMessage(object):
+    def __init__(self, key):
+        self._key = key
+
+    def key(self):
+        return self._key
+
+
+class FakeProducer(object):
+    """Stands in for confluent_kafka.Producer, deliveries are reported from poll and flush"""
+
+    instances = []
+    # keys whose delivery fails, and how many records flush leaves undelivered
+    failing_keys = set()
+    left_after_flush = 0
+
+    def __init__(self, config):
+        self.config = config
+        self.produced = []
+        self.pending = []
+        self.buffer_full = 1
+        FakeProducer.instances.append(self)
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        if self.buffer_full:
+            self.buffer_full -= 1
+            raise BufferError("Local: Queue full")
+        self.produced.append((topic, key, value))
+        self.pending.append((key, on_delivery))
+
+    def poll(self, timeout):
+        delivered = 0
+        while len(self.pending) > FakeProducer.left_after_flush:
+            key, on_delivery = self.pending.pop(0)
+            error = "Broker: Not enough in-sync replicas" if key in FakeProducer.failing_keys else None
+            on_delivery(error, FakeMessage(key))
+            delivered += 1
+        return delivered
+
+    def flush(self, timeout):
+        self.poll(timeout)
+        return len(self.pending)
+
+
+@pytest.fixture(scope="function")
+def kafka_provider(monkeypatch):
+    monkeypatch.setattr(kafka, "Producer", FakeProducer)
+    monkeypatch.setattr(kafka, "KafkaException", Exception, raising=False)
+    monkeypatch.setenv("KAFKA_TOPIC", "findings")
+    monkeypatch.setenv("KAFKA_PRODUCER_CONFIG", '{"security.protocol": "SASL_SSL"}')
+    FakeProducer.instances = []
+    FakeProducer.failing_keys = set()
+    FakeProducer.left_after_flush = 0
+    return KafkaProvider()
+
+
+def make_findings(count):
+    return [
+        {"Id": f"finding-{i}", "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}"}]}
+        for i in range(count)
+    ]
+
+
+def test_kafka_produces_keyed_findings(kafka_provider):
+    assert kafka_provider.write_findings(findings=iter(make_findings(3))) is True
+    producer = FakeProducer.instances[0]
+    assert producer.config["enable.idempotence"] is True
+    assert producer.config["security.protocol"] == "SASL_SSL"
+    # the record refused with BufferError is produced again once the queue drained
+    assert [key for topic, key, value in producer.produced] == [
+        b"arn:aws:s3:::bucket-0",
+        b"arn:aws:s3:::bucket-1",
+        b"arn:aws:s3:::bucket-2",
+    ]
+    assert {topic for topic, key, value in producer.produced} == {"findings"}
+    assert kafka_provider.stats.delivered == 3
+
+
+def test_kafka_counts_failed_and_undelivered_findings(kafka_provider):
+    FakeProducer.failing_keys = {b"arn:aws:s3:::bucket-1"}
+    FakeProducer.left_after_flush = 2
+    assert kafka_provider.write_findings(findings=iter(make_findings(5))) is False
+    assert kafka_provider.stats.delivered == 2
+    # one rejected by the broker, two still queued when flush timed out
+    assert kafka_provider.stats.failed == 3
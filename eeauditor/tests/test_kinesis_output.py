@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+from botocore.stub import ANY, Stubber
+
+from . import context
+from processor.outputs.kinesis import KinesisProvider, partition_key
+
+
+def make_findings(count):
+    return [
+        {"Id": f"finding-{i}", "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}"}]}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="function")
+def kinesis_provider(monkeypatch):
+    monkeypatch.setenv("KINESIS_STREAM_NAME", "findings")
+    provider = KinesisProvider()
+    provider.max_in_flight = 1
+    stubber = Stubber(provider.kinesis_client)
+    stubber.activate()
+    yield provider, stubber
+    stubber.deactivate()
+
+
+def test_partition_key():
+    assert partition_key(make_findings(1)[0]) == "arn:aws:s3:::bucket-0"
+    assert len(partition_key({"Id": "x", "Resources": [{"Id": "a" * 300}]})) == 64
+
+
+def test_batches_are_capped_at_500_records(kinesis_provider):
+    provider, stubber = kinesis_provider
+    batches = list(provider.batches(make_findings(1200)))
+    assert [len(batch) for batch in batches] == [500, 500, 200]
+
+
+def test_only_failed_records_are_retried(kinesis_provider):
+    provider, stubber = kinesis_provider
+    stubber.add_response(
+        "put_records",
+        {
+            "FailedRecordCount": 1,
+            "Records": [
+                {"SequenceNumber": "1", "ShardId": "shardId-0"},
+                {"ErrorCode": "ProvisionedThroughputExceededException", "ErrorMessage": "slow down"},
+                {"SequenceNumber": "2", "ShardId": "shardId-0"},
+            ],
+        },
+        {"StreamName": "findings", "Records": ANY},
+    )
+    stubber.add_response(
+        "put_records",
+        {"Records": [{"SequenceNumber": "3", "ShardId": "shardId-0"}]},
+        {
+            "StreamName": "findings",
+            "Records": [
+                {"Data": json.dumps(make_findings(2)[1]).encode(), "PartitionKey": "arn:aws:s3:::bucket-1"}
+            ],
+        },
+    )
+    provider.serialize = lambda finding: json.dumps(finding).encode()
+    assert provider.write_findings(findings=iter(make_findings(3))) is True
+    assert provider.stats.delivered == 3
+    assert provider.stats.retried == 1
+    stubber.assert_no_pending_responses()
+
+
+def test_aggregated_compressed_records(kinesis_provider):
+    provider, stubber = kinesis_provider
+    provider.aggregate = 2
+    provider.compression = "gzip"
+    records = list(provider.records(make_findings(5)))
+    assert [count for record, count in records] == [2, 2, 1]
+    lines = gzip.decompress(records[0][0]["Data"]).splitlines()
+    assert [json.loads(line)["Id"] for line in lines] == ["finding-0", "finding-1"]
+    assert records[0][0]["PartitionKey"] == "arn:aws:s3:::bucket-0"
+
+
+def test_batch_exceptions_fail_every_finding_of_the_batch(kinesis_provider, monkeypatch):
+    provider, stubber = kinesis_provider
+    provider.aggregate = 10
+
+    def put_batch(batch):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(provider, "put_batch", put_batch)
+    assert provider.write_findings(findings=iter(make_findings(25))) is False
+    assert provider.stats.failed == 25
@@ -0,0 +1,85 @@
+import io
+import json
+import time
+
+import boto3
+import requests
+from botocore.stub import Stubber
+
+from . import context
+import metrics
+from metrics import Counter, Histogram, Registry, instrument_session, timed_findings
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    calls = registry.register(Counter("test_calls_total", "Calls", ("operation",)))
+    latency = registry.register(Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1)))
+    calls.inc(operation='Describe"Things"')
+    calls.inc(2, operation='Describe"Things"')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    text = registry.render()
+    assert "# TYPE test_calls_total counter" in text
+    assert 'test_calls_total{operation="Describe\\"Things\\""} 3' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_count 3" in text
+
+
+def test_emf_records():
+    registry = Registry()
+    registry.register(Counter("test_findings_total", "Findings", ("severity",))).inc(severity="HIGH")
+    registry.register(Histogram("test_latency_seconds", "Latency", ("output",))).observe(2, output="sechub")
+    records = {next(iter(record["_aws"]["CloudWatchMetrics"][0]["Metrics"]))["Name"]: record for record in registry.emf_records()}
+    assert set(records) == {"test_findings_total", "test_latency_seconds_sum", "test_latency_seconds_count"}
+    assert records["test_findings_total"]["severity"] == "HIGH"
+    assert records["test_findings_total"]["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["severity"]]
+    assert records["test_latency_seconds_sum"]["test_latency_seconds_sum"] == 2
+
+
+def test_timed_findings_leaves_out_the_consumer():
+    def check():
+        time.sleep(0.02)
+        yield 1
+        yield 2
+
+    findings = []
+    for finding in timed_findings(check(), "test-service", "test_check"):
+        time.sleep(0.05)
+        findings.append(finding)
+    assert findings == [1, 2]
+    total = metrics.CHECK_DURATION.values[("test-service", "test_check")][1]
+    assert 0.02 <= total < 0.05
+
+
+def test_botocore_calls_are_counted():
+    session = boto3.session.Session(aws_access_key_id="x", aws_secret_access_key="x", region_name="us-east-1")
+    instrument_session(session)
+    client = session.client("sqs")
+    with Stubber(client) as stubber:
+        stubber.add_response("list_queues", {"QueueUrls": [], "ResponseMetadata": {"RetryAttempts": 2}})
+        client.list_queues()
+    labels = ("sqs", "ListQueues")
+    assert metrics.API_CALLS.values[labels] >= 1
+    assert metrics.API_RETRIES.values[labels] >= 2
+
+
+def test_scrape_endpoint():
+    metrics.FINDINGS.inc(severity="CRITICAL", status="FAILED")
+    server = metrics.start_http_server(0, "127.0.0.1")
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert 'electriceye_findings_total{severity="CRITICAL",status="FAILED"}' in response.text
+    finally:
+        server.shutdown()
+
+
+def test_write_emf_lines():
+    stream = io.StringIO()
+    metrics.write_emf(stream)
+    for line in stream.getvalue().splitlines():
+        assert json.loads(line)["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "ElectricEye"
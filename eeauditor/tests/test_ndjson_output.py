@@ -0,0 +1,41 @@
+import gzip
+import json
+
+from . import context
+from processor.outputs.ndjson import NdjsonProvider
+
+findings = [{"SchemaVersion": "2018-10-08", "Id": f"finding-{i}"} for i in range(25)]
+
+
+def test_ndjson_rotation(tmp_path, monkeypatch):
+    monkeypatch.setenv("NDJSON_ROTATE_COUNT", "10")
+    output_file = str(tmp_path / "output")
+    assert NdjsonProvider().write_findings(findings=iter(findings), output_file=output_file)
+    parts = sorted(tmp_path.glob("output-*.ndjson"))
+    assert [len(part.read_text().splitlines()) for part in parts] == [10, 10, 5]
+    assert json.loads(parts[0].read_text().splitlines()[0]) == findings[0]
+
+
+def test_ndjson_gzip_readable_while_writing(tmp_path, monkeypatch):
+    monkeypatch.setenv("NDJSON_COMPRESSION", "gzip")
+    monkeypatch.setenv("NDJSON_FLUSH_EVERY", "5")
+    output_file = str(tmp_path / "output")
+    path = tmp_path / "output.ndjson.gz"
+
+    def stream():
+        for i, finding in enumerate(findings):
+            if i == 20:
+                # the first 20 findings were flushed and can already be decompressed
+                partial = gzip.GzipFile(fileobj=open(path, "rb"))
+                lines = []
+                try:
+                    for line in partial:
+                        lines.append(line)
+                except EOFError:
+                    pass
+                assert len(lines) == 20
+            yield finding
+
+    NdjsonProvider().write_findings(findings=stream(), output_file=output_file)
+    with gzip.open(path) as result:
+        assert [json.loads(line)["Id"] for line in result] == [f["Id"] for f in findings]
@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from . import context
+from processor.outputs.opensearch import OpenSearchProvider
+
+
+class BulkStub(BaseHTTPRequestHandler):
+    documents = {}
+    throttle_first = set()
+
+    def do_POST(self):
+        lines = self.rfile.read(int(self.headers["Content-Length"])).decode().splitlines()
+        items = []
+        for action, document in zip(lines[::2], lines[1::2]):
+            action = json.loads(action)["index"]
+            if action["_id"] in BulkStub.throttle_first:
+                BulkStub.throttle_first.discard(action["_id"])
+                items.append({"index": {"_id": action["_id"], "status": 429}})
+            else:
+                BulkStub.documents[(action["_index"], action["_id"])] = json.loads(document)
+                items.append({"index": {"_id": action["_id"], "status": 201}})
+        body = json.dumps({"errors": any(i["index"]["status"] > 299 for i in items), "items": items}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="function")
+def opensearch_url(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), BulkStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    BulkStub.documents = {}
+    monkeypatch.setenv("OPENSEARCH_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("OPENSEARCH_BATCH_BYTES", "1024")
+    yield
+    server.shutdown()
+
+
+def make_findings():
+    return [
+        {"Id": f"finding-{i}", "UpdatedAt": "2021-03-01T10:00:00Z", "Description": "x" * 200}
+        for i in range(20)
+    ]
+
+
+def test_opensearch_upserts_and_retries_items(opensearch_url):
+    BulkStub.throttle_first = {"finding-3", "finding-11"}
+    provider = OpenSearchProvider()
+    assert provider.write_findings(findings=iter(make_findings())) is True
+    assert provider.write_findings(findings=iter(make_findings())) is True
+    # re-runs overwrite the same documents
+    assert len(BulkStub.documents) == 20
+    assert provider.stats.batches > 2
+    assert provider.stats.retried == 2
+
+
+def test_opensearch_date_indices(opensearch_url, monkeypatch):
+    monkeypatch.setenv("OPENSEARCH_DATE_INDICES", "true")
+    BulkStub.throttle_first = set()
+    assert OpenSearchProvider().write_findings(findings=make_findings()[:1])
+    assert list(BulkStub.documents) == [("electriceye-findings-2021.03.01", "finding-0")]
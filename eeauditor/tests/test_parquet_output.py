@@ -0,0 +1,59 @@
+import pytest
+
+from . import context
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from processor.outputs.parquet import ParquetProvider, finding_service
+
+
+def make_finding(i, account="012345678901", region="us-east-1"):
+    return {
+        "SchemaVersion": "2018-10-08",
+        "Id": f"finding-{i}",
+        "AwsAccountId": account,
+        "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
+        "CreatedAt": "2021-03-01T10:00:00.000000+00:00",
+        "UpdatedAt": "2021-03-01T10:00:00.000000+00:00",
+        "Severity": {"Label": "LOW"},
+        "Title": "[S3.1] S3 Buckets should be encrypted",
+        "Resources": [
+            {
+                "Type": "AwsS3Bucket",
+                "Id": f"arn:aws:s3:::bucket-{i}",
+                "Partition": "aws",
+                "Region": region,
+                "Details": {"Other": {"Name": f"bucket-{i}"}},
+            }
+        ],
+        "Compliance": {"Status": "FAILED", "RelatedRequirements": ["NIST CSF PR.DS-1"]},
+        "RecordState": "ACTIVE",
+    }
+
+
+def test_finding_service():
+    assert finding_service(make_finding(0)) == "s3"
+    assert finding_service({"Resources": [{"Type": "AwsAccount", "Id": "012345678901"}]}) == "account"
+
+
+def test_parquet_partitions_and_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setenv("PARQUET_ROW_GROUP_SIZE", "4")
+    findings = [make_finding(i) for i in range(10)] + [make_finding(10, region="eu-west-1")]
+    assert ParquetProvider().write_findings(findings=iter(findings), output_file=str(tmp_path / "output"))
+
+    partition = tmp_path / "output-parquet/date=2021-03-01/account=012345678901/region=us-east-1/service=s3"
+    files = list(partition.glob("*.parquet"))
+    assert len(files) == 1
+    parquet_file = pq.ParquetFile(files[0])
+    assert parquet_file.metadata.num_rows == 10
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column("RelatedRequirements")[0].as_py() == ["NIST CSF PR.DS-1"]
+    assert table.column("Resources")[0].as_py()[0]["Id"] == "arn:aws:s3:::bucket-0"
+    assert len(list((tmp_path / "output-parquet").glob("*/*/region=eu-west-1/*/*.parquet"))) == 1
+    row_group = parquet_file.metadata.row_group(0)
+    encodings = {
+        row_group.column(i).path_in_schema: row_group.column(i).encodings for i in range(row_group.num_columns)
+    }
+    for column in ("Title", "Types.list.element", "RelatedRequirements.list.element"):
+        assert "RLE_DICTIONARY" in encodings[column]
@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+from . import context
+import planner
+from planner import ScanPlanner
+
+
+def make_check(name, module, fanout=1, account_level=False):
+    def check(cache, awsAccountId, awsRegion, awsPartition):
+        yield {}
+
+    check.__name__ = name
+    check.__module__ = f"electriceye.plugins.{module}"
+    check.fanout = fanout
+    check.account_level = account_level
+    return check
+
+
+def make_app(checks):
+    return SimpleNamespace(awsAccountId="012345678901", registry=SimpleNamespace(checks=checks))
+
+
+def test_plan_costs_each_check_by_its_resource_type(tmp_path):
+    counts_file = tmp_path / "counts.json"
+    counts_file.write_text(
+        json.dumps({"iam_users": 3, "iam_roles": 40, "ebs_volumes": 10, "ebs_snapshots": 200})
+    )
+    app = make_app(
+        {
+            "iam": {
+                "user_mfa_check": make_check("user_mfa_check", "AWS_IAM_Auditor"),
+                "iam_role_policy_least_priv_check": make_check(
+                    "iam_role_policy_least_priv_check", "AWS_IAM_Auditor", fanout=2
+                ),
+                "cis_aws_foundation_benchmark_pw_policy_check": make_check(
+                    "cis_aws_foundation_benchmark_pw_policy_check", "AWS_IAM_Auditor", fanout=0, account_level=True
+                ),
+            },
+            "ec2": {
+                "ebs_volume_encryption_check": make_check("ebs_volume_encryption_check", "Amazon_EBS_Auditor", fanout=0),
+                "ebs_snapshot_public_check": make_check("ebs_snapshot_public_check", "Amazon_EBS_Auditor"),
+            },
+            "unknown": {"unknown_check": make_check("unknown_check", "Unknown_Auditor")},
+        }
+    )
+    checks, totals = ScanPlanner(app, counts_file=str(counts_file)).plan()
+    estimates = {check["Check"]: (check["Resources"], check["ApiCalls"]) for check in checks}
+    assert estimates == {
+        "user_mfa_check": (3, 4),
+        "iam_role_policy_least_priv_check": (40, 81),
+        "cis_aws_foundation_benchmark_pw_policy_check": (1, 1),
+        "ebs_volume_encryption_check": (10, 1),
+        "ebs_snapshot_public_check": (200, 201),
+        "unknown_check": (5, 6),
+    }
+    assert totals["ApiCalls"] == 4 + 81 + 1 + 1 + 201 + 6
+    assert totals["FindingsPerRun"] == 3 + 40 + 1 + 10 + 200 + 5
+
+
+def test_inventory_calls_get_the_account_id(monkeypatch, tmp_path):
+    calls = []
+
+    class FakeEC2(object):
+        def can_paginate(self, operation):
+            return False
+
+        def describe_snapshots(self, **kwargs):
+            calls.append(kwargs)
+            return {"Snapshots": [{"SnapshotId": "snap-1"}, {"SnapshotId": "snap-2"}]}
+
+    monkeypatch.setattr(planner.boto3, "client", lambda client_name: FakeEC2())
+    counts_file = tmp_path / "counts.json"
+    app = make_app({})
+    scan_planner = ScanPlanner(app, counts_file=str(counts_file))
+    assert scan_planner.count_resources("ebs_snapshots") == 2
+    assert calls == [{"OwnerIds": ["012345678901"]}]
+    # counted once and written back for the next plan
+    assert scan_planner.count_resources("ebs_snapshots") == 2
+    scan_planner.plan()
+    assert json.loads(counts_file.read_text()) == {"ebs_snapshots": 2}
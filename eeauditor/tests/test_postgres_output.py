@@ -0,0 +1,112 @@
+import csv
+import datetime
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from . import context
+from processor.outputs import postgres
+from processor.outputs.postgres import CopyStream, PostgresProvider, finding_row
+
+
+def test_copy_stream_reads_in_chunks():
+    run_date = datetime.date(2021, 3, 1)
+    findings = [
+        {"Id": f"finding-{i}", "Title": 'Quoted "title", with comma', "Severity": {"Label": "LOW"}}
+        for i in range(100)
+    ]
+    stream = CopyStream(finding_row(finding, run_date) for finding in findings)
+    chunks = []
+    while True:
+        chunk = stream.read(1000)
+        if not chunk:
+            break
+        assert len(chunk) <= 1000
+        chunks.append(chunk)
+    assert stream.count == 100
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert len(rows) == 100
+    assert rows[0][:2] == ["finding-0", "2021-03-01"]
+    assert rows[99][5] == 'Quoted "title", with comma'
+    # None is written unquoted, which COPY reads as NULL
+    assert "finding-0,2021-03-01,,," in chunks[0]
+
+
+class FakeCursor(object):
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, statement, params=None):
+        self.statements.append(" ".join(statement.split()))
+
+    def copy_expert(self, statement, stream):
+        self.statements.append(statement)
+        self.copied = stream.read()
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.statements = []
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        self.committed = exc_type is None
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.statements)
+
+
+@pytest.fixture
+def postgres_connection(monkeypatch):
+    connection = FakeConnection()
+    monkeypatch.setattr(postgres, "psycopg2", SimpleNamespace(Error=RuntimeError))
+    monkeypatch.setattr(postgres, "get_connection", lambda dsn: connection)
+    monkeypatch.setenv("POSTGRES_DSN", "postgresql://electriceye@localhost/findings")
+    return connection
+
+
+def merge_statement(statements):
+    return next(statement for statement in statements if statement.startswith("INSERT INTO"))
+
+
+def test_findings_are_merged_on_their_id(postgres_connection, monkeypatch):
+    monkeypatch.delenv("POSTGRES_PARTITION_BY_DATE", raising=False)
+    findings = [{"Id": "finding-0"}, {"Id": "finding-1"}, {"Id": "finding-0"}]
+    assert PostgresProvider().write_findings(findings=iter(findings))
+    statements = postgres_connection.statements
+    assert statements[0].startswith("CREATE TABLE IF NOT EXISTS electriceye_findings (")
+    assert "PRIMARY KEY (id) )" in statements[0]
+    assert "PARTITION" not in " ".join(statements)
+    assert statements[4] == (
+        "CREATE TEMPORARY TABLE electriceye_findings_staging "
+        "(LIKE electriceye_findings INCLUDING DEFAULTS) ON COMMIT DROP"
+    )
+    assert statements[5].startswith("COPY electriceye_findings_staging (id, run_date, ")
+    merge = merge_statement(statements)
+    assert "SELECT DISTINCT ON (id)" in merge
+    assert "ON CONFLICT (id) DO UPDATE SET run_date = excluded.run_date, account_id = excluded.account_id" in merge
+    assert "id = excluded.id" not in merge
+    assert postgres_connection.committed
+
+
+def test_partitioned_findings_are_merged_per_run_date(postgres_connection, monkeypatch):
+    monkeypatch.setenv("POSTGRES_PARTITION_BY_DATE", "true")
+    assert PostgresProvider().write_findings(findings=iter([{"Id": "finding-0"}]))
+    statements = postgres_connection.statements
+    assert "PRIMARY KEY (run_date, id) ) PARTITION BY RANGE (run_date)" in statements[0]
+    assert statements[1].startswith("CREATE TABLE IF NOT EXISTS electriceye_findings_")
+    assert "PARTITION OF electriceye_findings FOR VALUES FROM (%s) TO (%s)" in statements[1]
+    merge = merge_statement(statements)
+    assert "ON CONFLICT (run_date, id) DO UPDATE SET account_id = excluded.account_id" in merge
+    assert "run_date = excluded.run_date" not in merge
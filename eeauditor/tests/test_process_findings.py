@@ -0,0 +1,87 @@
+import json
+import threading
+
+import pytest
+
+from . import context
+from processor.main import process_findings
+from processor.outputs.output_base import ElectricEyeOutput
+
+findings = [{"SchemaVersion": "2018-10-08", "Id": f"finding-{i}"} for i in range(50)]
+release_slow_output = threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def skip_validation(monkeypatch):
+    # these findings are only placeholders, ASFF validation has its own tests
+    monkeypatch.setenv("FINDING_VALIDATION", "off")
+
+
+@ElectricEyeOutput
+class FailingProvider(object):
+    __provider__ = "test-failing"
+
+    def write_findings(self, findings: list, **kwargs):
+        next(iter(findings))
+        raise ValueError("output is down")
+
+
+@ElectricEyeOutput
+class SlowProvider(object):
+    __provider__ = "test-slow"
+
+    def write_findings(self, findings: list, **kwargs):
+        release_slow_output.wait()
+        return len(list(findings)) == 50
+
+
+def test_failing_output_does_not_block_others(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_BUFFER_SIZE", "5")
+    output_file = str(tmp_path / "output")
+    assert process_findings(
+        findings=iter(findings), outputs=["test-failing", "json"], output_file=output_file
+    )
+    assert len(json.load(open(f"{output_file}.json"))["Findings"]) == 50
+    assert not process_findings(
+        findings=iter(findings),
+        outputs=["test-failing", "json"],
+        required_outputs=["test-failing"],
+        output_file=output_file,
+    )
+
+
+def test_stalled_output_is_dropped(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("OUTPUT_BUFFER_SIZE", "5")
+    monkeypatch.setenv("OUTPUT_STALL_TIMEOUT", "1")
+    monkeypatch.setenv("OUTPUT_ABORT_TIMEOUT", "0.1")
+    output_file = str(tmp_path / "output")
+    try:
+        assert not process_findings(
+            findings=iter(findings),
+            outputs=["test-slow", "ndjson"],
+            required_outputs=["all"],
+            output_file=output_file,
+        )
+    finally:
+        release_slow_output.set()
+    assert len(open(f"{output_file}.ndjson").read().splitlines()) == 50
+    assert "Output test-slow did not stop within 0 seconds of being aborted" in capsys.readouterr().out
+
+
+def test_stalled_output_stops_once_it_reads_again(tmp_path, monkeypatch):
+    monkeypatch.setenv("OUTPUT_BUFFER_SIZE", "5")
+    monkeypatch.setenv("OUTPUT_STALL_TIMEOUT", "1")
+    resumed = threading.Event()
+
+    @ElectricEyeOutput
+    class ResumingProvider(object):
+        __provider__ = "test-resuming"
+
+        def write_findings(self, findings: list, **kwargs):
+            resumed.wait(2)
+            list(findings)
+
+    timer = threading.Timer(1.5, resumed.set)
+    timer.start()
+    assert process_findings(findings=iter(findings), outputs=["test-resuming"], output_file=str(tmp_path / "output"))
+    assert not [thread for thread in threading.enumerate() if thread.name == "output-test-resuming"]
@@ -0,0 +1,82 @@
+import pytest
+
+from . import context
+from eeauditor import EEAuditor
+from result_cache import LocalResultCache, ResultCache, get_result_cache
+
+findings = [{"SchemaVersion": "2018-10-08", "Id": "012345678901/pw-policy", "UpdatedAt": "old"}]
+
+
+def test_local_result_cache_hit(tmp_path):
+    cache = LocalResultCache(str(tmp_path), ttl=60)
+    assert cache.get("012345678901", "us-east-1", "iam", "pw_policy_check") is None
+    cache.put("012345678901", "us-east-1", "iam", "pw_policy_check", findings)
+    results = cache.get("012345678901", "us-east-1", "iam", "pw_policy_check")
+    assert results[0]["Id"] == "012345678901/pw-policy"
+    assert results[0]["UpdatedAt"] != "old"
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_local_result_cache_expired(tmp_path):
+    cache = LocalResultCache(str(tmp_path), ttl=-1)
+    cache.put("012345678901", "us-east-1", "iam", "pw_policy_check", findings)
+    assert cache.get("012345678901", "us-east-1", "iam", "pw_policy_check") is None
+
+
+def test_local_result_cache_invalidate_service(tmp_path):
+    cache = get_result_cache(str(tmp_path), ttl=60)
+    cache.put("012345678901", "us-east-1", "iam", "pw_policy_check", findings)
+    cache.put("012345678901", "us-east-1", "s3", "s3_account_level_block", findings)
+    cache.invalidate("012345678901", "us-east-1", "iam")
+    assert cache.get("012345678901", "us-east-1", "iam", "pw_policy_check") is None
+    assert cache.get("012345678901", "us-east-1", "s3", "s3_account_level_block") is not None
+
+
+class UnavailableResultCache(LocalResultCache):
+    def _read(self, *args):
+        raise RuntimeError("AccessDenied")
+
+    def _write(self, *args):
+        raise RuntimeError("ProvisionedThroughputExceededException")
+
+
+def test_unavailable_result_cache_is_a_miss(tmp_path):
+    def account_check(cache, awsAccountId, awsRegion, awsPartition):
+        yield {"SchemaVersion": "2018-10-08", "Id": f"{awsAccountId}/pw-policy"}
+
+    account_check.account_level = True
+    app = EEAuditor.__new__(EEAuditor)
+    app.awsAccountId, app.awsRegion, app.awsPartition = "012345678901", "us-east-1", "aws"
+    app.result_cache = UnavailableResultCache(str(tmp_path))
+    results = app.execute_check("iam", "account_check", account_check, {})
+    assert [finding["Id"] for finding in results] == ["012345678901/pw-policy"]
+    assert app.result_cache.misses == 1
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    runs = []
+
+    def account_check(cache, awsAccountId, awsRegion, awsPartition):
+        runs.append(awsAccountId)
+        # the first run swallows a throttling error and yields nothing
+        if len(runs) > 1:
+            yield {"SchemaVersion": "2018-10-08", "Id": f"{awsAccountId}/pw-policy"}
+
+    account_check.account_level = True
+    app = EEAuditor.__new__(EEAuditor)
+    app.awsAccountId, app.awsRegion, app.awsPartition = "012345678901", "us-east-1", "aws"
+    app.result_cache = LocalResultCache(str(tmp_path), ttl=60)
+    assert app.execute_check("iam", "account_check", account_check, {}) == []
+    results = app.execute_check("iam", "account_check", account_check, {})
+    assert [finding["Id"] for finding in results] == ["012345678901/pw-policy"]
+    assert len(runs) == 2
+    # the findings of the second run are served from the cache
+    cached = app.execute_check("iam", "account_check", account_check, {})
+    assert [finding["Id"] for finding in cached] == ["012345678901/pw-policy"]
+    assert len(runs) == 2
+
+
+def test_result_cache_backends_implement_every_method():
+    with pytest.raises(TypeError):
+        ResultCache()
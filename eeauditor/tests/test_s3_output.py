@@ -0,0 +1,135 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+
+from . import context
+from processor.outputs import s3
+from processor.outputs.s3 import MultipartWriter, S3Provider, scan_partition
+
+
+class RecordingS3(object):
+    """Keeps the parts of every multipart upload and the objects put"""
+
+    def __init__(self):
+        self.uploads = {}
+        self.objects = {}
+
+    def create_multipart_upload(self, Bucket, Key, ChecksumAlgorithm):
+        self.uploads[Key] = []
+        return {"UploadId": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ChecksumAlgorithm, ChecksumSHA256):
+        assert ChecksumSHA256 == base64.b64encode(hashlib.sha256(Body).digest()).decode()
+        self.uploads[Key].append((PartNumber, Body))
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        assert [part["PartNumber"] for part in MultipartUpload["Parts"]] == list(
+            range(1, len(self.uploads[Key]) + 1)
+        )
+        self.objects[Key] = b"".join(body for _, body in sorted(self.uploads[Key]))
+        return {"ChecksumSHA256": "composite-1"}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(Key)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+
+def make_findings(count, accounts=("111111111111",), regions=("us-east-1",)):
+    return [
+        {
+            "Id": f"finding-{i}",
+            "AwsAccountId": accounts[i % len(accounts)],
+            "ProductArn": f"arn:aws:securityhub:{regions[i % len(regions)]}:{accounts[i % len(accounts)]}:product/x/default",
+            "Title": "check",
+            "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}"}],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="function")
+def s3_provider(monkeypatch):
+    monkeypatch.setenv("S3_BUCKET", "findings-bucket")
+    provider = S3Provider()
+    provider.s3_client = RecordingS3()
+    return provider
+
+
+def test_scan_partition():
+    assert scan_partition(make_findings(1)[0]) == ("111111111111", "us-east-1")
+    assert scan_partition({}) == ("unknown", "unknown")
+
+
+def test_findings_are_partitioned_with_a_manifest(s3_provider):
+    findings = make_findings(10, accounts=("111111111111", "222222222222"), regions=("us-east-1", "eu-west-1"))
+    assert s3_provider.write_findings(findings=iter(findings), output_file="unused")
+    objects = s3_provider.s3_client.objects
+    manifest_key = next(key for key in objects if "/manifests/" in key)
+    manifest = json.loads(objects[manifest_key])
+    assert manifest["Findings"] == 10
+    assert len(manifest["Files"]) == 2
+    for entry in manifest["Files"]:
+        assert "/account=" in entry["Key"] and "/region=" in entry["Key"] and f"/scan={manifest['ScanId']}/" in entry["Key"]
+        assert entry["ChecksumSHA256"] == "composite-1"
+        lines = gzip.decompress(objects[entry["Key"]]).splitlines()
+        assert len(lines) == entry["Findings"] == 5
+        assert entry["Bytes"] == len(objects[entry["Key"]])
+
+
+def test_parquet_objects(s3_provider):
+    pq = pytest.importorskip("pyarrow.parquet")
+    s3_provider.format = "parquet"
+    assert s3_provider.write_findings(findings=iter(make_findings(3)), output_file="unused")
+    key = next(key for key in s3_provider.s3_client.objects if key.endswith(".parquet"))
+    table = pq.read_table(io.BytesIO(s3_provider.s3_client.objects[key]))
+    assert table.num_rows == 3
+
+
+def test_parts_are_uploaded_while_streaming(monkeypatch):
+    monkeypatch.setattr(s3, "MIN_PART_BYTES", 10)
+    client = RecordingS3()
+    writer = MultipartWriter(client, "bucket", "key", 10, 2, 0)
+    for _ in range(5):
+        writer.write(b"x" * 12)
+    writer.close()
+    assert len(client.uploads["key"]) == 5
+    assert client.objects["key"] == b"x" * 60
+
+
+def test_failed_part_is_retried_and_upload_aborted(monkeypatch):
+    monkeypatch.setattr(s3, "backoff_delay", lambda attempt: 0)
+    client = boto3.client("s3", region_name="us-east-1")
+    stubber = Stubber(client)
+    stubber.add_response("create_multipart_upload", {"UploadId": "upload-1"}, {"Bucket": "b", "Key": "k", "ChecksumAlgorithm": "SHA256"})
+    stubber.add_client_error("upload_part", service_error_code="SlowDown", http_status_code=503)
+    stubber.add_response("upload_part", {"ETag": "etag-1"})
+    stubber.add_response(
+        "complete_multipart_upload",
+        {},
+        {"Bucket": "b", "Key": "k", "UploadId": "upload-1", "MultipartUpload": {"Parts": [{"PartNumber": 1, "ETag": "etag-1", "ChecksumSHA256": ANY}]}},
+    )
+    stubber.activate()
+    writer = MultipartWriter(client, "b", "k", 1, 1, 1)
+    writer.write(b"data")
+    writer.close()
+    stubber.assert_no_pending_responses()
+
+    stubber.add_response("create_multipart_upload", {"UploadId": "upload-2"})
+    stubber.add_client_error("upload_part", service_error_code="SlowDown", http_status_code=503)
+    stubber.add_client_error("upload_part", service_error_code="SlowDown", http_status_code=503)
+    stubber.add_response("abort_multipart_upload", {}, {"Bucket": "b", "Key": "k", "UploadId": "upload-2"})
+    writer = MultipartWriter(client, "b", "k", 1, 1, 1)
+    writer.write(b"data")
+    with pytest.raises(Exception):
+        writer.close()
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
@@ -0,0 +1,56 @@
+from . import context
+from scan_scope import ScanScope, parse_tag_filters
+
+
+def test_parse_tag_filters():
+    assert parse_tag_filters(["environment=prod", "environment=stage", "owner"]) == [
+        {"Key": "environment", "Values": ["prod", "stage"]},
+        {"Key": "owner"},
+    ]
+
+
+def test_scope_arn_patterns():
+    scope = ScanScope(
+        include_arns=["arn:aws:s3:::prod-*"], exclude_arns=["arn:aws:s3:::prod-logs*"]
+    )
+    assert scope.in_scope("arn:aws:s3:::prod-data")
+    assert not scope.in_scope("arn:aws:s3:::prod-logs-1")
+    assert not scope.in_scope("arn:aws:s3:::dev-data")
+
+
+def test_scope_tag_index_and_vpc():
+    scope = ScanScope(vpc_ids=["vpc-1"])
+    scope.add("arn:aws:ec2:us-east-1:012345678901:volume/vol-1")
+    # the EBS Auditor builds volume ARNs without the resource type, the id still matches
+    assert scope.in_scope("arn:aws:ec2:us-east-1:012345678901/vol-1")
+    assert not scope.in_scope("arn:aws:ec2:us-east-1:012345678901/vol-2")
+    assert not scope.in_scope("arn:aws:ec2:us-east-1:012345678901/vol-1", vpc_id="vpc-2")
+
+
+def test_scope_ids_do_not_match_other_resource_types():
+    scope = ScanScope()
+    scope.add("arn:aws:iam::012345678901:role/default")
+    scope.add("arn:aws:ec2:us-east-1:012345678901:security-group/sg-1")
+    assert scope.in_scope("arn:aws:iam::012345678901:role/service-role/default")
+    assert not scope.in_scope("arn:aws:iam::012345678901:user/default")
+    assert not scope.in_scope("arn:aws:iam::012345678901:policy/default")
+    assert not scope.in_scope("arn:aws:ec2:us-east-1:012345678901:vpc/default")
+    assert scope.in_scope("arn:aws:ec2:us-east-1:012345678901:security-group/sg-1")
+    assert len(scope.arns) == 2
+
+
+def test_findings_are_scoped_by_the_vpc_in_their_details():
+    scope = ScanScope(vpc_ids=["vpc-1"])
+    instance = {
+        "Type": "AwsEc2Instance",
+        "Id": "arn:aws:ec2:us-east-1:012345678901:instance/i-1",
+        "Details": {"AwsEc2Instance": {"VpcId": "vpc-2"}},
+    }
+    assert not scope.resource_in_scope(instance)
+    instance["Details"]["AwsEc2Instance"]["VpcId"] = "vpc-1"
+    assert scope.resource_in_scope(instance)
+    vpc = {"Type": "AwsEc2Vpc", "Id": "arn:aws:ec2:us-east-1:012345678901:vpc/vpc-2"}
+    assert not scope.resource_in_scope(vpc)
+    # resources outside of any VPC are not filtered by it
+    assert scope.resource_in_scope({"Type": "AwsS3Bucket", "Id": "arn:aws:s3:::bucket"})
+    assert not scope.resource_in_scope({"Type": "Other", "Id": "eni-1", "Details": {"Other": {"vpcId": "vpc-2"}}})
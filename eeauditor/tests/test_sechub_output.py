@@ -0,0 +1,82 @@
+import pytest
+from botocore.stub import Stubber, ANY
+
+from . import context
+from processor.outputs.sechub import SecHubProvider, batch_findings
+
+
+def make_findings(count, description="finding"):
+    return [
+        {
+            "SchemaVersion": "2018-10-08",
+            "Id": f"finding-{i}",
+            "ProductArn": "arn:aws:securityhub:us-east-1:012345678901:product/012345678901/default",
+            "GeneratorId": "test",
+            "AwsAccountId": "012345678901",
+            "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
+            "CreatedAt": "2021-01-01T00:00:00+00:00",
+            "UpdatedAt": "2021-01-01T00:00:00+00:00",
+            "Severity": {"Label": "LOW"},
+            "Title": "[Test.1] Test",
+            "Description": description,
+            "Resources": [{"Type": "Other", "Id": f"resource-{i}"}],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="function")
+def sechub_provider():
+    provider = SecHubProvider()
+    provider.max_in_flight = 1
+    stubber = Stubber(provider.sechub_client)
+    stubber.activate()
+    yield provider, stubber
+    stubber.deactivate()
+
+
+def test_batch_findings_by_count():
+    batches = list(batch_findings(make_findings(250)))
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+
+
+def test_batch_findings_by_size():
+    batches = list(batch_findings(make_findings(10, "x" * 1000), max_bytes=3000))
+    assert all(len(batch) <= 2 for batch in batches)
+    assert sum(len(batch) for batch in batches) == 10
+
+
+def test_failed_findings_are_retried(sechub_provider):
+    provider, stubber = sechub_provider
+    stubber.add_response(
+        "batch_import_findings",
+        {
+            "FailedCount": 2,
+            "SuccessCount": 3,
+            "FailedFindings": [
+                {"Id": "finding-1", "ErrorCode": "InternalException", "ErrorMessage": "retry"},
+                {"Id": "finding-2", "ErrorCode": "InvalidInput", "ErrorMessage": "bad"},
+            ],
+        },
+        {"Findings": ANY},
+    )
+    stubber.add_response(
+        "batch_import_findings",
+        {"FailedCount": 0, "SuccessCount": 1, "FailedFindings": []},
+        {"Findings": [make_findings(5)[1]]},
+    )
+    assert provider.write_findings(findings=iter(make_findings(5))) is False
+    assert provider.stats.delivered == 4
+    assert provider.stats.failed == 1
+    stubber.assert_no_pending_responses()
+
+
+def test_batch_exceptions_fail_the_whole_batch(sechub_provider, monkeypatch):
+    provider, stubber = sechub_provider
+
+    def import_batch(batch):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(provider, "import_batch", import_batch)
+    assert provider.write_findings(findings=iter(make_findings(150))) is False
+    assert provider.stats.failed == 150
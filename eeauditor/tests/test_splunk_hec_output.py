@@ -0,0 +1,85 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from . import context
+from processor.outputs.splunk_hec import SplunkHecProvider
+
+
+class HecStub(BaseHTTPRequestHandler):
+    events = []
+    acks = {}
+    busy_first = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/services/collector/ack":
+            requested = json.loads(body)["acks"]
+            self.reply(200, {"acks": {str(ack): HecStub.acks.get(ack, False) for ack in requested}})
+            return
+        if HecStub.busy_first:
+            HecStub.busy_first -= 1
+            self.reply(503, {"text": "Server is busy", "code": 9})
+            return
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        decoder = json.JSONDecoder()
+        text = body.decode()
+        position = 0
+        while position < len(text.strip()):
+            event, end = decoder.raw_decode(text, position)
+            HecStub.events.append(event)
+            position = end + 1
+        ack_id = len(HecStub.acks)
+        HecStub.acks[ack_id] = True
+        self.reply(200, {"text": "Success", "code": 0, "ackId": ack_id})
+
+    def reply(self, status, body):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="function")
+def hec_url(tmp_path, monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), HecStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    HecStub.events = []
+    HecStub.acks = {}
+    monkeypatch.setenv("SPLUNK_HEC_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("SPLUNK_HEC_TOKEN", "token")
+    monkeypatch.setenv("SPLUNK_HEC_BATCH_BYTES", "2048")
+    monkeypatch.setenv("SPLUNK_HEC_MAX_RETRIES", "2")
+    monkeypatch.setenv("SPLUNK_HEC_SPILL_FILE", str(tmp_path / "spill.json"))
+    yield
+    server.shutdown()
+
+
+findings = [{"Id": f"finding-{i}", "UpdatedAt": "2021-03-01T10:00:00Z", "Title": "x" * 200} for i in range(20)]
+
+
+def test_splunk_hec_batches_with_acks(hec_url, monkeypatch):
+    monkeypatch.setenv("SPLUNK_HEC_ACK", "true")
+    HecStub.busy_first = 1
+    provider = SplunkHecProvider()
+    assert provider.write_findings(findings=iter(findings)) is True
+    assert sorted(event["event"]["Id"] for event in HecStub.events) == sorted(f["Id"] for f in findings)
+    assert HecStub.events[0]["time"] == 1614592800.0
+    assert provider.stats.batches > 1
+    assert provider.stats.delivered == 20
+
+
+def test_splunk_hec_spills_when_down(hec_url, monkeypatch):
+    monkeypatch.setenv("SPLUNK_HEC_URL", "http://127.0.0.1:1")
+    provider = SplunkHecProvider()
+    assert provider.write_findings(findings=findings[:3]) is False
+    assert [finding["Id"] for finding in provider.spill_queue.drain()] == ["finding-0", "finding-1", "finding-2"]
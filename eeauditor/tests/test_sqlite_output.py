@@ -0,0 +1,83 @@
+import sqlite3
+
+from . import context
+from processor.outputs.sqlite import SqliteProvider, connect, finding_changes, query_findings
+
+
+def make_finding(i, status="FAILED", account="012345678901"):
+    return {
+        "SchemaVersion": "2018-10-08",
+        "Id": f"finding-{i}",
+        "AwsAccountId": account,
+        "Severity": {"Label": "HIGH" if status == "FAILED" else "INFORMATIONAL"},
+        "Title": f"Check {i}",
+        "Resources": [{"Type": "AwsS3Bucket", "Id": f"arn:aws:s3:::bucket-{i}", "Region": "us-east-1"}],
+        "Compliance": {
+            "Status": status,
+            "RelatedRequirements": ["NIST CSF PR.DS-1", f"CIS AWS Foundations Benchmark V1.4 {i}"],
+        },
+        "RecordState": "ACTIVE" if status == "FAILED" else "ARCHIVED",
+    }
+
+
+def test_sqlite_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_BATCH_SIZE", "2")
+    output_file = str(tmp_path / "output")
+    findings = [make_finding(0), make_finding(1, "PASSED"), make_finding(2, account="111111111111")]
+    assert SqliteProvider().write_findings(findings=iter(findings), output_file=output_file)
+
+    failed_cis = query_findings(f"{output_file}.db", status="FAILED", control="CIS*", account="012345678901")
+    assert [row["id"] for row in failed_cis] == ["finding-0"]
+    assert failed_cis[0]["resources"] == "arn:aws:s3:::bucket-0"
+    by_arn = query_findings(f"{output_file}.db", resource_arn="arn:aws:s3:::bucket-2")
+    assert [row["id"] for row in by_arn] == ["finding-2"]
+
+
+def test_sqlite_changes_between_runs(tmp_path):
+    output_file = str(tmp_path / "output")
+    SqliteProvider().write_findings(
+        findings=[make_finding(0), make_finding(1, "PASSED"), make_finding(2)], output_file=output_file
+    )
+    SqliteProvider().write_findings(
+        findings=[make_finding(0, "PASSED"), make_finding(1), make_finding(3)], output_file=output_file
+    )
+    changes = finding_changes(f"{output_file}.db")
+    assert [row["id"] for row in changes["newly_failing"]] == ["finding-1", "finding-3"]
+    assert [row["id"] for row in changes["newly_passing"]] == ["finding-0"]
+    assert [row["id"] for row in changes["disappeared"]] == ["finding-2"]
+    # queries only see the latest run unless asked otherwise
+    assert len(query_findings(f"{output_file}.db")) == 3
+    assert len(query_findings(f"{output_file}.db", latest_run_only=False)) == 4
+
+
+def test_sqlite_runs_are_scoped_by_account_and_region(tmp_path):
+    output_file = str(tmp_path / "output")
+    SqliteProvider().write_findings(findings=[make_finding(0), make_finding(1)], output_file=output_file)
+    SqliteProvider().write_findings(findings=[make_finding(2, account="111111111111")], output_file=output_file)
+    SqliteProvider().write_findings(findings=[make_finding(0, "PASSED")], output_file=output_file)
+    # the other account's run in between does not make the first account's findings disappear
+    assert [row["id"] for row in query_findings(f"{output_file}.db")] == ["finding-0", "finding-2"]
+    changes = finding_changes(f"{output_file}.db")
+    assert [row["id"] for row in changes["newly_passing"]] == ["finding-0"]
+    assert [row["id"] for row in changes["disappeared"]] == ["finding-1"]
+    assert [row["id"] for row in changes["newly_failing"]] == ["finding-2"]
+    only = finding_changes(f"{output_file}.db", account="111111111111")
+    assert [row["id"] for row in only["newly_failing"]] == ["finding-2"]
+    assert only["disappeared"] == []
+
+
+def test_sqlite_database_without_run_scopes_is_migrated(tmp_path):
+    database = str(tmp_path / "output.db")
+    old = sqlite3.connect(database)
+    old.execute(
+        "CREATE TABLE runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT NOT NULL, "
+        "finished_at TEXT, findings INTEGER DEFAULT 0)"
+    )
+    old.execute("INSERT INTO runs (started_at, finished_at) VALUES ('then', 'then')")
+    old.commit()
+    old.close()
+    SqliteProvider().write_findings(findings=[make_finding(0)], output_file=str(tmp_path / "output"))
+    connection = connect(database)
+    runs = [tuple(row) for row in connection.execute("SELECT run_id, account_id, region FROM runs")]
+    connection.close()
+    assert runs == [(1, None, None), (2, "012345678901", "us-east-1")]
@@ -0,0 +1,74 @@
+import pytest
+
+from . import context
+import tracing
+
+
+def test_tracing_is_free_when_off(monkeypatch):
+    monkeypatch.delenv("TRACING_EXPORTER", raising=False)
+    assert not tracing.configure()
+    findings = iter([{"Id": "finding-0"}])
+    # the findings are handed back as they are, without a wrapping generator
+    assert tracing.traced_findings(findings, tracing.start_span("check")) is findings
+    assert tracing.current_context() is None
+    with tracing.span("scan"), tracing.attached(None):
+        pass
+    tracing.record_span("batch", 0.1)
+    tracing.end_span(None)
+
+
+def test_configure_needs_opentelemetry(monkeypatch):
+    if tracing.trace is not None:
+        pytest.skip("OpenTelemetry is installed")
+    monkeypatch.setenv("TRACING_EXPORTER", "file")
+    with pytest.raises(ImportError):
+        tracing.configure()
+
+
+def test_check_spans(monkeypatch):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("test"))
+
+    def check():
+        nested = tracing.start_span("api call")
+        tracing.end_span(nested)
+        yield {"Id": "finding-0"}
+        yield {"Id": "finding-1"}
+
+    with tracing.span("scan"):
+        service_span = tracing.start_span("service ec2")
+        check_span = tracing.start_span("check ec2_check", service_span)
+        assert len(list(tracing.traced_findings(check(), check_span))) == 2
+        tracing.record_span("sechub batch", 0.25, tracing.current_context())
+        tracing.end_span(service_span)
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert spans["check ec2_check"].attributes["electriceye.findings"] == 2
+    assert spans["check ec2_check"].parent.span_id == spans["service ec2"].context.span_id
+    assert spans["api call"].parent.span_id == spans["check ec2_check"].context.span_id
+    assert spans["service ec2"].parent.span_id == spans["scan"].context.span_id
+    batch = spans["sechub batch"]
+    assert abs((batch.end_time - batch.start_time) / 1e9 - 0.25) < 0.01
+
+
+def test_throttles_are_the_metrics_throttles():
+    class FakeSpan(object):
+        def __init__(self):
+            self.attributes = {}
+
+        def add_event(self, name, attributes):
+            self.event = name
+
+        def set_attribute(self, key, value):
+            self.attributes[key] = value
+
+    api_span = FakeSpan()
+    response = (None, {"Error": {"Code": "ProvisionedThroughputExceededException"}})
+    tracing.needs_retry({"context": {"electriceye_span": api_span}}, 1, response=response)
+    assert api_span.attributes == {"aws.throttled": True}
@@ -0,0 +1,63 @@
+import json
+
+from . import context
+from processor.main import process_findings
+from processor.validation import FindingValidator, truncate
+
+
+def make_finding(i=0, **overrides):
+    finding = {
+        "SchemaVersion": "2018-10-08",
+        "Id": f"finding-{i}",
+        "ProductArn": "arn:aws:securityhub:us-east-1:012345678901:product/012345678901/default",
+        "GeneratorId": "test",
+        "AwsAccountId": "012345678901",
+        "Types": ["Software and Configuration Checks/AWS Security Best Practices"],
+        "CreatedAt": "2021-01-01T00:00:00.123456+00:00",
+        "UpdatedAt": "2021-01-01T00:00:00.123456+00:00",
+        "Severity": {"Label": "LOW"},
+        "Title": "[Test.1] Test",
+        "Description": "finding",
+        "Remediation": {"Recommendation": {"Text": "fix it", "Url": "https://example.com"}},
+        "Resources": [{"Type": "AwsS3Bucket", "Id": "arn:aws:s3:::bucket"}],
+        "Compliance": {"Status": "FAILED", "RelatedRequirements": ["NIST CSF PR.DS-1"]},
+        "RecordState": "ACTIVE",
+    }
+    finding.update(overrides)
+    return finding
+
+
+def test_valid_finding_passes(tmp_path):
+    validator = FindingValidator(str(tmp_path / "dead-letter.ndjson"))
+    finding = make_finding()
+    assert validator(finding) is finding
+    assert not (tmp_path / "dead-letter.ndjson").exists()
+
+
+def test_truncate_copies_shared_dicts():
+    remediation = {"Recommendation": {"Text": "x" * 600, "Url": "https://example.com"}}
+    finding = make_finding(Description="d" * 2000, Remediation=remediation)
+    assert truncate(finding) == ["Description", "Remediation.Recommendation.Text"]
+    assert len(finding["Description"]) == 1024
+    assert len(finding["Remediation"]["Recommendation"]["Text"]) == 512
+    assert finding["Remediation"]["Recommendation"]["Url"] == "https://example.com"
+    assert len(remediation["Recommendation"]["Text"]) == 600
+
+
+def test_invalid_findings_are_quarantined(tmp_path):
+    validator = FindingValidator(str(tmp_path / "dead-letter.ndjson"))
+    assert validator(make_finding(Resources=[{"Type": "Aws S3 Bucket", "Id": "bucket"}])) is None
+    assert validator(make_finding(AwsAccountId="12345", Title="")) is None
+    validator.close()
+    dead_letters = [json.loads(line) for line in open(tmp_path / "dead-letter.ndjson")]
+    assert dead_letters[0]["Reasons"] == ["Resources Type 'Aws S3 Bucket' is not valid"]
+    assert sorted(dead_letters[1]["Reasons"]) == ["AwsAccountId '12345' is not valid", "Title is missing"]
+    assert validator.quarantined == 2
+
+
+def test_process_findings_validates(tmp_path):
+    output_file = str(tmp_path / "output")
+    findings = [make_finding(0), make_finding(1, Severity={"Label": "SEVERE"})]
+    assert process_findings(findings=findings, outputs=["ndjson"], output_file=output_file)
+    assert [json.loads(line)["Id"] for line in open(f"{output_file}.ndjson")] == ["finding-0"]
+    assert "SEVERE" in open(f"{output_file}-dead-letter.ndjson").read()
@@ -0,0 +1,221 @@
+# This file is part of ElectricEye.
+
+# ElectricEye is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# ElectricEye is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License along with ElectricEye.
+# If not, see https://github.com/jonrau1/ElectricEye/blob/master/LICENSE.
+
+import contextlib
+import os
+import time
+
+import boto3
+
+from metrics import THROTTLE_CODES
+
+try:
+    from opentelemetry import context, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:
+    trace = None
+
+# None while tracing is off, every helper below then returns straight away
+_tracer = None
+_provider = None
+_null_span = contextlib.nullcontext()
+def enabled():
+    return _tracer is not None
+
+
+def current_context():
+    """The active trace context, to hand spans over to another thread"""
+    return context.get_current() if _tracer is not None else None
+
+
+def start_span(name, parent=None, attributes=None):
+    """Starts a span without making it current, parented to parent or the current span"""
+    if _tracer is None:
+        return None
+    parent_context = trace.set_span_in_context(parent) if parent is not None else None
+    return _tracer.start_span(name, context=parent_context, attributes=attributes)
+
+
+def end_span(span):
+    if span is not None:
+        span.end()
+
+
+def span(name, attributes=None, parent_context=None):
+    """Context manager running its block within a new current span"""
+    if _tracer is None:
+        return _null_span
+    return _tracer.start_as_current_span(name, context=parent_context, attributes=attributes)
+
+
+@contextlib.contextmanager
+def attached(parent_context):
+    """Makes a context captured by current_context() current, e.g. within a worker thread"""
+    if parent_context is None:
+        yield
+        return
+    token = context.attach(parent_context)
+    try:
+        yield
+    finally:
+        context.detach(token)
+
+
+def traced_findings(findings, check_span):
+    """Passes the findings of a check through, ending check_span once the check is done
+
+    The span is only current while the check runs, not while the findings are
+    consumed, so API calls made by the check become its children.
+    """
+    if check_span is None:
+        return findings
+    return _traced_findings(findings, check_span)
+
+
+def _traced_findings(findings, check_span):
+    span_context = trace.set_span_in_context(check_span)
+    iterator = iter(findings)
+    count = 0
+    try:
+        while True:
+            token = context.attach(span_context)
+            try:
+                finding = next(iterator)
+            except StopIteration:
+                return
+            except Exception as e:
+                check_span.record_exception(e)
+                check_span.set_status(Status(StatusCode.ERROR, str(e)))
+                raise
+            finally:
+                context.detach(token)
+            count += 1
+            yield finding
+    finally:
+        check_span.set_attribute("electriceye.findings", count)
+        check_span.end()
+
+
+def record_span(name, seconds, parent_context=None, attributes=None):
+    """Records a span that just finished and took seconds, such as an output batch"""
+    if _tracer is None:
+        return
+    end = time.time_ns()
+    finished = _tracer.start_span(
+        name, context=parent_context, attributes=attributes, start_time=end - int(seconds * 1e9)
+    )
+    finished.end(end_time=end)
+
+
+def before_call(model, context, **kwargs):
+    context["electriceye_span"] = _tracer.start_span(
+        f"{model.service_model.service_name}.{model.name}",
+        kind=trace.SpanKind.CLIENT,
+        attributes={
+            "rpc.system": "aws-api",
+            "rpc.service": model.service_model.service_name,
+            "rpc.method": model.name,
+        },
+    )
+
+
+def after_call(parsed, context, **kwargs):
+    api_span = context.pop("electriceye_span", None)
+    if api_span is None:
+        return
+    metadata = parsed.get("ResponseMetadata", {})
+    api_span.set_attribute("aws.retries", metadata.get("RetryAttempts", 0))
+    if "HTTPStatusCode" in metadata:
+        api_span.set_attribute("http.status_code", metadata["HTTPStatusCode"])
+    code = parsed.get("Error", {}).get("Code")
+    if code:
+        api_span.set_attribute("aws.error_code", code)
+        api_span.set_status(Status(StatusCode.ERROR, code))
+    api_span.end()
+
+
+def after_call_error(exception, context, **kwargs):
+    api_span = context.pop("electriceye_span", None)
+    if api_span is not None:
+        api_span.record_exception(exception)
+        api_span.set_status(Status(StatusCode.ERROR, str(exception)))
+        api_span.end()
+
+
+def needs_retry(request_dict, attempts, response=None, **kwargs):
+    # only observes the attempt, the retry handler makes the decision
+    api_span = request_dict.get("context", {}).get("electriceye_span")
+    if api_span is None or not response:
+        return
+    code = response[1].get("Error", {}).get("Code")
+    if code in THROTTLE_CODES:
+        api_span.add_event("throttled", {"aws.error_code": code, "aws.attempt": attempts})
+        api_span.set_attribute("aws.throttled", True)
+
+
+def instrument_session(session):
+    """Traces the API calls of every client the session creates from now on"""
+    session.events.register("before-call", before_call, unique_id="electriceye-tracing-before-call")
+    session.events.register("after-call", after_call, unique_id="electriceye-tracing-after-call")
+    session.events.register(
+        "after-call-error", after_call_error, unique_id="electriceye-tracing-after-call-error"
+    )
+    session.events.register("needs-retry", needs_retry, unique_id="electriceye-tracing-needs-retry")
+
+
+def span_exporter(exporter):
+    if exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            raise ImportError(
+                "OTLP export needs the OTLP exporter, install it with pip3 install opentelemetry-exporter-otlp-proto-http"
+            )
+        # the endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    if exporter == "file":
+        trace_file = open(os.environ.get("TRACING_FILE", "electriceye-traces.ndjson"), "a")
+        return ConsoleSpanExporter(out=trace_file, formatter=lambda span: span.to_json(indent=None) + "\n")
+    raise ValueError(f"Unknown TRACING_EXPORTER {exporter}")
+
+
+def configure():
+    """Sets tracing up when TRACING_EXPORTER is otlp or file, returns whether it is on
+
+    Clients copy the session's handlers when they are created, so this has to run
+    before the auditors are loaded.
+    """
+    global _tracer, _provider
+    exporter = os.environ.get("TRACING_EXPORTER", "off")
+    if exporter == "off" or _tracer is not None:
+        return _tracer is not None
+    if trace is None:
+        raise ImportError("Tracing needs OpenTelemetry, install it with pip3 install opentelemetry-sdk")
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": os.environ.get("OTEL_SERVICE_NAME", "electriceye")})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(span_exporter(exporter)))
+    _tracer = _provider.get_tracer("electriceye")
+    instrument_session(boto3._get_default_session())
+    return True
+
+
+def shutdown():
+    """Flushes the spans still waiting to be exported"""
+    if _provider is not None:
+        _provider.shutdown()